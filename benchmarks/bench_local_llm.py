@@ -0,0 +1,79 @@
+"""
+Load-tests the analysts' signal generation against the offline Local provider (no network, no API spend).
+
+Usage: poetry run python benchmarks/bench_local_llm.py [--tickers 1000] [--latency 0.2] [--jitter 0.05]
+                                                       [--error-rate 0.02] [--batched] [--stream]
+                                                       [--token-latency 0.005] [--trailing-tokens 300]
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+sys.path.insert(0, os.path.join(ROOT, "src"))
+# Agents load their personas from config/prompts.json, relative to the repository root
+os.chdir(ROOT)
+
+from agents.base_agent import BaseAgent
+from tools.llm_interface import set_streaming
+from tools.llm_metrics import llm_metrics
+from tools.models import get_model
+from tools.resilience import resilience_stats
+
+ANALYSTS = ["Elon Musk", "Michael Saylor", "Vitalik Buterin", "Changpeng Zhao", "Brian Armstrong",
+            "Charles Hoskinson"]
+
+
+def make_price_data(n_tickers, bars=60):
+    rng = np.random.default_rng(0)
+    return {
+        f"T{i:04d}": pd.DataFrame({
+            "close": 100 * np.exp(rng.normal(0, 0.03, bars).cumsum()),
+            "volume": rng.random(bars) * 1e6,
+        })
+        for i in range(n_tickers)
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Load-test signal generation with the Local LLM provider")
+    parser.add_argument("--tickers", type=int, default=1000, help="Tickers analysed. Defaults to 1000")
+    parser.add_argument("--latency", type=float, default=0.2, help="Mean seconds per call. Defaults to 0.2")
+    parser.add_argument("--jitter", type=float, default=0.05, help="Latency jitter in seconds. Defaults to 0.05")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Injected error probability. Defaults to 0")
+    parser.add_argument("--model", default="local-synthetic", help="local-synthetic or local-replay")
+    parser.add_argument("--batched", action="store_true", help="Cover several tickers per request")
+    parser.add_argument("--stream", action="store_true", help="Stream responses and stop once the signal is parsed")
+    parser.add_argument("--token-latency", type=float, default=0.0, help="Seconds per generated token. Defaults to 0")
+    parser.add_argument("--trailing-tokens", type=int, default=0,
+                        help="Commentary tokens generated after the answer. Defaults to 0")
+    args = parser.parse_args()
+
+    os.environ.setdefault("LLM_CACHE_DISABLED", "1")
+    os.environ.update(LOCAL_LLM_LATENCY=str(args.latency), LOCAL_LLM_JITTER=str(args.jitter),
+                      LOCAL_LLM_ERROR_RATE=str(args.error_rate), LOCAL_LLM_SEED="0",
+                      LOCAL_LLM_TOKEN_LATENCY=str(args.token_latency),
+                      LOCAL_LLM_TRAILING_TOKENS=str(args.trailing_tokens))
+    set_streaming(args.stream)
+
+    price_data = make_price_data(args.tickers)
+    tickers = list(price_data)
+    model = get_model(args.model, "Local")
+
+    started = time.perf_counter()
+    actions = {"buy": 0, "sell": 0, "hold": 0}
+    for name in ANALYSTS:
+        signals = BaseAgent(name).generate_signals(price_data, tickers, args.model, "Local", batched=args.batched)
+        for signal in signals.values():
+            actions[signal["action"]] = actions.get(signal["action"], 0) + 1
+    elapsed = time.perf_counter() - started
+
+    print(f"{len(ANALYSTS)} analysts x {args.tickers:,} tickers in {elapsed:.2f} s")
+    print(f"model calls: {model.stats}")
+    print(f"signals: {actions}")
+    print(f"provider: {resilience_stats().get('Local')}")
+    print(llm_metrics.summary(by=()).to_string(index=False))
@@ -0,0 +1,66 @@
+"""
+Benchmarks normalize_ohlcv_data on frames that are already in canonical form.
+
+Usage: poetry run python benchmarks/bench_normalize_ohlcv.py [--rows 1000000] [--repeat 5]
+"""
+import argparse
+import os
+import sys
+import timeit
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+from tools.utils import normalize_ohlcv_data
+
+
+def legacy_normalize(df):
+    """The normalization steps as they ran before schema detection: rename, coerce, dropna, sort."""
+    df = df.rename(columns={"Date": "timestamp", "Open": "open", "High": "high", "Low": "low",
+                            "Close": "close", "Volume": "volume"})
+    for col in ["open", "high", "low", "close", "volume"]:
+        df[col] = pd.to_numeric(df[col], errors="coerce")
+    df = df.dropna(subset=["timestamp", "close"])
+    df = df.sort_values("timestamp").reset_index(drop=True)
+    return df[["timestamp", "open", "high", "low", "close", "volume"]]
+
+
+def make_frame(rows):
+    rng = np.random.default_rng(0)
+    close = 100 + rng.standard_normal(rows).cumsum()
+    return pd.DataFrame({
+        "timestamp": pd.date_range("2020-01-01", periods=rows, freq="min"),
+        "open": close,
+        "high": close + 1,
+        "low": close - 1,
+        "close": close,
+        "volume": rng.random(rows),
+    })
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark normalize_ohlcv_data fast paths")
+    parser.add_argument("--rows", type=int, default=1_000_000, help="Bars per frame. Defaults to 1000000")
+    parser.add_argument("--repeat", type=int, default=5, help="Timed runs per case. Defaults to 5")
+    args = parser.parse_args()
+
+    df = make_frame(args.rows)
+    cases = [
+        ("legacy (rename/coerce/dropna/sort)", lambda: legacy_normalize(df)),
+        ("normalized input, copy=True", lambda: normalize_ohlcv_data(df)),
+        ("normalized input, copy=False", lambda: normalize_ohlcv_data(df, copy=False)),
+        ("normalized input, compact=True", lambda: normalize_ohlcv_data(df, compact=True)),
+    ]
+
+    baseline = None
+    print(f"{args.rows:,} rows, best of {args.repeat}")
+    for name, func in cases:
+        best = min(timeit.repeat(func, number=1, repeat=args.repeat))
+        baseline = baseline or best
+        print(f"{name:<36} {best * 1000:9.2f} ms  {baseline / best:7.1f}x")
+
+    full = df.memory_usage(deep=True).sum()
+    compact = normalize_ohlcv_data(df, compact=True).memory_usage(deep=True).sum()
+    print(f"memory: {full / 2**20:.1f} MiB -> {compact / 2**20:.1f} MiB with compact=True")
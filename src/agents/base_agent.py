@@ -1,45 +1,87 @@
+import concurrent.futures
 import json
-from tools.llm_interface import call_llm
-from pydantic import BaseModel
+import os
+from tools.llm_interface import call_llm, call_llm_batch, submit_llm
+from tools.llm_metrics import estimate_tokens
+from tools.prompts import DEFAULT_PROMPT_FILE, build_messages, plain_text
+from pydantic import BaseModel, ValidationError
+
+SIGNAL_INSTRUCTION = "Provide a trading signal (buy, sell, hold) with confidence (0-1) and brief reasoning."
+
+BATCH_INSTRUCTION = (
+    "For each asset above, provide a trading signal (buy, sell, hold) with confidence (0-1) and brief reasoning. "
+    'Respond in JSON as {"signals": [{"ticker": "<asset>", "action": "buy|sell|hold", "confidence": 0.0, '
+    '"reasoning": "..."}]} with exactly one entry per asset.'
+)
+
+# Prompt tokens allowed per batched request, and the most tickers sent in one request
+DEFAULT_BATCH_TOKENS = 3000
+DEFAULT_BATCH_SIZE = 20
+
+VALID_ACTIONS = ("buy", "sell", "hold")
 
 class TradingSignal(BaseModel):
     action: str
     confidence: float
     reasoning: str
 
+class TickerSignal(TradingSignal):
+    ticker: str
+
+class TradingSignalBatch(BaseModel):
+    # Entries are validated one by one so a malformed entry only affects its own ticker
+    signals: list[dict]
+
 class BaseAgent:
-    def __init__(self, name, prompt_file="config/prompts.json"):
+    def __init__(self, name, prompt_file=None):
         self.name = name
+        # PROMPTS_FILE (e.g., in .env) selects another persona file, such as config/prompts.compact.json
+        prompt_file = prompt_file or os.getenv("PROMPTS_FILE", DEFAULT_PROMPT_FILE)
         with open(prompt_file, 'r') as f:
             self.prompt = json.load(f).get(name, "")
 
-    def generate_signal(self, data, asset="BTC", model_name="gemini-2.0-flash", model_provider="Gemini"):
+    def summarize(self, data, asset):
         """
-        Generates a trading signal using LLM based on market data.
+        Summarizes the latest market data of one asset for the LLM.
         Args:
             data (pd.DataFrame): OHLCV data
             asset (str): Crypto asset ticker
-            model_name (str): Name of the LLM model
-            model_provider (str): Provider of the LLM model
         Returns:
-            dict: Signal with action, asset, confidence, and reasoning
+            str: Latest close, volume and 50-day SMA
         """
-        if "close" not in data:
-            return {"action": "hold", "asset": asset, "confidence": 0.0, "reasoning": "Missing 'close' column in data"}
-
-        # Prepare data summary for LLM
         latest_close = data["close"].iloc[-1]
         volume = data["volume"].iloc[-1]
         sma_50 = data["close"].rolling(window=50).mean().iloc[-1]
-        data_summary = f"Asset: {asset}\nLatest Close: {latest_close}\nVolume: {volume}\n50-day SMA: {sma_50}"
+        return f"Asset: {asset}\nLatest Close: {latest_close}\nVolume: {volume}\n50-day SMA: {sma_50}"
 
-        # Construct prompt with data
-        full_prompt = f"{self.prompt}\n\nCurrent Market Data:\n{data_summary}\n\nProvide a trading signal (buy, sell, hold) with confidence (0-1) and brief reasoning."
+    def build_prompt(self, data, asset):
+        """
+        Builds the LLM prompt for one asset.
+        The persona and instruction form a system prefix identical across tickers, which providers can cache;
+        only the market data changes from call to call.
+        Args:
+            data (pd.DataFrame): OHLCV data
+            asset (str): Crypto asset ticker
+        Returns:
+            list: System message (persona and instruction) and user message (latest market data)
+        """
+        return build_messages(f"{self.prompt}\n\n{SIGNAL_INSTRUCTION}",
+                              f"Current Market Data:\n{self.summarize(data, asset)}")
 
-        # Call LLM with the required arguments
-        response = call_llm(full_prompt, model_name, model_provider, TradingSignal, agent_name=self.name)
+    def build_batch_prompt(self, summaries):
+        """
+        Builds one LLM prompt covering several assets, with the persona stated once.
+        Args:
+            summaries (list): Market data summaries, one per asset
+        Returns:
+            list: System message (persona and JSON answer format) and user message (every summary)
+        """
+        return build_messages(f"{self.prompt}\n\n{BATCH_INSTRUCTION}",
+                              "Current Market Data:\n" + "\n\n".join(summaries))
 
-        # Convert response to dict
+    @staticmethod
+    def parse_signal(response, asset):
+        """Converts an LLM response into a signal dict with action, asset, confidence and reasoning."""
         try:
             signal = response if isinstance(response, dict) else response.dict()
             return {
@@ -49,4 +91,154 @@ class BaseAgent:
                 "reasoning": signal.get("reasoning", "No reasoning provided")
             }
         except Exception as e:
-            return {"action": "hold", "asset": asset, "confidence": 0.5, "reasoning": f"Error parsing LLM response: {e}"}
\ No newline at end of file
+            return {"action": "hold", "asset": asset, "confidence": 0.5, "reasoning": f"Error parsing LLM response: {e}"}
+
+    def generate_signal(self, data, asset="BTC", model_name="gemini-2.0-flash", model_provider="Gemini"):
+        """
+        Generates a trading signal using LLM based on market data.
+        Args:
+            data (pd.DataFrame): OHLCV data
+            asset (str): Crypto asset ticker
+            model_name (str): Name of the LLM model
+            model_provider (str): Provider of the LLM model
+        Returns:
+            dict: Signal with action, asset, confidence, and reasoning
+        """
+        if "close" not in data:
+            return {"action": "hold", "asset": asset, "confidence": 0.0, "reasoning": "Missing 'close' column in data"}
+
+        # Call LLM with the required arguments
+        response = call_llm(self.build_prompt(data, asset), model_name, model_provider, TradingSignal,
+                            agent_name=self.name, ticker=asset)
+        return self.parse_signal(response, asset)
+
+    def chunk_tickers(self, summaries, max_tokens=DEFAULT_BATCH_TOKENS, max_tickers=DEFAULT_BATCH_SIZE):
+        """
+        Splits tickers into batches whose prompts stay within a token budget.
+        Args:
+            summaries (dict): Market data summary by ticker
+            max_tokens (int): Estimated prompt tokens allowed per batch
+            max_tickers (int): Most tickers per batch
+        Returns:
+            list: Lists of tickers; a ticker whose summary alone exceeds the budget gets its own batch
+        """
+        chunks, chunk = [], []
+        tokens = base = estimate_tokens(plain_text(self.build_batch_prompt([])))
+        for ticker, summary in summaries.items():
+            cost = estimate_tokens(summary) + 1
+            if chunk and (tokens + cost > max_tokens or len(chunk) == max_tickers):
+                chunks.append(chunk)
+                chunk, tokens = [], base
+            chunk.append(ticker)
+            tokens += cost
+        if chunk:
+            chunks.append(chunk)
+        return chunks
+
+    def generate_batched_signals(self, price_data, tickers, model_name="gemini-2.0-flash", model_provider="Gemini",
+                                 max_tokens=DEFAULT_BATCH_TOKENS, max_tickers=DEFAULT_BATCH_SIZE):
+        """
+        Generates signals with one LLM request per chunk of tickers instead of one per ticker.
+        Tickers missing from the answer, or whose entry is malformed, are retried with single-ticker prompts.
+        Args:
+            price_data (dict): Dictionary of OHLCV DataFrames by ticker
+            tickers (list): Tickers with usable data
+            model_name (str): Name of the LLM model
+            model_provider (str): Provider of the LLM model
+            max_tokens (int): Estimated prompt tokens allowed per request
+            max_tickers (int): Most tickers per request
+        Returns:
+            dict: Signal dicts by ticker, in ticker order
+        """
+        summaries = {ticker: self.summarize(price_data[ticker], ticker) for ticker in tickers}
+        chunks = self.chunk_tickers(summaries, max_tokens, max_tickers)
+        prompts = [self.build_batch_prompt([summaries[t] for t in chunk]) for chunk in chunks]
+        responses = call_llm_batch(prompts, model_name, model_provider, TradingSignalBatch, agent_name=self.name,
+                                   tickers=[",".join(chunk) for chunk in chunks])
+
+        signals = {}
+        for chunk, response in zip(chunks, responses):
+            expected = set(chunk)
+            for entry in response.signals:
+                try:
+                    signal = TickerSignal.model_validate(entry)
+                except ValidationError:
+                    continue
+                ticker = signal.ticker.strip().upper()
+                ticker = next((t for t in expected if t.upper() == ticker), None)
+                action = signal.action.strip().lower()
+                if ticker is None or ticker in signals or action not in VALID_ACTIONS \
+                        or not 0.0 <= signal.confidence <= 1.0:
+                    continue
+                signals[ticker] = self.parse_signal(
+                    {"action": action, "confidence": signal.confidence, "reasoning": signal.reasoning}, ticker)
+
+        # Per-ticker fallback for anything the batched answers did not cover
+        missing = [t for t in tickers if t not in signals]
+        if missing:
+            fallback = call_llm_batch([self.build_prompt(price_data[t], t) for t in missing], model_name,
+                                      model_provider, TradingSignal, agent_name=self.name, tickers=missing)
+            for ticker, response in zip(missing, fallback):
+                signals[ticker] = self.parse_signal(response, ticker)
+
+        return {ticker: signals[ticker] for ticker in tickers}
+
+    def generate_signals(self, price_data, tickers, model_name="gemini-2.0-flash", model_provider="Gemini",
+                         batched=False, quorum=None):
+        """
+        Generates signals for every ticker with usable data, sending all LLM calls concurrently.
+        Args:
+            price_data (dict): Dictionary of OHLCV DataFrames by ticker
+            tickers (list): Tickers to analyse
+            model_name (str): Name of the LLM model
+            model_provider (str): Provider of the LLM model
+            batched (bool): Cover several tickers per request (see generate_batched_signals)
+            quorum (QuorumTracker): Shared tallies of the run; tickers already decided are skipped and calls
+                                    for tickers decided while in flight are cancelled (see tools.quorum)
+        Returns:
+            dict: Signal dicts by ticker, in ticker order (tickers without data or a close column, and tickers
+                  skipped by the quorum, are left out)
+        """
+        tickers = [t for t in tickers if t in price_data and not price_data[t].empty and "close" in price_data[t].columns]
+        if quorum is not None:
+            tickers = quorum.open_tickers(self.name, tickers)
+        if batched:
+            signals = self.generate_batched_signals(price_data, tickers, model_name, model_provider)
+            if quorum is not None:
+                for ticker, signal in signals.items():
+                    quorum.record(self.name, ticker, signal)
+            return signals
+        if quorum is not None:
+            return self.generate_quorum_signals(price_data, tickers, model_name, model_provider, quorum)
+        prompts = [self.build_prompt(price_data[t], t) for t in tickers]
+        responses = call_llm_batch(prompts, model_name, model_provider, TradingSignal, agent_name=self.name,
+                                   tickers=tickers)
+        return {ticker: self.parse_signal(response, ticker) for ticker, response in zip(tickers, responses)}
+
+    def generate_quorum_signals(self, price_data, tickers, model_name, model_provider, quorum):
+        """
+        Sends one LLM call per ticker and feeds each signal to the quorum as soon as it arrives.
+        Args:
+            price_data (dict): Dictionary of OHLCV DataFrames by ticker
+            tickers (list): Undecided tickers to analyse
+            model_name (str): Name of the LLM model
+            model_provider (str): Provider of the LLM model
+            quorum (QuorumTracker): Shared tallies of the run
+        Returns:
+            dict: Signal dicts by ticker, in ticker order, without the calls cancelled by the quorum
+        """
+        futures = {}
+        for ticker in tickers:
+            future = submit_llm(self.build_prompt(price_data[ticker], ticker), model_name, model_provider,
+                                TradingSignal, agent_name=self.name, ticker=ticker)
+            futures[future] = ticker
+            quorum.register(self.name, ticker, future)
+
+        signals = {}
+        for future in concurrent.futures.as_completed(futures):
+            if future.cancelled():
+                continue
+            ticker = futures[future]
+            signals[ticker] = self.parse_signal(future.result(), ticker)
+            quorum.record(self.name, ticker, signals[ticker])
+        return {ticker: signals[ticker] for ticker in tickers if ticker in signals}
@@ -19,17 +19,12 @@ class CZBinanceAgent(BaseAgent):
         signals = data.get("analyst_signals", {})
         model_name = state["metadata"].get("model_name", "gemini-2.0-flash")
         model_provider = state["metadata"].get("model_provider", "Gemini")
+        batched = state["metadata"].get("batch_signals", False)
+        quorum = state["metadata"].get("quorum")
 
-        for ticker in tickers:
-            if ticker not in price_data or price_data[ticker].empty:
-                continue
-
-            df = price_data[ticker]
-            if "close" not in df.columns:
-                continue
-
-            # Générer le signal en utilisant la méthode de BaseAgent
-            signal = super().generate_signal(df, asset=ticker, model_name=model_name, model_provider=model_provider)
+        # Générer les signaux de tous les tickers en parallèle via BaseAgent
+        for ticker, signal in self.generate_signals(price_data, tickers, model_name, model_provider, batched,
+                                                    quorum).items():
             signals.setdefault("Changpeng Zhao", {})[ticker] = signal
 
         data["analyst_signals"] = signals
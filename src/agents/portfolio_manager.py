@@ -52,6 +52,87 @@ class PortfolioManager:
         return decisions
 
 
+def average_confidences(ticker_signals):
+    """
+    Calculates average confidence for "buy" and "sell" signals.
+    Args:
+        ticker_signals (list): Signal dicts with 'action' and 'confidence'
+    Returns:
+        tuple: (buy_conf, sell_conf), 0 when there is no signal of that kind
+    """
+    buy_signals = [s for s in ticker_signals if s["action"] == "buy"]
+    sell_signals = [s for s in ticker_signals if s["action"] == "sell"]
+
+    buy_conf = sum(s["confidence"] for s in buy_signals) / len(buy_signals) if buy_signals else 0
+    sell_conf = sum(s["confidence"] for s in sell_signals) / len(sell_signals) if sell_signals else 0
+    return buy_conf, sell_conf
+
+
+def decide_trade(ticker_signals, buy_threshold=0.6, sell_threshold=0.6, position_size=0.2):
+    """
+    Turns one ticker's analyst signals into a trading decision.
+    Args:
+        ticker_signals (list): Signal dicts with 'action' and 'confidence'
+        buy_threshold (float): Average buy confidence needed to buy (default: 0.6)
+        sell_threshold (float): Average sell confidence needed to sell (default: 0.6)
+        position_size (float): Fraction of the portfolio traded (default: 0.2)
+    Returns:
+        dict: Decision with action, size and confidence
+    """
+    buy_conf, sell_conf = average_confidences(ticker_signals)
+
+    if buy_conf > buy_threshold:  # Threshold for buy decision
+        return {"action": "buy", "size": position_size, "confidence": buy_conf}
+    elif sell_conf > sell_threshold:  # Threshold for sell decision
+        return {"action": "sell", "size": position_size, "confidence": sell_conf}
+    else:
+        # If no strong buy or sell signal, use the highest confidence among all signals
+        max_conf = max(s["confidence"] for s in ticker_signals) if ticker_signals else 0
+        action = next(s["action"] for s in ticker_signals if s["confidence"] == max_conf)
+        return {"action": action, "size": 0.0 if action == "hold" else position_size, "confidence": max_conf}
+
+
+def _best_average(total, count, candidates):
+    """Highest average reachable by adding any number of the candidate confidences to (total, count)."""
+    best = total / count if count else 0.0
+    for value in sorted(candidates, reverse=True):
+        total, count = total + value, count + 1
+        best = max(best, total / count)
+    return best
+
+
+def settled_action(ticker_signals, remaining_analysts, remaining_other=0, confidence_scale=1.0,
+                   buy_threshold=0.6, sell_threshold=0.6):
+    """
+    Returns the decision of decide_trade if no signal still to come can change it.
+    Missing signals are bounded by their worst case: any action with any confidence in [0, 1].
+    Args:
+        ticker_signals (list): Signal dicts received so far for the ticker
+        remaining_analysts (int): Analyst signals still to come, scaled like the received ones
+        remaining_other (int): Other signals still to come whose confidence is not scaled (e.g., Risk Manager)
+        confidence_scale (float): Factor applied to analyst confidences before the decision (e.g., 0.8 in high
+                                  volatility; see RiskManagerAgent)
+        buy_threshold (float): Average buy confidence needed to buy (default: 0.6)
+        sell_threshold (float): Average sell confidence needed to sell (default: 0.6)
+    Returns:
+        str: "buy" or "sell" when the outcome is decided, otherwise None
+    """
+    remaining = remaining_analysts + remaining_other
+    buys = [s["confidence"] * confidence_scale for s in ticker_signals if s["action"] == "buy"]
+    sells = [s["confidence"] * confidence_scale for s in ticker_signals if s["action"] == "sell"]
+
+    # Lowest reachable buy average: every missing signal is a buy with zero confidence
+    if buys and sum(buys) / (len(buys) + remaining) > buy_threshold:
+        return "buy"
+
+    # Selling needs buying out of reach and the lowest reachable sell average above the threshold
+    candidates = [confidence_scale] * remaining_analysts + [1.0] * remaining_other
+    if _best_average(sum(buys), len(buys), candidates) <= buy_threshold \
+            and sells and sum(sells) / (len(sells) + remaining) > sell_threshold:
+        return "sell"
+    return None
+
+
 def portfolio_management_agent(state):
     """
     Aggregates signals and generates final trading decisions.
@@ -74,26 +155,12 @@ def portfolio_management_agent(state):
             print(f"⚠️ Aucun signal pour {ticker}.")  # Débogage
             continue
 
-        # Calculate average confidence for "buy" and "sell" signals
-        buy_signals = [s for s in ticker_signals if s["action"] == "buy"]
-        sell_signals = [s for s in ticker_signals if s["action"] == "sell"]
-
-        buy_conf = sum(s["confidence"] for s in buy_signals) / len(buy_signals) if buy_signals else 0
-        sell_conf = sum(s["confidence"] for s in sell_signals) / len(sell_signals) if sell_signals else 0
-
+        buy_conf, sell_conf = average_confidences(ticker_signals)
         print(f"Confiance pour {ticker} - Buy: {buy_conf}, Sell: {sell_conf}")  # Débogage
 
-        if buy_conf > 0.6:  # Threshold for buy decision
-            decisions[ticker] = {"action": "buy", "size": 0.2, "confidence": buy_conf}
-        elif sell_conf > 0.6:  # Threshold for sell decision
-            decisions[ticker] = {"action": "sell", "size": 0.2, "confidence": sell_conf}
-        else:
-            # If no strong buy or sell signal, use the highest confidence among all signals
-            max_conf = max(s["confidence"] for s in ticker_signals) if ticker_signals else 0
-            action = next(s["action"] for s in ticker_signals if s["confidence"] == max_conf)
-            decisions[ticker] = {"action": action, "size": 0.0 if action == "hold" else 0.2, "confidence": max_conf}
+        decisions[ticker] = decide_trade(ticker_signals)
 
     print(f"Décisions finales (portfolio_management_agent) : {decisions}")  # Débogage
     # Use json.dumps to ensure proper JSON formatting with double quotes
     state["messages"].append(AIMessage(content=json.dumps(decisions)))
-    return state
\ No newline at end of file
+    return state
@@ -1,6 +1,5 @@
 from agents.base_agent import BaseAgent
 from tools.utils import calculate_volatility
-from tools.llm_interface import call_llm
 from pydantic import BaseModel
 
 class TradingSignal(BaseModel):
@@ -12,6 +11,11 @@ class RiskManagerAgent(BaseAgent):
     def __init__(self):
         super().__init__(name="Risk Manager")
 
+    def summarize(self, data, asset):
+        """Summarizes the latest close and 30-day volatility of one asset for the LLM."""
+        volatility = calculate_volatility(data).iloc[-1] if not data.empty else 0
+        return f"Asset: {asset}\nLatest Close: {data['close'].iloc[-1]}\n30-day Volatility: {volatility:.2f}%"
+
     def generate_signal(self, state):
         data = state["data"]
         tickers = data["tickers"]
@@ -19,22 +23,24 @@ class RiskManagerAgent(BaseAgent):
         signals = data.get("analyst_signals", {})
         model_name = state["metadata"].get("model_name", "gemini-2.0-flash")
         model_provider = state["metadata"].get("model_provider", "Gemini")
+        batched = state["metadata"].get("batch_signals", False)
+        quorum = state["metadata"].get("quorum")
 
-        for ticker in tickers:
-            if ticker not in price_data:
-                continue
+        # Query the LLM for every ticker at once (one request per chunk of tickers when batched)
+        risk_signals = self.generate_signals(price_data, tickers, model_name, model_provider, batched=batched,
+                                             quorum=quorum)
+
+        # Tickers already decided by the quorum get no Risk Manager call, but their confidences are still adjusted
+        decided = quorum.report()["decided"] if quorum is not None else {}
+        adjusted = list(risk_signals) + [t for t in tickers if t in decided and t not in risk_signals and t in price_data]
 
+        for ticker in adjusted:
             df = price_data[ticker]
             volatility = calculate_volatility(df).iloc[-1] if not df.empty else 0
-
-            data_summary = f"Asset: {ticker}\nLatest Close: {df['close'].iloc[-1]}\n30-day Volatility: {volatility:.2f}%"
-            full_prompt = f"{self.prompt}\n\nCurrent Market Data:\n{data_summary}\n\nProvide a trading signal (buy, sell, hold) with confidence (0-1) and brief reasoning."
-
-            response = call_llm(full_prompt, model_name, model_provider, TradingSignal)
             try:
-                signal = response if isinstance(response, dict) else response.dict()
                 # Store the signal under "Risk Manager" without overwriting other analysts' signals
-                signals.setdefault("Risk Manager", {})[ticker] = signal
+                if ticker in risk_signals:
+                    signals.setdefault("Risk Manager", {})[ticker] = risk_signals[ticker]
 
                 # Adjust confidence of other analysts' signals based on volatility
                 for analyst, analyst_signals in signals.items():
@@ -47,4 +53,4 @@ class RiskManagerAgent(BaseAgent):
                 continue
 
         data["analyst_signals"] = signals
-        return state
\ No newline at end of file
+        return state
@@ -0,0 +1,353 @@
+import argparse
+import hashlib
+import json
+import os
+import sqlite3
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+from dateutil.relativedelta import relativedelta
+
+from agents.base_agent import BATCH_INSTRUCTION, SIGNAL_INSTRUCTION
+from main import create_initial_state, create_workflow
+from tools.analysts import ANALYST_ORDER, get_analyst_nodes
+from tools.backtester import Backtester
+from tools.data_fetcher import fetch_crypto_data
+from tools.ledger import PositionLedger
+from tools.llm_interface import set_streaming
+from tools.llm_metrics import llm_metrics
+from tools.models import get_model_info
+from tools.ohlcv_cache import OHLCVCache
+from tools.progress import progress
+from tools.prompts import DEFAULT_PROMPT_FILE
+from tools.sweep import DEFAULT_PARAMS, history_to_signals
+from tools.utils import normalize_ohlcv_data
+
+DEFAULT_SIGNAL_STORE = "data/walk_forward_signals.sqlite"
+
+RISK_MANAGER = "Risk Manager"
+
+# Bar timeframes the price data can be fetched at, coarsest first
+BAR_TIMEFRAMES = ("1d", "12h", "8h", "6h", "4h", "2h", "1h", "30m", "15m", "5m", "1m")
+
+
+class SignalStore:
+    """
+    SQLite store of analyst signals keyed by (date, ticker, agent, model, context).
+    The context is a digest of everything else that shapes a signal (see signal_context), so a replay
+    with another lookback, bar timeframe or prompt file never reuses signals produced under the old one.
+    """
+
+    def __init__(self, path=DEFAULT_SIGNAL_STORE):
+        """
+        Opens (and creates if needed) the store.
+        Args:
+            path (str): SQLite file path (default: data/walk_forward_signals.sqlite)
+        """
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self.conn = sqlite3.connect(path)
+        columns = [row[1] for row in self.conn.execute("PRAGMA table_info(signals)")]
+        if columns and "context" not in columns:
+            # Signals stored before contexts were recorded cannot be matched to a run: keep them aside
+            self.conn.execute("DROP TABLE IF EXISTS signals_legacy")
+            self.conn.execute("ALTER TABLE signals RENAME TO signals_legacy")
+        self.conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS signals (
+                date TEXT NOT NULL,
+                ticker TEXT NOT NULL,
+                agent TEXT NOT NULL,
+                model TEXT NOT NULL,
+                context TEXT NOT NULL,
+                signal TEXT NOT NULL,
+                PRIMARY KEY (date, ticker, agent, model, context)
+            )
+            """
+        )
+        self.conn.commit()
+
+    def load(self, model_name, start, end, context=""):
+        """
+        Loads every stored signal of a model and context between two dates.
+        Args:
+            model_name (str): Model the signals were produced with
+            start (str): First date (ISO format, inclusive)
+            end (str): Last date (ISO format, inclusive)
+            context (str): Context digest the signals were produced under (see signal_context)
+        Returns:
+            dict: {date: {agent: {ticker: signal}}}
+        """
+        rows = self.conn.execute(
+            "SELECT date, ticker, agent, signal FROM signals "
+            "WHERE model = ? AND context = ? AND date BETWEEN ? AND ?",
+            (model_name, context, start, end),
+        )
+        stored = {}
+        for date, ticker, agent, signal in rows:
+            stored.setdefault(date, {}).setdefault(agent, {})[ticker] = json.loads(signal)
+        return stored
+
+    def save(self, date, model_name, analyst_signals, context=""):
+        """
+        Persists the signals produced at one rebalance date.
+        Args:
+            date (str): Rebalance date (ISO format)
+            model_name (str): Model the signals were produced with
+            analyst_signals (dict): {agent: {ticker: signal}}
+            context (str): Context digest the signals were produced under (see signal_context)
+        """
+        rows = [(date, ticker, agent, model_name, context, json.dumps(signal, default=str))
+                for agent, signals in analyst_signals.items() for ticker, signal in signals.items()]
+        with self.conn:
+            self.conn.executemany("INSERT OR REPLACE INTO signals VALUES (?, ?, ?, ?, ?, ?)", rows)
+
+    def close(self):
+        self.conn.close()
+
+
+def rebalance_dates(start_date, end_date, frequency="1D"):
+    """
+    Lists the rebalance timestamps between two dates.
+    Args:
+        start_date (str): Start date in YYYY-MM-DD format
+        end_date (str): End date in YYYY-MM-DD format
+        frequency (str): pandas offset alias (e.g., "1D", "7D", "4h")
+    Returns:
+        pd.DatetimeIndex: Rebalance timestamps
+    """
+    return pd.date_range(start_date, end_date, freq=frequency)
+
+
+def bar_timeframe(frequency):
+    """
+    Picks the coarsest bar timeframe whose bars line up with every rebalance timestamp.
+    Calendar frequencies (e.g., "MS", "W-MON") rebalance at midnight and use daily bars.
+    Args:
+        frequency (str): pandas offset alias (e.g., "1D", "7D", "4h")
+    Returns:
+        str: Exchange timeframe (e.g., "1d", "4h")
+    Raises:
+        ValueError: If the frequency is not a whole number of minutes
+    """
+    try:
+        step = pd.Timedelta(pd.tseries.frequencies.to_offset(frequency))
+    except ValueError:
+        return "1d"
+    for timeframe in BAR_TIMEFRAMES:
+        if step % pd.Timedelta(timeframe) == pd.Timedelta(0):
+            return timeframe
+    raise ValueError(f"Rebalance frequency {frequency} does not line up with any bar timeframe (1m or coarser)")
+
+
+def signal_context(lookback_days, timeframe, batch_signals=False, prompt_file=None):
+    """
+    Digests the settings besides model, date and ticker that shape an analyst signal.
+    Args:
+        lookback_days (int): Days of history visible to the agents
+        timeframe (str): Bar timeframe of the price data
+        batch_signals (bool): Whether agents answer for a chunk of tickers per request
+        prompt_file (str): Persona file (default: PROMPTS_FILE or config/prompts.json)
+    Returns:
+        str: Hex digest identifying the context
+    """
+    prompt_file = prompt_file or os.getenv("PROMPTS_FILE", DEFAULT_PROMPT_FILE)
+    with open(prompt_file, "rb") as f:
+        personas = hashlib.sha256(f.read()).hexdigest()
+    payload = json.dumps({
+        "lookback_days": lookback_days,
+        "timeframe": timeframe,
+        "instruction": BATCH_INSTRUCTION if batch_signals else SIGNAL_INSTRUCTION,
+        "personas": personas,
+    }, sort_keys=True)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()[:16]
+
+
+def window_price_data(price_data, end, lookback):
+    """
+    Slices every ticker to the bars in [end - lookback, end) without copying.
+    The bar opening at `end` is excluded: it only closes after the rebalance.
+    Args:
+        price_data (dict): Dictionary of normalized DataFrames sorted by timestamp
+        end (pd.Timestamp): Last timestamp visible to the agents
+        lookback (pd.Timedelta): Window length
+    Returns:
+        dict: Dictionary mapping tickers to DataFrame slices (tickers with no bars are left out)
+    """
+    window = {}
+    for ticker, df in price_data.items():
+        ts = df["timestamp"].to_numpy(dtype="datetime64[ns]")
+        lo = np.searchsorted(ts, np.datetime64(end - lookback, "ns"))
+        hi = np.searchsorted(ts, np.datetime64(end, "ns"))
+        if hi > lo:
+            window[ticker] = df.iloc[lo:hi]
+    return window
+
+
+def run_walk_forward(
+    tickers: list[str],
+    start_date: str,
+    end_date: str,
+    selected_analysts: list[str] = None,
+    model_name: str = "gemini-2.0-flash",
+    model_provider: str = "Gemini",
+    frequency: str = "1D",
+    lookback_days: int = 90,
+    initial_cash: float = 100000.0,
+    params: dict = None,
+    store: SignalStore = None,
+    agent=None,
+    offline: bool = False,
+    parallel: bool = False,
+    batch_signals: bool = False,
+):
+    """
+    Replays the agent graph at each rebalance date over a rolling window and backtests its decisions.
+    Every (date, ticker, agent) signal is persisted under the run's signal_context; dates whose signals are all stored never reach
+    the graph again, so changing the portfolio rule or its parameters costs no LLM call. At a partially
+    stored date, each analyst only runs for the tickers it has no signal for. The Risk Manager is part of
+    every graph run, so it is asked again for the tickers of a run even when its own signal is stored.
+    Args:
+        tickers (list): List of crypto tickers (e.g., ["BTC", "ETH", "ADA"])
+        start_date (str): First rebalance date in YYYY-MM-DD format
+        end_date (str): Last rebalance date in YYYY-MM-DD format
+        selected_analysts (list): Analyst keys from ANALYST_ORDER (default: all)
+        model_name (str): Name of the LLM model
+        model_provider (str): Provider of the LLM model
+        frequency (str): Rebalance frequency as a pandas offset alias (default: 1D); prices are fetched
+            at the coarsest bar timeframe lining up with it (see bar_timeframe)
+        lookback_days (int): Days of history visible to the agents at each date (default: 90)
+        initial_cash (float): Initial cash of the backtest
+        params (dict): Portfolio rule parameters overriding tools.sweep.DEFAULT_PARAMS
+        store (SignalStore): Signal store (default: SignalStore at DEFAULT_SIGNAL_STORE)
+        agent: Compiled graph, or any object with invoke(state), used instead of the default workflow
+        offline (bool): Read price data from the local cache only
+        parallel (bool): Run the analysts in parallel branches of the workflow
+        batch_signals (bool): Have each agent cover a chunk of tickers per LLM request
+    Returns:
+        dict: results (backtest DataFrame), metrics, signal_history and graph_runs (graph invocations)
+    """
+    params = {**DEFAULT_PARAMS, **(params or {})}
+    if selected_analysts is None:
+        selected_analysts = [key for _, key in ANALYST_ORDER]
+    store = store or SignalStore()
+
+    # Agent name used in analyst_signals for each selected analyst
+    analyst_names = {key: func.__self__.name for key, (_, func) in get_analyst_nodes(selected_analysts).items()}
+    expected_agents = list(analyst_names.values()) + [RISK_MANAGER]
+
+    dates = rebalance_dates(start_date, end_date, frequency)
+    lookback = pd.Timedelta(days=lookback_days)
+    timeframe = bar_timeframe(frequency)
+    context = signal_context(lookback_days, timeframe, batch_signals)
+
+    # Fetch once for the whole replay; each date only sees a view of its window
+    fetch_start = (datetime.strptime(start_date, "%Y-%m-%d") - relativedelta(days=lookback_days)).strftime("%Y-%m-%d")
+    raw_data = fetch_crypto_data(tickers, fetch_start, end_date, timeframe=timeframe, cache=OHLCVCache(),
+                                 offline=offline)
+    price_data = {ticker: normalize_ohlcv_data(df, copy=False) for ticker, df in raw_data.items()}
+
+    stored = store.load(model_name, dates[0].isoformat(), dates[-1].isoformat(), context) if len(dates) else {}
+    portfolio = PositionLedger(tickers, cash=initial_cash).to_portfolio()
+    graphs = {}
+    signal_history = []
+    graph_runs = 0
+
+    progress.start()
+    try:
+        for date in dates:
+            key = date.isoformat()
+            known = stored.get(key, {})
+            window = window_price_data(price_data, date, lookback)
+
+            # Tickers are grouped by the analysts missing a signal for them, and each group only runs those
+            # analysts, so (analyst, ticker) pairs already stored are never asked again
+            groups = {}
+            for ticker in window:
+                run_analysts = tuple(a for a in selected_analysts if ticker not in known.get(analyst_names[a], {}))
+                if run_analysts or ticker not in known.get(RISK_MANAGER, {}):
+                    groups.setdefault(run_analysts, []).append(ticker)
+
+            for run_analysts, run_tickers in groups.items():
+                if agent is not None:
+                    graph = agent
+                else:
+                    if run_analysts not in graphs:
+                        graphs[run_analysts] = create_workflow(list(run_analysts), parallel=parallel).compile()
+                    graph = graphs[run_analysts]
+
+                state = create_initial_state(run_tickers, fetch_start, date.strftime("%Y-%m-%d"), portfolio,
+                                             {t: window[t] for t in run_tickers}, False, model_name, model_provider,
+                                             batch_signals)
+                final_state = graph.invoke(state)
+                fresh = final_state["data"]["analyst_signals"]
+                store.save(key, model_name, fresh, context)
+                graph_runs += 1
+
+                for agent_name, signals in fresh.items():
+                    for ticker, signal in signals.items():
+                        known.setdefault(agent_name, {}).setdefault(ticker, signal)
+
+            signal_history.append({
+                "timestamp": date,
+                "analyst_signals": {name: {t: s for t, s in known.get(name, {}).items() if t in window}
+                                    for name in expected_agents},
+            })
+    finally:
+        progress.stop()
+
+    signals = history_to_signals(signal_history, params["buy_threshold"], params["sell_threshold"],
+                                 params["position_size"])
+    backtester = Backtester(initial_cash=initial_cash, transaction_cost=params["transaction_cost"])
+    results = backtester.run_vectorized(signals, price_data) if price_data else pd.DataFrame()
+
+    return {
+        "results": results,
+        "metrics": backtester.calculate_metrics(results) if not results.empty else {},
+        "signal_history": signal_history,
+        "graph_runs": graph_runs,
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Walk-forward backtest of the crypto hedge fund agents")
+    parser.add_argument("--tickers", type=str, required=True, help="Comma-separated list of crypto ticker symbols")
+    parser.add_argument("--start-date", type=str, required=True, help="First rebalance date (YYYY-MM-DD)")
+    parser.add_argument("--end-date", type=str, required=True, help="Last rebalance date (YYYY-MM-DD)")
+    parser.add_argument("--analysts", type=str, help="Comma-separated analyst keys. Defaults to all analysts")
+    parser.add_argument("--model", type=str, default="gemini-2.0-flash", help="LLM model name")
+    parser.add_argument("--frequency", type=str, default="1D", help="Rebalance frequency. Defaults to 1D")
+    parser.add_argument("--lookback-days", type=int, default=90, help="Days of history per window. Defaults to 90")
+    parser.add_argument("--initial-cash", type=float, default=100000.0, help="Initial cash. Defaults to 100000.0")
+    parser.add_argument("--offline", action="store_true", help="Use cached price data only")
+    parser.add_argument("--parallel-analysts", action="store_true", help="Run the analysts in parallel branches")
+    parser.add_argument("--batch-prompts", action="store_true", help="One LLM request per agent and chunk of tickers")
+    parser.add_argument("--stream", action="store_true", help="Stream LLM responses and stop once the signal is parsed")
+    parser.add_argument("--llm-report", type=str, help="Write LLM latency, token and cost metrics to this .json or .csv file")
+
+    args = parser.parse_args()
+    if args.stream:
+        set_streaming(True)
+
+    model_info = get_model_info(args.model)
+    walk_forward = run_walk_forward(
+        tickers=[ticker.strip() for ticker in args.tickers.split(",")],
+        start_date=args.start_date,
+        end_date=args.end_date,
+        selected_analysts=[a.strip() for a in args.analysts.split(",")] if args.analysts else None,
+        model_name=args.model,
+        model_provider=model_info.provider.value if model_info else "Unknown",
+        frequency=args.frequency,
+        lookback_days=args.lookback_days,
+        initial_cash=args.initial_cash,
+        offline=args.offline,
+        parallel=args.parallel_analysts,
+        batch_signals=args.batch_prompts,
+    )
+
+    print(f"Graph runs: {walk_forward['graph_runs']} over {len(walk_forward['signal_history'])} rebalance dates")
+    for name, value in walk_forward["metrics"].items():
+        print(f"{name}: {value:.2f}")
+    if args.llm_report:
+        llm_metrics.report(args.llm_report)
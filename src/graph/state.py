@@ -1,8 +1,22 @@
 from dataclasses import dataclass
-from typing import Dict, List, TypedDict
+from typing import Annotated, Dict, List, TypedDict
 from langchain_core.messages import BaseMessage
 
+
+def merge_data(left: Dict, right: Dict) -> Dict:
+    """
+    Reducer for AgentState.data: later keys win, except analyst_signals, which is merged per agent and
+    ticker so analysts running in parallel branches do not overwrite each other's signals.
+    """
+    merged = {**left, **right}
+    signals = {agent: dict(by_ticker) for agent, by_ticker in left.get("analyst_signals", {}).items()}
+    for agent, by_ticker in right.get("analyst_signals", {}).items():
+        signals.setdefault(agent, {}).update(by_ticker)
+    merged["analyst_signals"] = signals
+    return merged
+
+
 class AgentState(TypedDict):
     messages: List[BaseMessage]
-    data: Dict
-    metadata: Dict
\ No newline at end of file
+    data: Annotated[Dict, merge_data]
+    metadata: Dict
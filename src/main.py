@@ -8,16 +8,23 @@ from langchain_core.messages import HumanMessage
 from langgraph.graph import END, StateGraph
 from colorama import Fore, Style, init
 import questionary
+import numpy as np
 
 from agents.portfolio_manager import portfolio_management_agent as ag
 
 from tools.data_fetcher import fetch_crypto_data
+from tools.ohlcv_cache import OHLCVCache
+from tools.price_store import PriceStore
 from tools.backtester import Backtester
+from tools.ledger import PositionLedger
 from agents.risk_manager import RiskManagerAgent
 from tools.utils import normalize_ohlcv_data
 from tools.display import print_trading_output
 from tools.analysts import ANALYST_ORDER, get_analyst_nodes
 from tools.progress import progress
+from tools.quorum import QuorumTracker
+from tools.llm_metrics import llm_metrics
+from tools.llm_interface import set_streaming
 from tools.models import LLM_ORDER, get_model_info
 from tools.visualize import save_graph_as_png
 from graph.state import AgentState
@@ -41,6 +48,33 @@ def parse_hedge_fund_response(response):
         print(f"Unexpected error while parsing response: {e}\nResponse: {repr(response)}")
         return None
 
+def create_initial_state(tickers, start_date, end_date, portfolio, price_data,
+                         show_reasoning=False, model_name="grok", model_provider="xAI", batch_signals=False,
+                         quorum=None):
+    """Builds the AgentState the workflow is invoked with (quorum: optional QuorumTracker shared by the agents)."""
+    return {
+        "messages": [
+            HumanMessage(
+                content="Make trading decisions based on the provided data.",
+            )
+        ],
+        "data": {
+            "tickers": tickers,
+            "portfolio": portfolio,
+            "start_date": start_date,
+            "end_date": end_date,
+            "price_data": price_data,
+            "analyst_signals": {},
+        },
+        "metadata": {
+            "show_reasoning": show_reasoning,
+            "model_name": model_name,
+            "model_provider": model_provider,
+            "batch_signals": batch_signals,
+            "quorum": quorum,
+        },
+    }
+
 def run_hedge_fund(
     tickers: list[str],
     start_date: str,
@@ -50,11 +84,22 @@ def run_hedge_fund(
     selected_analysts: list[str] = [],
     model_name: str = "grok",
     model_provider: str = "xAI",
+    offline: bool = False,
+    price_store: str | None = None,
+    parallel_analysts: bool = False,
+    batch_signals: bool = False,
+    quorum: bool = False,
 ):
-    # Fetch and normalize data
-    print("Fetching data...")
-    raw_data = fetch_crypto_data(tickers, start_date, end_date)
-    price_data = {ticker: normalize_ohlcv_data(df) for ticker, df in raw_data.items()}
+    if price_store:
+        # Open zero-copy views into a memory-mapped store (already normalized), cut to the same window as
+        # fetch_crypto_data (end_date inclusive up to its first bar) so no later bar is visible to the agents
+        end = np.datetime64(end_date, "ns") + np.timedelta64(1, "ns")
+        price_data = PriceStore(price_store).frames(tickers, np.datetime64(start_date, "ns"), end)
+    else:
+        # Fetch and normalize data, downloading only bars missing from the local cache
+        print("Fetching data...")
+        raw_data = fetch_crypto_data(tickers, start_date, end_date, cache=OHLCVCache(), offline=offline)
+        price_data = {ticker: normalize_ohlcv_data(df, copy=False) for ticker, df in raw_data.items()}
 
     # Start progress tracking
     progress.start()
@@ -62,38 +107,27 @@ def run_hedge_fund(
     try:
         # Create a new workflow if analysts are customized
         if selected_analysts:
-            workflow = create_workflow(selected_analysts)
+            workflow = create_workflow(selected_analysts, parallel=parallel_analysts)
             agent = workflow.compile()
         else:
             agent = app
 
+        # Quorum mode skips the analyst calls that can no longer change a ticker's decision
+        tracker = None
+        if quorum:
+            tracker = QuorumTracker.for_run(price_data, tickers, len(selected_analysts or ANALYST_ORDER))
+
         final_state = agent.invoke(
-            {
-                "messages": [
-                    HumanMessage(
-                        content="Make trading decisions based on the provided data.",
-                    )
-                ],
-                "data": {
-                    "tickers": tickers,
-                    "portfolio": portfolio,
-                    "start_date": start_date,
-                    "end_date": end_date,
-                    "price_data": price_data,
-                    "analyst_signals": {},
-                },
-                "metadata": {
-                    "show_reasoning": show_reasoning,
-                    "model_name": model_name,
-                    "model_provider": model_provider,
-                },
-            },
+            create_initial_state(tickers, start_date, end_date, portfolio, price_data,
+                                 show_reasoning, model_name, model_provider, batch_signals, tracker),
         )
 
         result = {
             "decisions": parse_hedge_fund_response(final_state["messages"][-1].content),
             "analyst_signals": final_state["data"]["analyst_signals"],
         }
+        if tracker is not None:
+            result["quorum"] = tracker.report()
 
         # Print all output using the display function
         print_trading_output(result)
@@ -108,8 +142,23 @@ def start(state: AgentState):
     """Initialize the workflow with the input message."""
     return state
 
-def create_workflow(selected_analysts=None):
-    """Create the workflow with selected analysts, executing them sequentially."""
+def isolate_analyst(node_func):
+    """
+    Wraps an analyst node for a parallel branch: the analyst writes into its own analyst_signals dict
+    and only its signals are returned, to be merged by the AgentState reducer.
+    """
+    def node(state: AgentState):
+        branch_state = {**state, "data": {**state["data"], "analyst_signals": {}}}
+        result = node_func(branch_state)
+        return {"data": {"analyst_signals": result["data"]["analyst_signals"]}}
+    return node
+
+def create_workflow(selected_analysts=None, parallel=False):
+    """
+    Create the workflow with selected analysts.
+    Analysts run one after another, or, with parallel=True, all branch from start_node and join at
+    risk_management_agent, so the analyst stage takes as long as its slowest member.
+    """
     workflow = StateGraph(AgentState)
     workflow.add_node("start_node", start)
 
@@ -120,20 +169,32 @@ def create_workflow(selected_analysts=None):
     if selected_analysts is None:
         selected_analysts = list(analyst_nodes.keys())
 
-    # Add selected analyst nodes and connect them sequentially
-    previous_node = "start_node"
-    for analyst_key in selected_analysts:
-        node_name, node_func = analyst_nodes[analyst_key]
-        workflow.add_node(node_name, node_func)
-        workflow.add_edge(previous_node, node_name)
-        previous_node = node_name
-
     # Add risk and portfolio management nodes
     workflow.add_node("risk_management_agent", RiskManagerAgent().generate_signal)
     workflow.add_node("portfolio_management_agent", ag)
 
-    # Connect the last analyst node to risk_management_agent, then to portfolio_management_agent
-    workflow.add_edge(previous_node, "risk_management_agent")
+    if parallel and selected_analysts:
+        # Fan out from start_node; the join edge waits for every analyst before risk management
+        node_names = []
+        for analyst_key in selected_analysts:
+            node_name, node_func = analyst_nodes[analyst_key]
+            workflow.add_node(node_name, isolate_analyst(node_func))
+            workflow.add_edge("start_node", node_name)
+            node_names.append(node_name)
+        workflow.add_edge(node_names, "risk_management_agent")
+    else:
+        # Add selected analyst nodes and connect them sequentially
+        previous_node = "start_node"
+        for analyst_key in selected_analysts:
+            node_name, node_func = analyst_nodes[analyst_key]
+            workflow.add_node(node_name, node_func)
+            workflow.add_edge(previous_node, node_name)
+            previous_node = node_name
+
+        # Connect the last analyst node to risk_management_agent
+        workflow.add_edge(previous_node, "risk_management_agent")
+
+    # Then to portfolio_management_agent
     workflow.add_edge("risk_management_agent", "portfolio_management_agent")
     workflow.add_edge("portfolio_management_agent", END)
 
@@ -175,6 +236,46 @@ if __name__ == "__main__":
         action="store_true",
         help="Show reasoning from each agent"
     )
+    parser.add_argument(
+        "--offline",
+        action="store_true",
+        help="Use cached price data only, without network access"
+    )
+    parser.add_argument(
+        "--price-store",
+        type=str,
+        help="Read prices from a memory-mapped PriceStore directory instead of fetching them"
+    )
+    parser.add_argument(
+        "--parallel-analysts",
+        action="store_true",
+        help="Run the selected analysts in parallel branches"
+    )
+    parser.add_argument(
+        "--batch-prompts",
+        action="store_true",
+        help="Send one LLM request per agent for a chunk of tickers instead of one per ticker"
+    )
+    parser.add_argument(
+        "--quorum",
+        action="store_true",
+        help="Skip analyst LLM calls for tickers whose decision is already settled by the signals received"
+    )
+    parser.add_argument(
+        "--stream",
+        action="store_true",
+        help="Stream LLM responses and stop generation as soon as the signal is parsed"
+    )
+    parser.add_argument(
+        "--llm-report",
+        type=str,
+        help="Write per-call LLM latency, token and cost metrics to this file (.json or .csv)"
+    )
+    parser.add_argument(
+        "--metrics-port",
+        type=int,
+        help="Serve LLM metrics in Prometheus text format at http://localhost:<port>/metrics"
+    )
     parser.add_argument(
         "--show-agent-graph",
         action="store_true",
@@ -235,7 +336,7 @@ if __name__ == "__main__":
             print(f"\nSelected model: {Fore.GREEN + Style.BRIGHT}{model_choice}{Style.RESET_ALL}\n")
 
     # Create the workflow with selected analysts
-    workflow = create_workflow(selected_analysts)
+    workflow = create_workflow(selected_analysts, parallel=args.parallel_analysts)
     app = workflow.compile()
 
     if args.show_agent_graph:
@@ -267,25 +368,17 @@ if __name__ == "__main__":
     else:
         start_date = args.start_date
 
-    # Initialize portfolio with cash amount and crypto positions
-    portfolio = {
-        "cash": args.initial_cash,
-        "margin_requirement": args.margin_requirement,
-        "positions": {
-            ticker: {
-                "long": 0,
-                "short": 0,
-                "long_cost_basis": 0.0,
-                "short_cost_basis": 0.0,
-            } for ticker in tickers
-        },
-        "realized_gains": {
-            ticker: {
-                "long": 0.0,
-                "short": 0.0,
-            } for ticker in tickers
-        }
-    }
+    # Initialize portfolio with cash amount and crypto positions, in the ledger's layout
+    portfolio = PositionLedger(
+        tickers,
+        cash=args.initial_cash,
+        margin_requirement=args.margin_requirement,
+    ).to_portfolio()
+
+    if args.metrics_port:
+        llm_metrics.serve(args.metrics_port)
+    if args.stream:
+        set_streaming(True)
 
     # Run the hedge fund
     result = run_hedge_fund(
@@ -297,4 +390,12 @@ if __name__ == "__main__":
         selected_analysts=selected_analysts,
         model_name=model_choice,
         model_provider=model_provider,
-    )
\ No newline at end of file
+        offline=args.offline,
+        price_store=args.price_store,
+        parallel_analysts=args.parallel_analysts,
+        batch_signals=args.batch_prompts,
+        quorum=args.quorum,
+    )
+    if args.llm_report:
+        llm_metrics.report(args.llm_report)
+        print(f"LLM metrics written to {args.llm_report}")
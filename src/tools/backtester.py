@@ -1,32 +1,132 @@
 import pandas as pd
 import numpy as np
 
+from tools.ledger import PositionLedger
+from tools.metrics import StreamingMetrics, infer_periods_per_year
+from tools.trade_log import TradeLog
+
+
+def align_price_matrix(price_data, column="close"):
+    """
+    Aligns every ticker's prices onto one sorted timestamp axis.
+    Args:
+        price_data (dict): Dictionary of DataFrames with OHLCV data for each ticker
+        column (str): Price column to align (default: close)
+    Returns:
+        tuple: (timestamps as datetime64[ns] array, list of tickers, timestamp x ticker float64 matrix
+               with NaN where a ticker has no bar)
+    """
+    tickers = list(price_data.keys())
+    ts_by_ticker = [price_data[t]["timestamp"].to_numpy(dtype="datetime64[ns]") for t in tickers]
+    timestamps = np.unique(np.concatenate(ts_by_ticker)) if tickers else np.empty(0, dtype="datetime64[ns]")
+
+    prices = np.full((len(timestamps), len(tickers)), np.nan)
+    for k, ticker in enumerate(tickers):
+        rows = np.searchsorted(timestamps, ts_by_ticker[k])
+        # Reverse so the first bar wins on duplicated timestamps, like a boolean scan would
+        prices[rows[::-1], k] = price_data[ticker][column].to_numpy(dtype=np.float64)[::-1]
+    return timestamps, tickers, prices
+
+
+def _forward_fill(values):
+    """Forward-fills NaNs down axis 0; leading NaNs stay NaN."""
+    steps = np.arange(len(values)).reshape((-1,) + (1,) * (values.ndim - 1))
+    filled = np.where(np.isnan(values), 0, steps)
+    np.maximum.accumulate(filled, axis=0, out=filled)
+    if values.ndim == 1:
+        return values[filled]
+    return np.take_along_axis(values, filled, axis=0)
+
+
 class Backtester:
-    def __init__(self, initial_cash=100000, transaction_cost=0.001):
+    def __init__(self, initial_cash=100000, transaction_cost=0.001, margin_requirement=0.0, trades=None):
         """
         Initializes the backtester.
         Args:
             initial_cash (float): Initial cash in the portfolio (default: $100,000)
             transaction_cost (float): Transaction cost per trade (default: 0.1%)
+            margin_requirement (float): Fraction of short proceeds held as margin (default: 0.0)
+            trades (TradeLog): Trade log to record fills in, e.g. one spilling to disk (default: in-memory log)
         """
         self.initial_cash = initial_cash
-        self.cash = initial_cash
         self.transaction_cost = transaction_cost
-        self.holdings = {}  # {ticker: quantity}
-        self.trades = []  # List of trades for logging
+        self.ledger = PositionLedger(cash=initial_cash, margin_requirement=margin_requirement,
+                                     transaction_cost=transaction_cost)
+        self.trades = trades if trades is not None else TradeLog()  # Columnar log of fills
         self.portfolio_values = []  # Track portfolio value over time
 
+    @property
+    def cash(self):
+        """Cash currently held by the ledger."""
+        return self.ledger.cash
+
+    @cash.setter
+    def cash(self, value):
+        self.ledger.cash = float(value)
+
+    @property
+    def holdings(self):
+        """
+        Long quantities by ticker, {ticker: quantity}.
+        The dict is a copy of the ledger: assign a whole dict to change positions, item assignment has no effect.
+        """
+        return {ticker: float(self.ledger.long[k]) for ticker, k in self.ledger.ticker_ids.items()
+                if self.ledger.long[k] > 0}
+
+    @holdings.setter
+    def holdings(self, value):
+        # Replaces every long position; tickers left out are closed and new positions start with no cost basis
+        ledger = self.ledger
+        ledger.add_tickers(value.keys())
+        held = np.zeros(len(ledger.tickers))
+        for ticker, quantity in value.items():
+            held[ledger.ticker_id(ticker)] = quantity
+        ledger.long_cost_basis[held <= 0] = 0.0
+        ledger.long[:] = np.maximum(held, 0.0)
+
+    def _execute(self, k, action, size, price):
+        """
+        Applies one signal to the ledger.
+        Buys and shorts commit `size` of current cash; sells and covers close `size` of the open position.
+        Returns:
+            tuple: (quantity, notional) of the fill, or None if nothing was traded
+        """
+        ledger = self.ledger
+        if action == 'buy':
+            quantity = ledger.cash * size / price
+            notional = ledger.buy(k, quantity, price)
+        elif action == 'sell':
+            quantity = ledger.long[k] * size
+            notional = ledger.sell(k, quantity, price)
+        elif action == 'short':
+            quantity = ledger.cash * size / price
+            notional = ledger.short_sell(k, quantity, price)
+        elif action == 'cover':
+            quantity = ledger.short[k] * size
+            notional = ledger.cover(k, quantity, price)
+        else:
+            return None
+        if notional == 0.0:
+            return None
+        return quantity, notional
+
+    def _log_trade(self, timestamp, action, asset, quantity, price):
+        """Records a fill; timestamp is in nanoseconds since epoch."""
+        self.trades.append(timestamp, action, asset, quantity, price, quantity * price * self.transaction_cost)
+
     def run(self, signals, price_data):
         """
         Runs the backtest based on trading signals and price data.
         Args:
-            signals (list): List of signal dicts with 'action', 'asset', 'size', 'confidence', 'timestamp'
+            signals (list): List of signal dicts with 'action' (buy, sell, short, cover or hold),
+                'asset', 'size', 'confidence', 'timestamp'
             price_data (dict): Dictionary of DataFrames with OHLCV data for each ticker
         Returns:
             pd.DataFrame: Backtest results with portfolio value, drawdowns, returns
         """
         # Sort signals by timestamp
         signals = sorted(signals, key=lambda x: x['timestamp'])
+        self.ledger.add_tickers(price_data.keys())
 
         # Initialize results DataFrame
         timestamps = price_data[list(price_data.keys())[0]]['timestamp']
@@ -52,47 +152,17 @@ class Backtester:
             price = price_row['close'].iloc[0]
 
             # Execute trade
-            if action == 'buy':
-                # Calculate amount to spend
-                amount_to_spend = self.cash * size
-                cost = amount_to_spend * (1 + self.transaction_cost)
-                if cost <= self.cash:
-                    quantity = amount_to_spend / price
-                    self.cash -= cost
-                    self.holdings[asset] = self.holdings.get(asset, 0) + quantity
-                    self.trades.append({
-                        'timestamp': timestamp,
-                        'action': 'buy',
-                        'asset': asset,
-                        'quantity': quantity,
-                        'price': price,
-                        'cost': cost
-                    })
-            elif action == 'sell':
-                # Calculate amount to sell
-                quantity_held = self.holdings.get(asset, 0)
-                quantity_to_sell = quantity_held * size
-                if quantity_to_sell > 0:
-                    revenue = quantity_to_sell * price * (1 - self.transaction_cost)
-                    self.cash += revenue
-                    self.holdings[asset] -= quantity_to_sell
-                    if self.holdings[asset] <= 0:
-                        del self.holdings[asset]
-                    self.trades.append({
-                        'timestamp': timestamp,
-                        'action': 'sell',
-                        'asset': asset,
-                        'quantity': quantity_to_sell,
-                        'price': price,
-                        'revenue': revenue
-                    })
+            fill = self._execute(self.ledger.ticker_id(asset), action, size, price)
+            if fill is not None:
+                self._log_trade(pd.Timestamp(timestamp).value, action, asset, fill[0], price)
 
             # Update portfolio value at this timestamp
-            holdings_value = 0
-            for asset, quantity in self.holdings.items():
-                asset_price = price_data[asset][price_data[asset]['timestamp'] == timestamp]['close']
+            holdings_value = self.ledger.margin_used
+            for k in np.flatnonzero(self.ledger.long - self.ledger.short):
+                held_df = price_data[self.ledger.tickers[k]]
+                asset_price = held_df[held_df['timestamp'] == timestamp]['close']
                 if not asset_price.empty:
-                    holdings_value += quantity * asset_price.iloc[0]
+                    holdings_value += self.ledger.net_position(k) * asset_price.iloc[0]
             total_value = self.cash + holdings_value
             results.loc[timestamp, 'portfolio_value'] = total_value
             results.loc[timestamp, 'cash'] = self.cash
@@ -101,6 +171,11 @@ class Backtester:
         # Forward-fill portfolio values for missing timestamps
         results = results.ffill()
 
+        return self._add_performance_columns(results)
+
+    @staticmethod
+    def _add_performance_columns(results):
+        """Adds returns, cumulative returns and drawdowns, then moves the timestamp index to a column."""
         # Calculate performance metrics
         results['returns'] = results['portfolio_value'].pct_change().fillna(0)
         results['cumulative_returns'] = (1 + results['returns']).cumprod() * 100 - 100  # In percentage
@@ -112,22 +187,290 @@ class Backtester:
 
         return results
 
-    def calculate_metrics(self, results):
+    def run_vectorized(self, signals, price_data):
+        """
+        Runs the backtest with the same semantics as run, over an aligned timestamp x ticker price matrix.
+        Price lookups, mark-to-market and result assembly are array operations; only the ledger
+        recurrence walks the signals, in O(1) per signal.
+        Args:
+            signals (list): List of signal dicts with 'action' (buy, sell, short, cover or hold),
+                'asset', 'size', 'confidence', 'timestamp'
+            price_data (dict): Dictionary of DataFrames with OHLCV data for each ticker
+        Returns:
+            pd.DataFrame: Backtest results with portfolio value, drawdowns, returns
+        """
+        timestamps, tickers, prices = align_price_matrix(price_data)
+        base_ts = price_data[list(price_data.keys())[0]]['timestamp']
+        return self.run_matrix(signals, timestamps, tickers, prices,
+                               base_timestamps=base_ts.to_numpy(dtype="datetime64[ns]"), index_name=base_ts.name)
+
+    def run_matrix(self, signals, timestamps, tickers, prices, base_timestamps=None, index_name="timestamp"):
+        """
+        Runs the vectorized backtest directly on an aligned price matrix, e.g. one shared between processes.
+        Args:
+            signals (list): List of signal dicts with 'action', 'asset', 'size', 'confidence', 'timestamp'
+            timestamps (np.ndarray): Sorted datetime64[ns] axis of the matrix
+            tickers (list): Ticker of each matrix column
+            prices (np.ndarray): Timestamp x ticker close prices, NaN where a ticker has no bar
+            base_timestamps (np.ndarray): Timestamps of the results index
+                (default: the bars of the first ticker, as in run)
+            index_name (str): Name of the results' timestamp column (default: timestamp)
+        Returns:
+            pd.DataFrame: Backtest results with portfolio value, drawdowns, returns
+        """
+        if base_timestamps is None:
+            base_timestamps = timestamps[~np.isnan(prices[:, 0])] if len(tickers) else timestamps
+
+        # Sort signals by timestamp
+        signals = sorted(signals, key=lambda x: x['timestamp'])
+
+        ticker_ids = {ticker: k for k, ticker in enumerate(tickers)}
+
+        # Turn signals into row/column index arrays into the price matrix
+        # Convert each distinct signal timestamp once; signals usually share a few rebalance times
+        n_signals = len(signals)
+        distinct = {}
+        codes = np.array([distinct.setdefault(s['timestamp'], len(distinct)) for s in signals], dtype=np.int64)
+        signal_ts = pd.to_datetime(list(distinct)).to_numpy(dtype="datetime64[ns]")[codes] \
+            if n_signals else np.empty(0, dtype="datetime64[ns]")
+        rows = np.minimum(np.searchsorted(timestamps, signal_ts), max(len(timestamps) - 1, 0))
+        cols = np.array([ticker_ids.get(s['asset'], -1) for s in signals], dtype=np.int64)
+        valid = (cols >= 0) & (len(timestamps) > 0)
+        if len(timestamps):
+            valid &= timestamps[rows] == signal_ts
+            signal_prices = np.where(valid, prices[rows, np.maximum(cols, 0)], np.nan)
+            valid &= ~np.isnan(signal_prices)
+        else:
+            signal_prices = np.full(n_signals, np.nan)
+
+        index = np.flatnonzero(valid)
+        cash_after = np.empty(len(index))
+        net_after = np.empty(len(index))
+        margin_after = np.empty(len(index))
+
+        # Matrix column -> ledger id; the ledger may already track other tickers from earlier runs
+        ledger = self.ledger
+        ledger_ids = ledger.add_tickers(tickers)
+        initial_net = ledger.long[ledger_ids] - ledger.short[ledger_ids]
+        cols_list = cols.tolist()
+        signal_ns = signal_ts.view(np.int64).tolist()
+        price_list = signal_prices.tolist()
+
+        for i, s in enumerate(index.tolist()):
+            signal = signals[s]
+            k = ledger_ids[cols_list[s]]
+            price = price_list[s]
+
+            fill = self._execute(k, signal['action'], signal['size'], price)
+            if fill is not None:
+                self._log_trade(signal_ns[s], signal['action'], tickers[cols_list[s]], fill[0], price)
+
+            cash_after[i] = ledger.cash
+            net_after[i] = ledger.long[k] - ledger.short[k]
+            margin_after[i] = ledger.margin_used
+
+        # Only the last signal of each timestamp is written to the results, as in run
+        valid_rows = rows[index]
+        last = np.r_[valid_rows[1:] != valid_rows[:-1], True] if len(index) else np.zeros(0, dtype=bool)
+        group = np.r_[0, np.cumsum(valid_rows[1:] != valid_rows[:-1])] if len(index) else np.zeros(0, dtype=np.int64)
+        group_rows = valid_rows[last]
+
+        # Net position snapshot after each timestamp: scatter the last update per (timestamp, ticker)
+        # below a row of starting holdings, then forward-fill each ticker's column
+        n_tickers = len(tickers)
+        key = group * n_tickers + cols[index]
+        _, last_update = np.unique(key[::-1], return_index=True)
+        last_update = len(key) - 1 - last_update
+        snapshot = np.full((len(group_rows) + 1, n_tickers), np.nan)
+        snapshot[0] = initial_net
+        snapshot[group[last_update] + 1, cols[index][last_update]] = net_after[last_update]
+        filled = np.where(np.isnan(snapshot), 0, np.arange(len(group_rows) + 1)[:, None])
+        np.maximum.accumulate(filled, axis=0, out=filled)
+        snapshot = snapshot[filled, np.arange(n_tickers)][1:]
+
+        # Assets without a bar at the timestamp contribute nothing, as in run
+        holdings_value = (snapshot * np.nan_to_num(prices[group_rows])).sum(axis=1) + margin_after[last]
+        group_cash = cash_after[last]
+
+        # Map matrix rows onto the first ticker's timestamps; unknown timestamps are appended like .loc would
+        base_values = base_timestamps
+        group_ts = timestamps[group_rows]
+        order = np.argsort(base_values, kind="stable")
+        pos = np.minimum(np.searchsorted(base_values[order], group_ts), max(len(base_values) - 1, 0))
+        found = (base_values[order][pos] == group_ts) if len(base_values) else np.zeros(len(group_ts), dtype=bool)
+        target = np.where(found, order[pos] if len(base_values) else 0, len(base_values) + np.cumsum(~found) - 1)
+
+        n_rows = len(base_values) + int((~found).sum())
+        portfolio_value = np.full(n_rows, float(self.initial_cash))
+        cash_column = np.full(n_rows, float(self.initial_cash))
+        holdings_column = np.zeros(n_rows)
+        portfolio_value[target] = group_cash + holdings_value
+        cash_column[target] = group_cash
+        holdings_column[target] = holdings_value
+
+        index_values = np.concatenate([base_values, group_ts[~found]])
+        results = pd.DataFrame({
+            'portfolio_value': portfolio_value,
+            'cash': cash_column,
+            'holdings_value': holdings_column,
+        }, index=pd.Index(index_values, name=index_name))
+
+        return self._add_performance_columns(results)
+
+    def run_streaming(self, signals, store, output_path=None, tickers=None, chunk_period="1D",
+                      periods_per_year=None):
+        """
+        Runs the backtest over a PriceStore in time-ordered chunks, so peak memory is set by the chunk length
+        rather than by the history length. The ledger, last prices, running peak and metrics are carried
+        across chunk boundaries, and each chunk's results are appended to a Parquet file.
+        Unlike run, every bar is marked to market (using each ticker's last close), not only signal bars.
+        Args:
+            signals: Signal dicts ('timestamp', 'asset', 'action', 'size') in time order, e.g. a generator
+                reading them from disk; a list is sorted first
+            store (PriceStore): Memory-mapped price store
+            output_path (str): Parquet file receiving the results columns of run (default: not written)
+            tickers (list): Tickers to trade (default: all tickers in the store)
+            chunk_period (str): Length of each chunk as a pandas offset alias (default: 1D)
+            periods_per_year (float): Bars per year used to annualize (default: inferred from the first chunk)
+        Returns:
+            dict: Performance metrics, as returned by calculate_metrics
+        """
+        tickers = [t for t in (tickers or store.tickers()) if t in store.index]
+        first, last = store.time_range(tickers)
+        if first is None:
+            return {}
+
+        if isinstance(signals, list):
+            signals = sorted(signals, key=lambda x: x['timestamp'])
+        signals = ((s, pd.Timestamp(s['timestamp']).value) for s in signals)
+        pending = next(signals, None)
+
+        ledger = self.ledger
+        ledger_ids = ledger.add_tickers(tickers)
+        columns = {ticker: j for j, ticker in enumerate(tickers)}
+        n_tickers = len(tickers)
+
+        # State carried from one chunk to the next
+        last_price = np.full(n_tickers, np.nan)
+        first_value = last_value = None
+        peak = -np.inf
+        metrics = None
+        writer = None
+
+        period = pd.Timedelta(chunk_period).to_timedelta64()
+        chunk_start = first
+        try:
+            while chunk_start <= last:
+                chunk_end = chunk_start + period
+                end_ns = chunk_end.astype("datetime64[ns]").astype(np.int64)
+
+                views = [store.arrays(ticker, chunk_start, chunk_end) for ticker in tickers]
+                chunk_signals = []
+                while pending is not None and pending[1] < end_ns:
+                    chunk_signals.append(pending)
+                    pending = next(signals, None)
+                chunk_start = chunk_end
+
+                timestamps = np.unique(np.concatenate([v["timestamp"] for v in views]))
+                n_rows = len(timestamps)
+                if n_rows == 0:
+                    continue
+                ts_ns = timestamps.view(np.int64)
+                bars = np.full((n_rows, n_tickers), np.nan)
+                for j, v in enumerate(views):
+                    bars[np.searchsorted(timestamps, v["timestamp"]), j] = v["close"]
+
+                # Row 0 holds the state carried in; row i + 1 the state after bar i's signals
+                cash_rows = np.full(n_rows + 1, np.nan)
+                margin_rows = np.full(n_rows + 1, np.nan)
+                net_rows = np.full((n_rows + 1, n_tickers), np.nan)
+                cash_rows[0] = ledger.cash
+                margin_rows[0] = ledger.margin_used
+                net_rows[0] = ledger.long[ledger_ids] - ledger.short[ledger_ids]
+                traded = 0.0
+
+                for signal, ns in chunk_signals:
+                    row = int(np.searchsorted(ts_ns, ns))
+                    j = columns.get(signal['asset'])
+                    if row == n_rows or ts_ns[row] != ns or j is None:
+                        continue
+                    price = bars[row, j]
+                    if np.isnan(price):
+                        continue
+                    k = ledger_ids[j]
+                    fill = self._execute(k, signal['action'], signal['size'], price)
+                    if fill is not None:
+                        self._log_trade(ns, signal['action'], signal['asset'], fill[0], price)
+                        traded += fill[1]
+                    cash_rows[row + 1] = ledger.cash
+                    margin_rows[row + 1] = ledger.margin_used
+                    net_rows[row + 1, j] = ledger.long[k] - ledger.short[k]
+
+                # Mark every bar to market with each ticker's last known close
+                prices = _forward_fill(np.vstack([last_price, bars]))
+                last_price = prices[-1]
+                net = _forward_fill(net_rows)[1:]
+                holdings_value = _forward_fill(margin_rows)[1:] + (net * np.nan_to_num(prices[1:])).sum(axis=1)
+                cash = _forward_fill(cash_rows)[1:]
+                values = cash + holdings_value
+
+                if metrics is None:
+                    if periods_per_year is None:
+                        periods_per_year = infer_periods_per_year(timestamps)
+                    metrics = StreamingMetrics(self.initial_cash, periods_per_year)
+                    first_value = last_value = values[0]
+                metrics.update_batch(values, holdings_value, traded)
+
+                previous = np.concatenate([[last_value], values[:-1]])
+                rolling_max = np.maximum.accumulate(np.concatenate([[peak], values]))[1:]
+                last_value, peak = values[-1], rolling_max[-1]
+
+                if output_path:
+                    with np.errstate(divide="ignore", invalid="ignore"):
+                        chunk = pd.DataFrame({
+                            'timestamp': timestamps,
+                            'portfolio_value': values,
+                            'cash': cash,
+                            'holdings_value': holdings_value,
+                            'returns': np.where(previous != 0, values / previous - 1, 0.0),
+                            'cumulative_returns': values / first_value * 100 - 100,
+                            'rolling_max': rolling_max,
+                            'drawdown': (values - rolling_max) / rolling_max * 100,
+                        })
+                    writer = self._write_chunk(writer, output_path, chunk)
+        finally:
+            if writer is not None:
+                writer.close()
+
+        return metrics.snapshot() if metrics is not None else {}
+
+    @staticmethod
+    def _write_chunk(writer, path, chunk):
+        """Appends a results chunk to a Parquet file, opening the writer on the first chunk."""
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        table = pa.Table.from_pandas(chunk, preserve_index=False)
+        if writer is None:
+            writer = pq.ParquetWriter(path, table.schema)
+        writer.write_table(table)
+        return writer
+
+    def calculate_metrics(self, results, periods_per_year=None):
         """
         Calculates performance metrics from backtest results.
         Args:
             results (pd.DataFrame): Backtest results DataFrame
+            periods_per_year (float): Bars per year used to annualize (default: inferred from the
+                timestamp spacing, counting 365 trading days)
         Returns:
-            dict: Performance metrics (e.g., Sharpe ratio, max drawdown)
-        """
-        total_return = (results['portfolio_value'].iloc[-1] / self.initial_cash - 1) * 100
-        annualized_return = ((1 + total_return / 100) ** (252 / len(results)) - 1) * 100
-        sharpe_ratio = results['returns'].mean() / results['returns'].std() * (252 ** 0.5) if results['returns'].std() != 0 else 0
-        max_drawdown = results['drawdown'].min()
-
-        return {
-            'total_return': total_return,
-            'annualized_return': annualized_return,
-            'sharpe_ratio': sharpe_ratio,
-            'max_drawdown': max_drawdown
-        }
\ No newline at end of file
+            dict: Performance metrics (e.g., Sharpe ratio, max drawdown); see StreamingMetrics.snapshot
+        """
+        if periods_per_year is None:
+            periods_per_year = infer_periods_per_year(results['timestamp'])
+
+        metrics = StreamingMetrics(self.initial_cash, periods_per_year)
+        traded = self.trades.total_cash_flow()
+        metrics.update_batch(results['portfolio_value'].to_numpy(dtype=np.float64),
+                             results['holdings_value'].to_numpy(dtype=np.float64), traded)
+        return metrics.snapshot()
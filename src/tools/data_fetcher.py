@@ -1,8 +1,147 @@
 import ccxt
+import numpy as np
 import pandas as pd
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
+from requests.adapters import HTTPAdapter
 
-def fetch_crypto_data(tickers, start_date, end_date, timeframe="1d"):
+from tools.ohlcv_cache import sort_unique_bars
+from tools.rate_limit import TokenBucket
+
+OHLCV_COLUMNS = ["timestamp", "open", "high", "low", "close", "volume"]
+
+# Binance serves at most 1000 klines per request
+DEFAULT_PAGE_LIMIT = 1000
+
+# Binance spot allows 6000 request weight per minute per IP; keep a safety margin
+BINANCE_WEIGHT_PER_MINUTE = 4800
+
+
+def binance_kline_weight(limit):
+    """
+    Returns the Binance request weight of a klines call for the given page size.
+    Args:
+        limit (int): Number of bars requested
+    Returns:
+        int: Request weight charged by Binance
+    """
+    if limit is None or limit > 1000:
+        return 10
+    if limit >= 500:
+        return 5
+    if limit >= 100:
+        return 2
+    return 1
+
+
+def create_exchange_session(max_workers=1):
+    """
+    Creates a Binance client whose HTTP connection pool can serve `max_workers` concurrent requests.
+    Args:
+        max_workers (int): Number of threads sharing the client
+    Returns:
+        ccxt.binance: Exchange client
+    """
+    # Request pacing is handled by our own token bucket when fetching concurrently
+    exchange = ccxt.binance({"enableRateLimit": max_workers <= 1})
+    if max_workers > 1:
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=max_workers)
+        exchange.session.mount("https://", adapter)
+    return exchange
+
+
+def iter_ohlcv_pages(exchange, symbol, timeframe, since, until, limit=DEFAULT_PAGE_LIMIT, rate_limiter=None):
+    """
+    Walks the `since` cursor from `since` to `until`, yielding one raw OHLCV page per request.
+    Args:
+        exchange (ccxt.Exchange): Exchange client exposing fetch_ohlcv
+        symbol (str): Exchange symbol (e.g., "BTC/USDT")
+        timeframe (str): Data timeframe (e.g., "1d", "1h", "1m")
+        since (int): Start timestamp in milliseconds (inclusive)
+        until (int): End timestamp in milliseconds (inclusive)
+        limit (int): Maximum number of bars requested per page
+        rate_limiter (TokenBucket): Optional shared budget charged with each request's weight
+    Yields:
+        list: Raw OHLCV rows [timestamp, open, high, low, close, volume] within [since, until]
+    """
+    timeframe_ms = ccxt.Exchange.parse_timeframe(timeframe) * 1000
+    cursor = since
+
+    while cursor <= until:
+        if rate_limiter is not None:
+            rate_limiter.acquire(binance_kline_weight(limit))
+        page = exchange.fetch_ohlcv(symbol, timeframe, since=cursor, limit=limit)
+        if not page:
+            break
+
+        last_ts = page[-1][0]
+        if last_ts > until:
+            page = [row for row in page if row[0] <= until]
+            if page:
+                yield page
+            break
+
+        yield page
+
+        # Stop if the exchange did not move the cursor forward
+        next_cursor = last_ts + timeframe_ms
+        if next_cursor <= cursor:
+            break
+        cursor = next_cursor
+
+
+def ohlcv_pages_to_array(pages):
+    """
+    Concatenates raw OHLCV pages into one sorted array in a single bulk step.
+    Args:
+        pages (iterable): Iterable of raw OHLCV pages as yielded by iter_ohlcv_pages
+    Returns:
+        np.ndarray: (N, 6) float64 array of [timestamp_ms, open, high, low, close, volume]
+    """
+    # Keep each page as a compact float64 block; concatenate once at the end
+    blocks = [np.asarray(page, dtype=np.float64) for page in pages]
+    if not blocks:
+        return np.empty((0, 6), dtype=np.float64)
+    values = np.concatenate(blocks) if len(blocks) > 1 else blocks[0]
+
+    # Restore order and drop duplicated bars from overlapping pages
+    return sort_unique_bars(values)
+
+
+def ohlcv_array_to_frame(values):
+    """
+    Wraps a raw OHLCV array into the DataFrame layout used across the project.
+    Args:
+        values (np.ndarray): (N, 6) float64 array of [timestamp_ms, open, high, low, close, volume]
+    Returns:
+        pd.DataFrame: DataFrame with columns timestamp, open, high, low, close, volume (empty if no rows)
+    """
+    if not len(values):
+        return pd.DataFrame(columns=OHLCV_COLUMNS)
+
+    return pd.DataFrame({
+        "timestamp": pd.to_datetime(values[:, 0].astype(np.int64), unit="ms"),
+        "open": values[:, 1],
+        "high": values[:, 2],
+        "low": values[:, 3],
+        "close": values[:, 4],
+        "volume": values[:, 5],
+    })
+
+
+def ohlcv_pages_to_frame(pages):
+    """
+    Builds a single OHLCV DataFrame from raw pages in one bulk construction step.
+    Args:
+        pages (iterable): Iterable of raw OHLCV pages as yielded by iter_ohlcv_pages
+    Returns:
+        pd.DataFrame: DataFrame with columns timestamp, open, high, low, close, volume (empty if no rows)
+    """
+    return ohlcv_array_to_frame(ohlcv_pages_to_array(pages))
+
+
+def fetch_crypto_data(tickers, start_date, end_date, timeframe="1d", page_limit=DEFAULT_PAGE_LIMIT, exchange=None,
+                      max_workers=1, rate_limiter=None, cache=None, offline=False):
     """
     Fetches historical OHLCV data for specified crypto tickers from Binance.
     Args:
@@ -10,6 +149,13 @@ def fetch_crypto_data(tickers, start_date, end_date, timeframe="1d"):
         start_date (str): Start date in YYYY-MM-DD format
         end_date (str): End date in YYYY-MM-DD format
         timeframe (str): Data timeframe (e.g., "1d" for daily, "1h" for hourly)
+        page_limit (int): Maximum number of bars requested per exchange call
+        exchange (ccxt.Exchange): Optional exchange client (default: a new ccxt.binance())
+        max_workers (int): Number of tickers fetched concurrently over the shared client (default: 1, serial)
+        rate_limiter (TokenBucket): Request-weight budget shared by all workers
+            (default: Binance's per-minute weight limit when max_workers > 1)
+        cache (OHLCVCache): Optional on-disk cache; only ranges missing from it are downloaded
+        offline (bool): Serve data from the cache only, never touching the network
     Returns:
         dict: Dictionary mapping tickers to pandas DataFrames with OHLCV data
     """
@@ -17,32 +163,54 @@ def fetch_crypto_data(tickers, start_date, end_date, timeframe="1d"):
     start_ts = int(datetime.strptime(start_date, "%Y-%m-%d").timestamp() * 1000)
     end_ts = int(datetime.strptime(end_date, "%Y-%m-%d").timestamp() * 1000)
 
-    # Initialize Binance exchange
-    binance = ccxt.binance()
+    if offline and cache is None:
+        raise ValueError("Offline mode requires an OHLCV cache")
 
-    # Map tickers to Binance symbols
-    ticker_to_symbol = {ticker: f"{ticker}/USDT" for ticker in tickers}
+    # Initialize Binance exchange, shared by every worker
+    binance = None
+    if not offline:
+        binance = exchange if exchange is not None else create_exchange_session(max_workers)
 
-    # Dictionary to store aggregated data for each ticker
-    result = {}
+    if max_workers > 1 and rate_limiter is None:
+        rate_limiter = TokenBucket(BINANCE_WEIGHT_PER_MINUTE / 60, capacity=BINANCE_WEIGHT_PER_MINUTE / 10)
 
-    for ticker in tickers:
-        symbol = ticker_to_symbol[ticker]
+    # ccxt loads markets lazily on the first call; loading them once here keeps workers from racing on it
+    if binance is not None and max_workers > 1 and hasattr(binance, "load_markets"):
         try:
-            ohlcv = binance.fetch_ohlcv(symbol, timeframe, since=start_ts, limit=None)
+            binance.load_markets()
+        except Exception as e:
+            print(f"❌ Error loading Binance markets: {e}")
 
-            if not ohlcv:
-                print(f"⚠️ Warning: No data fetched for {ticker} from Binance.")
-                continue
+    def fetch_ticker(ticker):
+        # Map ticker to Binance symbol
+        symbol = f"{ticker}/USDT"
+
+        def fetch_range(since, until):
+            pages = iter_ohlcv_pages(binance, symbol, timeframe, since, until, limit=page_limit,
+                                     rate_limiter=rate_limiter)
+            return ohlcv_pages_to_array(pages)
 
-            df = pd.DataFrame(ohlcv, columns=["timestamp", "open", "high", "low", "close", "volume"])
-            df["timestamp"] = pd.to_datetime(df["timestamp"], unit="ms")
+        try:
+            if cache is None:
+                values = fetch_range(start_ts, end_ts)
+            else:
+                values = cache.load(symbol, timeframe, start_ts, end_ts, fetch_range=None if offline else fetch_range)
+            df = ohlcv_array_to_frame(values)
 
-            # Sort by timestamp
-            df = df.sort_values("timestamp").reset_index(drop=True)
-            result[ticker] = df
+            if df.empty:
+                print(f"⚠️ Warning: No data fetched for {ticker} from Binance.")
+                return None
+            return df
 
         except Exception as e:
             print(f"❌ Error fetching {ticker} from Binance: {e}")
+            return None
+
+    if max_workers > 1:
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            frames = list(executor.map(fetch_ticker, tickers))
+    else:
+        frames = [fetch_ticker(ticker) for ticker in tickers]
 
-    return result
\ No newline at end of file
+    # Dictionary to store aggregated data for each ticker, in input order
+    return {ticker: df for ticker, df in zip(tickers, frames) if df is not None}
@@ -39,4 +39,12 @@ def print_trading_output(result):
                 signal = signals[ticker]
                 table.append([ticker, analyst, signal["action"], f"{signal['confidence'] * 100:.1f}%", signal.get("reasoning", "No reasoning provided.")])
     # Limit column widths for better readability
-    print(tabulate(table, headers=["Ticker", "Analyst", "Action", "Confidence", "Reasoning"], tablefmt="fancy_grid", maxcolwidths=[10, 20, 10, 10, 50]))
\ No newline at end of file
+    print(tabulate(table, headers=["Ticker", "Analyst", "Action", "Confidence", "Reasoning"], tablefmt="fancy_grid", maxcolwidths=[10, 20, 10, 10, 50]))
+
+    # Step 4: Calls skipped by the quorum, if enabled
+    quorum = result.get("quorum")
+    if quorum:
+        print(f"\nQuorum: {len(quorum['decided'])} ticker(s) decided early, {quorum['skipped_calls']} LLM call(s) skipped\n")
+        if quorum["skipped"]:
+            table = [[s["ticker"], s["agent"], s["reason"]] for s in quorum["skipped"]]
+            print(tabulate(table, headers=["Ticker", "Agent", "Skipped"], tablefmt="fancy_grid"))
\ No newline at end of file
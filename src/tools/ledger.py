@@ -0,0 +1,233 @@
+import numpy as np
+
+
+class PositionLedger:
+    """
+    Long/short position ledger stored as NumPy arrays indexed by ticker id.
+
+    Every fill updates a fixed number of array slots and scalars, so accounting costs O(1) per trade
+    and allocates nothing. Cost bases are average cost per unit including fees. Short sales lock
+    `margin_requirement` x proceeds out of cash until the position is covered.
+
+    Fills are only executed by the Backtester. The live graph never updates positions: it receives the
+    portfolio exported by to_portfolio and only returns decisions.
+    """
+
+    def __init__(self, tickers=(), cash=0.0, margin_requirement=0.0, transaction_cost=0.0):
+        """
+        Initializes the ledger.
+        Args:
+            tickers (iterable): Tickers tracked by the ledger
+            cash (float): Starting cash
+            margin_requirement (float): Fraction of short proceeds held as margin (default: 0.0)
+            transaction_cost (float): Fee rate charged on every fill (default: 0.0)
+        """
+        self.tickers = []
+        self.ticker_ids = {}
+        self.cash = float(cash)
+        self.margin_requirement = float(margin_requirement)
+        self.transaction_cost = float(transaction_cost)
+        self.margin_used = 0.0
+
+        self.long = np.zeros(0)
+        self.short = np.zeros(0)
+        self.long_cost_basis = np.zeros(0)
+        self.short_cost_basis = np.zeros(0)
+        self.short_margin = np.zeros(0)
+        self.realized_long = np.zeros(0)
+        self.realized_short = np.zeros(0)
+        self.add_tickers(tickers)
+
+    def add_tickers(self, tickers):
+        """Adds tickers not tracked yet, with flat positions. Returns the list of their ids."""
+        new = [t for t in dict.fromkeys(tickers) if t not in self.ticker_ids]
+        if new:
+            for ticker in new:
+                self.ticker_ids[ticker] = len(self.tickers)
+                self.tickers.append(ticker)
+            pad = np.zeros(len(new))
+            for name in ("long", "short", "long_cost_basis", "short_cost_basis", "short_margin",
+                         "realized_long", "realized_short"):
+                setattr(self, name, np.concatenate([getattr(self, name), pad]))
+        return [self.ticker_ids[t] for t in tickers]
+
+    def ticker_id(self, ticker):
+        """Returns the array index of a ticker."""
+        return self.ticker_ids[ticker]
+
+    def buy(self, k, quantity, price):
+        """
+        Opens or adds to a long position if cash covers the cost and fees.
+        Args:
+            k (int): Ticker id
+            quantity (float): Units to buy
+            price (float): Fill price
+        Returns:
+            float: Cash spent including fees (0.0 if rejected)
+        """
+        cost = quantity * price * (1 + self.transaction_cost)
+        if quantity <= 0 or cost > self.cash:
+            return 0.0
+        held = self.long[k]
+        self.long_cost_basis[k] = (held * self.long_cost_basis[k] + cost) / (held + quantity)
+        self.long[k] = held + quantity
+        self.cash -= cost
+        return cost
+
+    def sell(self, k, quantity, price):
+        """
+        Reduces a long position, realizing gains against the average cost basis.
+        Args:
+            k (int): Ticker id
+            quantity (float): Units to sell (capped at the long position)
+            price (float): Fill price
+        Returns:
+            float: Cash received net of fees (0.0 if nothing was sold)
+        """
+        quantity = min(quantity, self.long[k])
+        if quantity <= 0:
+            return 0.0
+        revenue = quantity * price * (1 - self.transaction_cost)
+        self.realized_long[k] += revenue - quantity * self.long_cost_basis[k]
+        self.long[k] -= quantity
+        if self.long[k] <= 0:
+            self.long[k] = 0.0
+            self.long_cost_basis[k] = 0.0
+        self.cash += revenue
+        return revenue
+
+    def short_sell(self, k, quantity, price):
+        """
+        Opens or adds to a short position if cash covers the margin requirement.
+        Args:
+            k (int): Ticker id
+            quantity (float): Units to short
+            price (float): Fill price
+        Returns:
+            float: Proceeds net of fees (0.0 if rejected)
+        """
+        proceeds = quantity * price * (1 - self.transaction_cost)
+        margin = quantity * price * self.margin_requirement
+        if quantity <= 0 or margin > self.cash:
+            return 0.0
+        held = self.short[k]
+        self.short_cost_basis[k] = (held * self.short_cost_basis[k] + proceeds) / (held + quantity)
+        self.short[k] = held + quantity
+        self.short_margin[k] += margin
+        self.margin_used += margin
+        self.cash += proceeds - margin
+        return proceeds
+
+    def cover(self, k, quantity, price):
+        """
+        Reduces a short position, releasing its margin pro rata and realizing gains.
+        Args:
+            k (int): Ticker id
+            quantity (float): Units to buy back (capped at the short position)
+            price (float): Fill price
+        Returns:
+            float: Cash spent including fees (0.0 if nothing was covered)
+        """
+        held = self.short[k]
+        quantity = min(quantity, held)
+        if quantity <= 0:
+            return 0.0
+        cost = quantity * price * (1 + self.transaction_cost)
+        self.realized_short[k] += quantity * self.short_cost_basis[k] - cost
+        if held - quantity <= 0:
+            released = self.short_margin[k]
+            self.short[k] = 0.0
+            self.short_cost_basis[k] = 0.0
+            self.short_margin[k] = 0.0
+        else:
+            released = self.short_margin[k] * quantity / held
+            self.short[k] = held - quantity
+            self.short_margin[k] -= released
+        self.margin_used -= released
+        self.cash += released - cost
+        return cost
+
+    def net_position(self, k):
+        """Returns long minus short units held for a ticker."""
+        return self.long[k] - self.short[k]
+
+    def unrealized_pnl(self, prices):
+        """
+        Computes unrealized P&L per ticker.
+        Args:
+            prices (np.ndarray): Current price per ticker id (NaN for unknown)
+        Returns:
+            np.ndarray: Unrealized P&L per ticker id (0.0 where the price is unknown)
+        """
+        prices = np.asarray(prices, dtype=np.float64)
+        pnl = self.long * (prices - self.long_cost_basis) + self.short * (self.short_cost_basis - prices)
+        return np.nan_to_num(pnl)
+
+    def positions_value(self, prices):
+        """
+        Computes the value of all positions plus margin held; tickers without a price contribute nothing.
+        Args:
+            prices (np.ndarray): Current price per ticker id (NaN for unknown)
+        Returns:
+            float: Long value minus short liability plus margin held
+        """
+        prices = np.nan_to_num(np.asarray(prices, dtype=np.float64))
+        return float((self.long - self.short) @ prices) + self.margin_used
+
+    def equity(self, prices):
+        """Returns cash plus positions_value(prices)."""
+        return self.cash + self.positions_value(prices)
+
+    def to_portfolio(self):
+        """
+        Exports the ledger in the portfolio dict layout used by the agent graph.
+        Returns:
+            dict: Portfolio with cash, margin, positions and realized gains per ticker
+        """
+        return {
+            "cash": self.cash,
+            "margin_requirement": self.margin_requirement,
+            "margin_used": self.margin_used,
+            "positions": {
+                ticker: {
+                    "long": float(self.long[k]),
+                    "short": float(self.short[k]),
+                    "long_cost_basis": float(self.long_cost_basis[k]),
+                    "short_cost_basis": float(self.short_cost_basis[k]),
+                    "short_margin_used": float(self.short_margin[k]),
+                } for ticker, k in self.ticker_ids.items()
+            },
+            "realized_gains": {
+                ticker: {
+                    "long": float(self.realized_long[k]),
+                    "short": float(self.realized_short[k]),
+                } for ticker, k in self.ticker_ids.items()
+            }
+        }
+
+    @classmethod
+    def from_portfolio(cls, portfolio, transaction_cost=0.0):
+        """
+        Builds a ledger from a portfolio dict as produced by to_portfolio or main.py.
+        Args:
+            portfolio (dict): Portfolio with cash, margin_requirement, positions and realized_gains
+            transaction_cost (float): Fee rate charged on every fill (default: 0.0)
+        Returns:
+            PositionLedger: The ledger
+        """
+        positions = portfolio.get("positions", {})
+        ledger = cls(positions.keys(), cash=portfolio.get("cash", 0.0),
+                     margin_requirement=portfolio.get("margin_requirement", 0.0),
+                     transaction_cost=transaction_cost)
+        for ticker, position in positions.items():
+            k = ledger.ticker_ids[ticker]
+            ledger.long[k] = position.get("long", 0)
+            ledger.short[k] = position.get("short", 0)
+            ledger.long_cost_basis[k] = position.get("long_cost_basis", 0.0)
+            ledger.short_cost_basis[k] = position.get("short_cost_basis", 0.0)
+            ledger.short_margin[k] = position.get("short_margin_used", 0.0)
+            gains = portfolio.get("realized_gains", {}).get(ticker, {})
+            ledger.realized_long[k] = gains.get("long", 0.0)
+            ledger.realized_short[k] = gains.get("short", 0.0)
+        ledger.margin_used = float(ledger.short_margin.sum())
+        return ledger
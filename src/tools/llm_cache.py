@@ -0,0 +1,192 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+
+DEFAULT_LLM_CACHE = "data/llm_cache.sqlite"
+
+# Entries older than this are treated as misses (seconds; None keeps them forever)
+DEFAULT_TTL = 7 * 24 * 3600
+
+DEFAULT_MAX_ENTRIES = 100_000
+
+
+def prompt_text(prompt):
+    """
+    Serializes a prompt deterministically for hashing.
+    Args:
+        prompt: String, list of LangChain messages, or any JSON-serializable prompt
+    Returns:
+        str: Canonical text of the prompt
+    """
+    if isinstance(prompt, str):
+        return prompt
+    if isinstance(prompt, (list, tuple)):
+        return json.dumps([[getattr(m, "type", None), getattr(m, "content", m)] for m in prompt],
+                          sort_keys=True, default=str)
+    return json.dumps(prompt, sort_keys=True, default=str)
+
+
+def cache_key(model_name, model_provider, prompt, pydantic_model):
+    """
+    Content address of an LLM call: SHA-256 of the model, provider, prompt and output schema.
+    Args:
+        model_name (str): Name of the model
+        model_provider (str): Provider of the model
+        prompt: The prompt sent to the model
+        pydantic_model: Pydantic model class the output is parsed into
+    Returns:
+        str: Hex digest
+    """
+    payload = json.dumps([
+        model_name,
+        getattr(model_provider, "value", model_provider),
+        prompt_text(prompt),
+        pydantic_model.model_json_schema(),
+    ], sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class LLMCache:
+    """
+    SQLite-backed cache of parsed LLM responses, with TTL expiry and LRU eviction.
+
+    Values are stored as the pydantic model's JSON and validated back into the model on a hit, so a cached
+    call returns the same object type as a live one. The number of entries is counted once at open and kept
+    up to date on every write, so eviction never scans the table. Safe to share between threads.
+    """
+
+    def __init__(self, path=DEFAULT_LLM_CACHE, ttl=DEFAULT_TTL, max_entries=DEFAULT_MAX_ENTRIES):
+        """
+        Opens (and creates if needed) the cache.
+        Args:
+            path (str): SQLite file path (default: data/llm_cache.sqlite)
+            ttl (float): Seconds an entry stays valid; None disables expiry (default: 7 days)
+            max_entries (int): Entries kept before the least recently used are evicted (default: 100,000)
+        """
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._lock = threading.Lock()
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS responses (
+                key TEXT PRIMARY KEY,
+                model TEXT NOT NULL,
+                response TEXT NOT NULL,
+                created REAL NOT NULL,
+                accessed REAL NOT NULL
+            )
+            """
+        )
+        self.conn.execute("CREATE INDEX IF NOT EXISTS responses_accessed ON responses (accessed)")
+        self.conn.commit()
+        self.entries = self.conn.execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+
+    def get(self, key, pydantic_model):
+        """
+        Looks up a response.
+        Args:
+            key (str): Key from cache_key
+            pydantic_model: Pydantic model class to validate the stored JSON into
+        Returns:
+            The cached pydantic object, or None on a miss or an expired entry
+        """
+        now = time.time()
+        with self._lock:
+            row = self.conn.execute("SELECT response, created FROM responses WHERE key = ?", (key,)).fetchone()
+            if row is None or (self.ttl is not None and now - row[1] > self.ttl):
+                if row is not None:
+                    with self.conn:
+                        self.entries -= self.conn.execute("DELETE FROM responses WHERE key = ?", (key,)).rowcount
+                self.misses += 1
+                return None
+            try:
+                value = pydantic_model.model_validate_json(row[0])
+            except ValueError:
+                # Schema drifted under an identical hash (e.g., a validator changed); treat as a miss
+                self.misses += 1
+                return None
+            with self.conn:
+                self.conn.execute("UPDATE responses SET accessed = ? WHERE key = ?", (now, key))
+            self.hits += 1
+            return value
+
+    def put(self, key, model_name, value):
+        """
+        Stores a parsed response, evicting the least recently used entries beyond max_entries.
+        Args:
+            key (str): Key from cache_key
+            model_name (str): Model that produced the response (kept for inspection)
+            value: Pydantic object to store
+        """
+        now = time.time()
+        response = value.model_dump_json()
+        with self._lock, self.conn:
+            inserted = self.conn.execute("INSERT OR IGNORE INTO responses VALUES (?, ?, ?, ?, ?)",
+                                         (key, model_name, response, now, now)).rowcount
+            if inserted:
+                self.entries += 1
+            else:
+                self.conn.execute("UPDATE responses SET model = ?, response = ?, created = ?, accessed = ? "
+                                  "WHERE key = ?", (model_name, response, now, now, key))
+            if self.max_entries is not None and self.entries > self.max_entries:
+                evicted = self.conn.execute(
+                    "DELETE FROM responses WHERE key IN (SELECT key FROM responses ORDER BY accessed LIMIT ?)",
+                    (self.entries - self.max_entries,),
+                ).rowcount
+                self.entries -= evicted
+                self.evictions += evicted
+
+    def clear(self):
+        """Removes every entry."""
+        with self._lock, self.conn:
+            self.conn.execute("DELETE FROM responses")
+            self.entries = 0
+
+    def stats(self):
+        """
+        Returns cache counters.
+        Returns:
+            dict: hits, misses, evictions, hit_rate and the number of stored entries
+        """
+        with self._lock:
+            entries = self.conn.execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "entries": entries,
+        }
+
+    def close(self):
+        self.conn.close()
+
+
+_default_cache = None
+_default_cache_lock = threading.Lock()
+
+
+def get_llm_cache():
+    """
+    Returns the process-wide cache at DEFAULT_LLM_CACHE, opening it on first use.
+    Setting LLM_CACHE_DISABLED (e.g., in .env) bypasses caching for every call.
+    Returns:
+        LLMCache: The shared cache, or None when caching is disabled
+    """
+    global _default_cache
+    if os.getenv("LLM_CACHE_DISABLED"):
+        return None
+    with _default_cache_lock:
+        if _default_cache is None:
+            _default_cache = LLMCache()
+        return _default_cache
@@ -1,10 +1,239 @@
+import asyncio
+import concurrent.futures
 import json
+import os
+import threading
+import time
+import weakref
 from typing import TypeVar, Type, Optional, Any
+from langchain_core.messages import HumanMessage
 from pydantic import BaseModel
+from tools.llm_cache import LLMCache, cache_key, get_llm_cache
+from tools.llm_metrics import estimate_tokens, llm_metrics, token_usage
 from tools.progress import progress
+from tools.prompts import cacheable_prompt, plain_text
+from tools.resilience import RetryPolicy, is_parse_error, provider_guard
 
 T = TypeVar('T', bound=BaseModel)
 
+# Maximum in-flight requests per provider; providers not listed use DEFAULT_CONCURRENCY
+DEFAULT_CONCURRENCY = 8
+PROVIDER_CONCURRENCY = {
+    "Anthropic": 8,
+    "DeepSeek": 8,
+    "Gemini": 8,
+    "Groq": 4,
+    "OpenAI": 16,
+    # Offline provider (tools.local_llm): no remote limit, high enough to load-test the pipeline
+    "Local": 64,
+}
+
+# Semaphores are bound to an event loop, so they are created per loop and per provider
+_semaphores = weakref.WeakKeyDictionary()
+
+# Backoff between attempts of call_llm and acall_llm
+RETRY_POLICY = RetryPolicy()
+
+# Stream completions and stop them once the answer is parsed (see call_llm); LLM_STREAM=1 enables it by default
+STREAM_RESPONSES = bool(os.getenv("LLM_STREAM"))
+
+# Appended to streamed prompts, which go out without JSON mode: a fenced answer is complete at its closing brace
+STREAM_ANSWER_FORMAT = ("Write your final answer as a single JSON object with the keys {fields}, "
+                        "inside a ```json fenced code block, and write nothing after it.")
+
+_loop = None
+_loop_lock = threading.Lock()
+
+
+def set_provider_concurrency(model_provider: str, limit: int):
+    """Sets the maximum number of concurrent requests sent to a provider."""
+    PROVIDER_CONCURRENCY[getattr(model_provider, "value", model_provider)] = limit
+    _semaphores.clear()
+
+
+def set_streaming(enabled: bool):
+    """Sets whether call_llm and acall_llm stream completions when their stream argument is not given."""
+    global STREAM_RESPONSES
+    STREAM_RESPONSES = bool(enabled)
+
+
+def provider_semaphore(model_provider: str) -> asyncio.Semaphore:
+    """Returns the running loop's semaphore limiting concurrent requests to a provider."""
+    provider = getattr(model_provider, "value", model_provider)
+    per_loop = _semaphores.setdefault(asyncio.get_running_loop(), {})
+    if provider not in per_loop:
+        per_loop[provider] = asyncio.Semaphore(PROVIDER_CONCURRENCY.get(provider, DEFAULT_CONCURRENCY))
+    return per_loop[provider]
+
+
+def _background_loop() -> asyncio.AbstractEventLoop:
+    """Event loop running in a daemon thread, shared by every synchronous batch call."""
+    global _loop
+    with _loop_lock:
+        if _loop is None:
+            _loop = asyncio.new_event_loop()
+            threading.Thread(target=_loop.run_forever, name="llm-event-loop", daemon=True).start()
+        return _loop
+
+
+def _lookup(prompt, model_name, model_provider, pydantic_model, cache, use_cache):
+    """Returns (cache, key, cached response or None) for a call."""
+    cache = (cache or get_llm_cache()) if use_cache else None
+    if cache is None:
+        return None, None, None
+    key = cache_key(model_name, model_provider, prompt, pydantic_model)
+    return cache, key, cache.get(key, pydantic_model)
+
+
+def _structured_model(model_name, model_provider, pydantic_model):
+    """Returns (model info, client), with structured output enabled for models supporting JSON mode."""
+    from tools.models import get_model, get_model_info
+
+    model_info = get_model_info(model_name)
+    llm = get_model(model_name, model_provider)
+
+    # For non-JSON support models, we can use structured output (the raw message is kept for its token usage)
+    if not (model_info and not model_info.has_json_mode()):
+        llm = llm.with_structured_output(pydantic_model, method="json_mode", include_raw=True)
+    return model_info, llm
+
+
+def _model_for(stream, model_name, model_provider, pydantic_model):
+    """
+    Returns (streaming, model info, client). Streamed calls use the plain client and parse the text themselves;
+    their prompt asks for a fenced JSON answer instead (see _request).
+    """
+    streaming = STREAM_RESPONSES if stream is None else stream
+    if not streaming:
+        return (False, *_structured_model(model_name, model_provider, pydantic_model))
+    from tools.models import get_model
+    return True, None, get_model(model_name, model_provider)
+
+
+def _request(prompt, model_provider, streaming, pydantic_model):
+    """
+    Builds what is sent for a prompt: cache breakpoints (see cacheable_prompt) and, for streamed calls,
+    STREAM_ANSWER_FORMAT appended to the final user message so the system prefix stays identical across calls.
+    """
+    request = cacheable_prompt(prompt, model_provider)
+    if not streaming:
+        return request
+    answer_format = STREAM_ANSWER_FORMAT.format(fields=", ".join(_required_fields(pydantic_model)))
+    if not isinstance(request, (list, tuple)):
+        return f"{request}\n\n{answer_format}"
+    last = request[-1] if request else None
+    if isinstance(last, HumanMessage) and isinstance(last.content, str):
+        return [*request[:-1], HumanMessage(content=f"{last.content}\n\n{answer_format}")]
+    return [*request, HumanMessage(content=answer_format)]
+
+
+def _required_fields(pydantic_model):
+    return tuple(name for name, field in pydantic_model.model_fields.items() if field.is_required())
+
+
+def _stream_response(llm, request, pydantic_model):
+    """Streams a completion until its answer is complete. Returns (message received so far, parser)."""
+    parser = IncrementalResponseParser(_required_fields(pydantic_model))
+    message = None
+    chunks = llm.stream(request)
+    try:
+        for chunk in chunks:
+            message = chunk if message is None else message + chunk
+            if parser.feed(chunk_text(chunk)) is not None:
+                break
+    finally:
+        # Closing the stream drops the connection, so the provider stops generating
+        close = getattr(chunks, "close", None)
+        if close is not None:
+            close()
+    return message, parser
+
+
+async def _astream_response(llm, request, pydantic_model):
+    """Async variant of _stream_response built on astream."""
+    parser = IncrementalResponseParser(_required_fields(pydantic_model))
+    message = None
+    chunks = llm.astream(request)
+    try:
+        async for chunk in chunks:
+            message = chunk if message is None else message + chunk
+            if parser.feed(chunk_text(chunk)) is not None:
+                break
+    finally:
+        close = getattr(chunks, "aclose", None)
+        if close is not None:
+            await close()
+    return message, parser
+
+
+def _parse_stream(parser, pydantic_model):
+    parsed = parser.finish()
+    return pydantic_model.model_validate(parsed) if parsed is not None else None
+
+
+def _stream_usage(prompt, message, parser):
+    """(input, output) tokens of a streamed call; estimated when the stream was closed before usage was reported."""
+    usage = token_usage(message)
+    tokens_in = usage[0] if usage and usage[0] else estimate_tokens(plain_text(prompt))
+    tokens_out = usage[1] if usage and usage[1] else estimate_tokens(parser.text)
+    return tokens_in, tokens_out
+
+
+def _parse_result(result, model_info, pydantic_model):
+    """Turns a raw LLM result into the pydantic model, or None if it could not be parsed."""
+    # For non-JSON support models, we need to extract and parse the response manually
+    if model_info and not model_info.has_json_mode():
+        if model_info.is_deepseek():
+            parsed_result = extract_json_from_deepseek_response(result.content)
+        elif model_info.is_gemini():
+            # Gemini might return JSON in ```json ... ``` format or plain text
+            parsed_result = parse_gemini_response(result.content)
+        else:
+            parsed_result = None
+        if parsed_result is None:
+            # Bare JSON without a ```json fence (e.g., a {"signals": [...]} batch answer)
+            parsed_result = extract_json_object(result.content, _required_fields(pydantic_model))
+        return pydantic_model(**parsed_result) if parsed_result else None
+    # Structured output returns {"raw", "parsed", "parsing_error"}; parsed is None when the JSON was invalid
+    return result["parsed"] if isinstance(result, dict) else result
+
+
+def _usage(prompt, response):
+    """(input, output) tokens of a response, as reported by the provider or else estimated from the text."""
+    usage = token_usage(response)
+    if usage is not None:
+        return usage
+    raw = response.get("raw") if isinstance(response, dict) else response
+    return estimate_tokens(plain_text(prompt)), estimate_tokens(str(getattr(raw, "content", raw)))
+
+
+def _record_call(started, timer, agent_name, ticker, model_name, model_provider, tokens=(0, 0), attempts=1,
+                 outcome="ok"):
+    llm_metrics.record(started, agent_name, ticker, model_name, model_provider, time.perf_counter() - timer,
+                       tokens[0], tokens[1], cache_hit=outcome == "cache_hit", retries=max(attempts - 1, 0),
+                       default=outcome == "default", outcome=outcome)
+
+
+def _store(cache, key, model_name, result, pydantic_model):
+    # Default responses are never cached, so a failed call is retried on the next run
+    if cache is not None and isinstance(result, pydantic_model):
+        cache.put(key, model_name, result)
+
+
+def _report_retry(agent_name, attempt, max_retries):
+    if agent_name:
+        progress.update_status(agent_name, None, f"Error - retry {attempt + 1}/{max_retries}")
+
+
+def _substitute_default(error, guard, attempts, pydantic_model, default_factory):
+    """Returns the default response after a call failed for good, counting the substitution."""
+    guard.count("defaults")
+    if error is not None:
+        print(f"Error in LLM call after {attempts} attempts: {error}")
+    if default_factory:
+        return default_factory()
+    return create_default_response(pydantic_model)
+
 
 def call_llm(
         prompt: Any,
@@ -13,10 +242,21 @@ def call_llm(
         pydantic_model: Type[T],
         agent_name: Optional[str] = None,
         max_retries: int = 3,
-        default_factory=None
+        default_factory=None,
+        cache: Optional[LLMCache] = None,
+        use_cache: bool = True,
+        ticker: Optional[str] = None,
+        stream: Optional[bool] = None
 ) -> T:
     """
     Makes an LLM call with retry logic, handling both Deepseek and non-Deepseek models.
+    Calls go through the provider's shared guard (rate limit, 429 cooldown, circuit breaker); failed
+    requests are retried with exponential backoff and jitter, honoring Retry-After. A system message leading
+    the prompt is marked cacheable for providers supporting prompt caching (see tools.prompts). Latency, tokens, cost,
+    cache hits, retries and defaults of every call are recorded in llm_metrics.
+    Streamed calls go out without JSON mode, so their prompt asks for a ```json fenced answer (STREAM_ANSWER_FORMAT).
+    They parse the answer (JSON object, fenced or not, or **Signal:** lines) as tokens arrive and close the stream
+    as soon as every required field is complete, instead of waiting for the end of the completion.
     Args:
         prompt: The prompt to send to the LLM
         model_name: Name of the model to use
@@ -25,50 +265,225 @@ def call_llm(
         agent_name: Optional name of the agent for progress updates
         max_retries: Maximum number of retries (default: 3)
         default_factory: Optional factory function to create default response on failure
+        cache: Response cache to use (default: the shared cache from get_llm_cache)
+        use_cache: Set to False to bypass the cache and always call the provider
+        ticker: Optional ticker the call is about, used to tag its metrics (see tools.llm_metrics)
+        stream: Stream the completion and stop it once the answer is parsed (default: STREAM_RESPONSES)
     Returns:
         An instance of the specified Pydantic model
     """
-    from tools.models import get_model, get_model_info
+    started, timer = time.time(), time.perf_counter()
 
-    model_info = get_model_info(model_name)
-    llm = get_model(model_name, model_provider)
+    # Identical (model, provider, prompt, schema) calls are answered from the cache
+    cache, key, cached = _lookup(prompt, model_name, model_provider, pydantic_model, cache, use_cache)
+    if cached is not None:
+        _record_call(started, timer, agent_name, ticker, model_name, model_provider, outcome="cache_hit")
+        return cached
 
-    # For non-JSON support models, we can use structured output
-    if not (model_info and not model_info.has_json_mode()):
-        llm = llm.with_structured_output(pydantic_model, method="json_mode")
+    streaming, model_info, llm = _model_for(stream, model_name, model_provider, pydantic_model)
+    guard = provider_guard(model_provider)
+    # The cache key above is computed on the prompt as written; breakpoints and the streamed answer format
+    # only change what is sent
+    request = _request(prompt, model_provider, streaming, pydantic_model)
 
     # Call the LLM with retries
-    result = None
+    error = None
+    tokens_in = tokens_out = attempts = 0
     for attempt in range(max_retries):
+        attempts = attempt + 1
         try:
-            # Call the LLM
-            result = llm.invoke(prompt)
-
-            # For non-JSON support models, we need to extract and parse the response manually
-            if model_info and not model_info.has_json_mode():
-                if model_info.is_deepseek():
-                    parsed_result = extract_json_from_deepseek_response(result.content)
-                elif model_info.is_gemini():
-                    # Gemini might return JSON in ```json ... ``` format or plain text
-                    parsed_result = parse_gemini_response(result.content)
-                else:
-                    parsed_result = None
+            guard.acquire()
+            if streaming:
+                response, parser = _stream_response(llm, request, pydantic_model)
+            else:
+                response = llm.invoke(request)
+        except Exception as e:
+            error = e
+            if is_parse_error(e):
+                # The provider answered (e.g., structured output failing validation): ask again right away
+                guard.record_success()
+                _report_retry(agent_name, attempt, max_retries)
+                continue
+            if not guard.record_failure(e):
+                break
+            _report_retry(agent_name, attempt, max_retries)
+            if attempt < max_retries - 1:
+                guard.count("retries")
+                time.sleep(RETRY_POLICY.delay(attempt, e))
+            continue
 
-                if parsed_result:
-                    return pydantic_model(**parsed_result)
+        guard.record_success()
+        used_in, used_out = _stream_usage(prompt, response, parser) if streaming else _usage(prompt, response)
+        tokens_in, tokens_out = tokens_in + used_in, tokens_out + used_out
+        try:
+            if streaming:
+                result = _parse_stream(parser, pydantic_model)
             else:
-                return result
+                result = _parse_result(response, model_info, pydantic_model)
+        except Exception as e:
+            result, error = None, e
+        if result is not None:
+            _store(cache, key, model_name, result, pydantic_model)
+            _record_call(started, timer, agent_name, ticker, model_name, model_provider, (tokens_in, tokens_out),
+                         attempts)
+            return result
+        # Unparseable answers are asked again right away; the provider itself is healthy
+        error = error or ValueError("Could not parse the LLM response")
+        _report_retry(agent_name, attempt, max_retries)
 
+    _record_call(started, timer, agent_name, ticker, model_name, model_provider, (tokens_in, tokens_out),
+                 attempts, outcome="default")
+    return _substitute_default(error, guard, attempts, pydantic_model, default_factory)
+
+
+async def acall_llm(
+        prompt: Any,
+        model_name: str,
+        model_provider: str,
+        pydantic_model: Type[T],
+        agent_name: Optional[str] = None,
+        max_retries: int = 3,
+        default_factory=None,
+        cache: Optional[LLMCache] = None,
+        use_cache: bool = True,
+        ticker: Optional[str] = None,
+        stream: Optional[bool] = None
+) -> T:
+    """
+    Async variant of call_llm built on ainvoke (astream for streamed calls). Requests in flight are limited per provider
+    (see PROVIDER_CONCURRENCY), so many calls can be awaited together without flooding a provider. Cache reads and
+    writes and client creation run in worker threads (asyncio.to_thread), so disk I/O never blocks the event loop.
+    Awaited from another event loop, the call runs on the shared background loop, the only loop the pooled
+    clients' async connections are used from.
+    Args:
+        Same as call_llm
+    Returns:
+        An instance of the specified Pydantic model
+    """
+    loop = _background_loop()
+    if asyncio.get_running_loop() is not loop:
+        return await asyncio.wrap_future(asyncio.run_coroutine_threadsafe(
+            acall_llm(prompt, model_name, model_provider, pydantic_model, agent_name, max_retries, default_factory,
+                      cache, use_cache, ticker, stream), loop))
+
+    started, timer = time.time(), time.perf_counter()
+    # SQLite and client construction block, so they run in worker threads instead of stalling the shared loop
+    cache, key, cached = await asyncio.to_thread(_lookup, prompt, model_name, model_provider, pydantic_model,
+                                                 cache, use_cache)
+    if cached is not None:
+        _record_call(started, timer, agent_name, ticker, model_name, model_provider, outcome="cache_hit")
+        return cached
+
+    streaming, model_info, llm = await asyncio.to_thread(_model_for, stream, model_name, model_provider,
+                                                          pydantic_model)
+    guard = provider_guard(model_provider)
+    request = _request(prompt, model_provider, streaming, pydantic_model)
+
+    error = None
+    tokens_in = tokens_out = attempts = 0
+    for attempt in range(max_retries):
+        attempts = attempt + 1
+        try:
+            # The concurrency slot is only held during the request, not while backing off
+            async with provider_semaphore(model_provider):
+                await guard.acquire_async()
+                try:
+                    if streaming:
+                        response, parser = await _astream_response(llm, request, pydantic_model)
+                    else:
+                        response = await llm.ainvoke(request)
+                except asyncio.CancelledError:
+                    # A cancelled request (e.g., dropped by the quorum) gives no verdict on the provider, but must
+                    # not keep the half-open probe slot, or the circuit would reject every later call
+                    guard.breaker.release()
+                    raise
         except Exception as e:
-            if agent_name:
-                progress.update_status(agent_name, None, f"Error - retry {attempt + 1}/{max_retries}")
-            if attempt == max_retries - 1:
-                print(f"Error in LLM call after {max_retries} attempts: {e}")
-                if default_factory:
-                    return default_factory()
-                return create_default_response(pydantic_model)
+            error = e
+            if is_parse_error(e):
+                # The provider answered (e.g., structured output failing validation): ask again right away
+                guard.record_success()
+                _report_retry(agent_name, attempt, max_retries)
+                continue
+            if not guard.record_failure(e):
+                break
+            _report_retry(agent_name, attempt, max_retries)
+            if attempt < max_retries - 1:
+                guard.count("retries")
+                await asyncio.sleep(RETRY_POLICY.delay(attempt, e))
+            continue
+
+        guard.record_success()
+        used_in, used_out = _stream_usage(prompt, response, parser) if streaming else _usage(prompt, response)
+        tokens_in, tokens_out = tokens_in + used_in, tokens_out + used_out
+        try:
+            if streaming:
+                result = _parse_stream(parser, pydantic_model)
+            else:
+                result = _parse_result(response, model_info, pydantic_model)
+        except Exception as e:
+            result, error = None, e
+        if result is not None:
+            await asyncio.to_thread(_store, cache, key, model_name, result, pydantic_model)
+            _record_call(started, timer, agent_name, ticker, model_name, model_provider, (tokens_in, tokens_out),
+                         attempts)
+            return result
+        error = error or ValueError("Could not parse the LLM response")
+        _report_retry(agent_name, attempt, max_retries)
+
+    _record_call(started, timer, agent_name, ticker, model_name, model_provider, (tokens_in, tokens_out),
+                 attempts, outcome="default")
+    return _substitute_default(error, guard, attempts, pydantic_model, default_factory)
+
+
+async def acall_llm_batch(prompts: list, model_name: str, model_provider: str, pydantic_model: Type[T],
+                          tickers: Optional[list] = None, **kwargs) -> list[T]:
+    """
+    Runs acall_llm for every prompt concurrently.
+    Args:
+        prompts: Prompts to send
+        model_name: Name of the model to use
+        model_provider: Provider of the model
+        pydantic_model: The Pydantic model class to structure the output
+        tickers: Optional ticker of each prompt, used to tag its metrics
+        **kwargs: Forwarded to acall_llm (agent_name, max_retries, default_factory, cache, use_cache, stream)
+    Returns:
+        list: One pydantic object per prompt, in prompt order
+    """
+    tickers = tickers or [None] * len(prompts)
+    return list(await asyncio.gather(
+        *(acall_llm(prompt, model_name, model_provider, pydantic_model, ticker=ticker, **kwargs)
+          for prompt, ticker in zip(prompts, tickers))
+    ))
 
-    return create_default_response(pydantic_model)
+
+def submit_llm(prompt: Any, model_name: str, model_provider: str, pydantic_model: Type[T],
+               **kwargs) -> concurrent.futures.Future:
+    """
+    Starts acall_llm on the shared background event loop without waiting for it.
+    Cancelling the returned future cancels the call, even while its request is in flight.
+    Args:
+        Same as acall_llm
+    Returns:
+        concurrent.futures.Future: Resolves to the pydantic object
+    """
+    coroutine = acall_llm(prompt, model_name, model_provider, pydantic_model, **kwargs)
+    return asyncio.run_coroutine_threadsafe(coroutine, _background_loop())
+
+
+def call_llm_batch(prompts: list, model_name: str, model_provider: str, pydantic_model: Type[T],
+                   **kwargs) -> list[T]:
+    """
+    Synchronous entry point for acall_llm_batch, usable from agent nodes.
+    The calls run on a shared background event loop, so provider limits hold across every agent and thread.
+    Args:
+        Same as acall_llm_batch
+    Returns:
+        list: One pydantic object per prompt, in prompt order
+    """
+    if not prompts:
+        return []
+    coroutine = acall_llm_batch(prompts, model_name, model_provider, pydantic_model, **kwargs)
+    return asyncio.run_coroutine_threadsafe(coroutine, _background_loop()).result()
 
 
 def parse_gemini_response(content: str) -> Optional[dict]:
@@ -149,6 +564,8 @@ def create_default_response(model_class: Type[T]) -> T:
             default_values[field_name] = 0
         elif hasattr(field.annotation, "__origin__") and field.annotation.__origin__ == dict:
             default_values[field_name] = {}
+        elif hasattr(field.annotation, "__origin__") and field.annotation.__origin__ == list:
+            default_values[field_name] = []
         else:
             if hasattr(field.annotation, "__args__"):
                 default_values[field_name] = field.annotation.__args__[0]
@@ -169,4 +586,202 @@ def extract_json_from_deepseek_response(content: str) -> Optional[dict]:
                 return json.loads(json_text)
     except Exception as e:
         print(f"Error extracting JSON from Deepseek response: {e}")
-    return None
\ No newline at end of file
+    return None
+
+def extract_json_object(content: str, required_fields=()) -> Optional[dict]:
+    """
+    Extracts the answer object of a complete response, fenced or bare (see IncrementalResponseParser).
+    Args:
+        content (str): The raw response
+        required_fields (tuple): Keys the object must contain
+    Returns:
+        dict: The parsed object, or None
+    """
+    parser = IncrementalResponseParser(required_fields)
+    parser.feed(content)
+    return parser.finish()
+
+
+def chunk_text(chunk) -> str:
+    """Text of a streamed message chunk (string content, or the text blocks of a content list)."""
+    content = getattr(chunk, "content", chunk)
+    if isinstance(content, list):
+        return "".join(block.get("text", "") if isinstance(block, dict) else str(block) for block in content)
+    return content or ""
+
+
+class IncrementalResponseParser:
+    """
+    Parses a streamed completion as it arrives, so generation can stop once the answer is complete.
+
+    Recognizes a JSON object and the plain-text "**Signal:** ... **Confidence:** ... **Reasoning:** ..." format
+    handled by parse_gemini_response. Like parse_gemini_response, a ```json fence takes precedence: once one has
+    opened, only an object inside it is accepted, and the answer is complete at its closing brace. Bare objects
+    may be drafts of a fenced answer still to come, so they are only used by finish() when the text has no fence
+    (the last complete one wins). A plain-text answer is complete once action, confidence and reasoning are known
+    and the reasoning has been closed by a Signal or Confidence line; other **Key:** lines are reasoning text.
+    """
+
+    FENCE = "```json"
+    # Keys that end a reasoning section (see parse_gemini_response)
+    SIGNAL_KEYS = ("signal", "trading signal", "confidence", "reasoning")
+
+    def __init__(self, required_fields=("action", "confidence", "reasoning")):
+        """
+        Initializes the parser.
+        Args:
+            required_fields (tuple): Keys the parsed answer must contain to be complete
+        """
+        self.required_fields = tuple(required_fields)
+        self.text = ""
+        self.result = None
+        # JSON scan state: start of the current object, brace depth, string and escape flags, scan position
+        self._start = None
+        self._depth = 0
+        self._in_string = False
+        self._escaped = False
+        self._pos = 0
+        # End of the ```json marker once seen, and where to look for it next
+        self._fence = None
+        self._fence_search = 0
+        self._bare = None
+        # Plain-text state: fields found so far and the reasoning being collected
+        self._fields = {}
+        self._reasoning = []
+        self._in_reasoning = False
+        self._line_start = 0
+        self._signal_format = {"action", "confidence", "reasoning"} >= set(self.required_fields)
+
+    def feed(self, text: str) -> Optional[dict]:
+        """
+        Adds streamed text.
+        Args:
+            text (str): Next piece of the completion
+        Returns:
+            dict: The parsed answer once it is complete, otherwise None
+        """
+        if self.result is not None or not text:
+            return self.result
+        self.text += text
+        self.result = self._scan_json()
+        if self.result is None and self._signal_format:
+            self.result = self._scan_lines()
+        return self.result
+
+    def finish(self) -> Optional[dict]:
+        """
+        Parses whatever was received once the stream has ended.
+        Returns:
+            dict: The parsed answer, or None if the text holds no complete answer
+        """
+        if self.result is not None:
+            return self.result
+        if self._fence is None and self._bare is not None:
+            self.result = self._bare
+            return self.result
+        if self._signal_format:
+            self._scan_lines(final=True)
+            if self._in_reasoning and self._reasoning:
+                self._fields["reasoning"] = " ".join(self._reasoning)
+            if self._complete(self._fields):
+                self.result = dict(self._fields)
+                return self.result
+            parsed = parse_gemini_response(self.text)
+            if parsed is not None and self._complete(parsed):
+                self.result = parsed
+        return self.result
+
+    def _complete(self, parsed):
+        return isinstance(parsed, dict) and all(field in parsed for field in self.required_fields)
+
+    def _find_fence(self):
+        # The marker may arrive split across chunks, so the search restarts a few characters back
+        found = self.text.find(self.FENCE, max(0, self._fence_search - len(self.FENCE) + 1))
+        if found == -1:
+            self._fence_search = len(self.text)
+            return
+        self._fence = found + len(self.FENCE)
+        if self._pos < self._fence or (self._start is not None and self._start < self._fence):
+            # Whatever was open before the fence was a draft: restart the scan inside the fence
+            self._start, self._depth, self._in_string, self._escaped = None, 0, False, False
+            self._pos = max(self._pos, self._fence)
+
+    def _scan_json(self):
+        if self._fence is None:
+            self._find_fence()
+        text = self.text
+        for i in range(self._pos, len(text)):
+            c = text[i]
+            if self._start is None:
+                if c == "{":
+                    self._start, self._depth = i, 1
+                continue
+            if self._in_string:
+                if self._escaped:
+                    self._escaped = False
+                elif c == "\\":
+                    self._escaped = True
+                elif c == '"':
+                    self._in_string = False
+            elif c == '"':
+                self._in_string = True
+            elif c == "{":
+                self._depth += 1
+            elif c == "}":
+                self._depth -= 1
+                if self._depth == 0:
+                    candidate = text[self._start:i + 1]
+                    self._start = None
+                    try:
+                        parsed = json.loads(candidate)
+                    except ValueError:
+                        continue
+                    if not self._complete(parsed):
+                        continue
+                    if self._fence is not None:
+                        self._pos = i + 1
+                        return parsed
+                    self._bare = parsed
+        self._pos = len(text)
+        return None
+
+    def _scan_lines(self, final=False):
+        while True:
+            end = self.text.find("\n", self._line_start)
+            if end == -1:
+                if not final or self._line_start >= len(self.text):
+                    return None
+                end = len(self.text)
+            line = self.text[self._line_start:end].strip()
+            self._line_start = end + 1
+
+            key, value = None, None
+            if line.startswith("**"):
+                stripped = line.replace("**", "").strip()
+                key, _, value = stripped.partition(":")
+                key, value = key.strip().lower(), value.strip()
+                if key not in self.SIGNAL_KEYS:
+                    key = None
+
+            if key is None:
+                # Bold subheadings (e.g., "**1. Trend:** rising") belong to the reasoning
+                if self._in_reasoning and line:
+                    self._reasoning.append(line)
+            else:
+                if self._in_reasoning:
+                    self._in_reasoning = False
+                    if self._reasoning:
+                        self._fields["reasoning"] = " ".join(self._reasoning)
+                if key in ("signal", "trading signal"):
+                    self._fields["action"] = value.lower()
+                elif key == "confidence":
+                    try:
+                        self._fields["confidence"] = float(value)
+                    except ValueError:
+                        pass
+                else:
+                    self._in_reasoning = True
+                    self._reasoning = [value] if value else []
+
+            if not self._in_reasoning and self._complete(self._fields):
+                return dict(self._fields)
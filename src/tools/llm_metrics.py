@@ -0,0 +1,284 @@
+import json
+import threading
+from collections import deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import numpy as np
+import pandas as pd
+
+# USD per million tokens (input, output); models not listed are counted at zero cost, see set_model_price
+MODEL_PRICES = {
+    "claude-3-5-haiku-latest": (0.80, 4.00),
+    "claude-3-5-sonnet-latest": (3.00, 15.00),
+    "claude-3-7-sonnet-latest": (3.00, 15.00),
+    "deepseek-reasoner": (0.55, 2.19),
+    "deepseek-chat": (0.27, 1.10),
+    "gemini-2.0-flash": (0.10, 0.40),
+    "grok-2-latest": (2.00, 10.00),
+    "gpt-4.5-preview": (75.00, 150.00),
+    "gpt-4o": (2.50, 10.00),
+}
+
+# Upper bounds (seconds) of the latency histogram exposed to Prometheus
+LATENCY_BUCKETS = (0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+# Calls kept for percentiles and reports; older ones still count in the Prometheus totals
+DEFAULT_MAX_RECORDS = 1_000_000
+
+RECORD_FIELDS = ("timestamp", "agent", "ticker", "model", "provider", "latency", "tokens_in", "tokens_out", "cost",
+                 "cache_hit", "retries", "default", "outcome")
+
+def estimate_tokens(text):
+    """Rough token count of a prompt (about four characters per token)."""
+    return len(text) // 4 + 1
+
+
+def set_model_price(model_name, input_per_million, output_per_million):
+    """Sets the USD price per million input and output tokens used to estimate the cost of a model's calls."""
+    MODEL_PRICES[model_name] = (input_per_million, output_per_million)
+
+
+def estimate_cost(model_name, tokens_in, tokens_out):
+    """Estimated USD cost of a call from the MODEL_PRICES table."""
+    price_in, price_out = MODEL_PRICES.get(model_name, (0.0, 0.0))
+    return (tokens_in * price_in + tokens_out * price_out) / 1e6
+
+
+def token_usage(response):
+    """
+    Reads the token usage reported with a LangChain response.
+    Args:
+        response: AIMessage, or the {"raw", "parsed"} dict of a structured call made with include_raw
+    Returns:
+        tuple: (input tokens, output tokens), or None when the provider did not report usage
+    """
+    if isinstance(response, dict):
+        response = response.get("raw")
+    usage = getattr(response, "usage_metadata", None)
+    if not usage:
+        return None
+    return int(usage.get("input_tokens", 0)), int(usage.get("output_tokens", 0))
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _labels(**labels):
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in labels.items()) + "}"
+
+
+class LLMMetrics:
+    """
+    Thread-safe record of every LLM call: latency, tokens, estimated cost, cache hits, retries and
+    fallbacks to the default response, tagged by agent, ticker, model and provider.
+
+    Individual calls are kept (up to max_records) for percentiles and run reports; running totals per
+    agent, model and provider back the Prometheus exposition, which leaves tickers out to bound cardinality.
+    """
+
+    def __init__(self, max_records=DEFAULT_MAX_RECORDS):
+        """
+        Initializes an empty recorder.
+        Args:
+            max_records (int): Calls kept in memory for summaries and reports (default: 1,000,000)
+        """
+        self.records = deque(maxlen=max_records)
+        self.totals = {}
+        self.lock = threading.Lock()
+
+    def record(self, timestamp, agent, ticker, model, provider, latency, tokens_in=0, tokens_out=0,
+               cache_hit=False, retries=0, default=False, outcome="ok"):
+        """
+        Records one call.
+        Args:
+            timestamp (float): Start of the call (epoch seconds)
+            agent (str): Agent that made the call
+            ticker (str): Ticker(s) the call was about
+            model (str): Model name
+            provider (str): Provider name
+            latency (float): Wall time of the call including retries, in seconds
+            tokens_in (int): Prompt tokens
+            tokens_out (int): Completion tokens
+            cache_hit (bool): Answered from the response cache
+            retries (int): Attempts beyond the first
+            default (bool): The default response was substituted after the call failed
+            outcome (str): ok, cache_hit or default
+        """
+        provider = getattr(provider, "value", provider)
+        cost = 0.0 if cache_hit else estimate_cost(model, tokens_in, tokens_out)
+        row = (timestamp, agent, ticker, model, provider, latency, tokens_in, tokens_out, cost, cache_hit, retries,
+               default, outcome)
+        with self.lock:
+            self.records.append(row)
+            key = (agent or "", model or "", provider or "", outcome)
+            totals = self.totals.get(key)
+            if totals is None:
+                totals = self.totals[key] = {"calls": 0, "tokens_in": 0, "tokens_out": 0, "cost": 0.0, "retries": 0,
+                                             "latency_sum": 0.0, "buckets": [0] * len(LATENCY_BUCKETS)}
+            totals["calls"] += 1
+            totals["tokens_in"] += tokens_in
+            totals["tokens_out"] += tokens_out
+            totals["cost"] += cost
+            totals["retries"] += retries
+            totals["latency_sum"] += latency
+            for i, bound in enumerate(LATENCY_BUCKETS):
+                if latency <= bound:
+                    totals["buckets"][i] += 1
+
+    def reset(self):
+        """Forgets every recorded call."""
+        with self.lock:
+            self.records.clear()
+            self.totals.clear()
+
+    def to_frame(self):
+        """Returns the recorded calls as a DataFrame, one row per call (columns: RECORD_FIELDS)."""
+        with self.lock:
+            rows = list(self.records)
+        frame = pd.DataFrame(rows, columns=list(RECORD_FIELDS))
+        frame["timestamp"] = pd.to_datetime(frame["timestamp"], unit="s")
+        return frame
+
+    def summary(self, by=("agent", "model", "provider")):
+        """
+        Aggregates the recorded calls.
+        Args:
+            by (tuple): Tags to group by, among agent, ticker, model and provider; () for one overall row
+        Returns:
+            pd.DataFrame: calls, latency p50/p95/p99 and mean (seconds), tokens_in, tokens_out, cost (USD),
+                          cache_hits, cache_hit_rate, retries and defaults per group
+        """
+        frame = self.to_frame()
+        by = list(by)
+        if frame.empty:
+            return pd.DataFrame(columns=by + ["calls"])
+        # Latency percentiles describe provider calls; cache hits would drag them towards zero
+        live = frame[~frame["cache_hit"]]
+        groups = frame.groupby(by, dropna=False, sort=True) if by else frame.groupby(np.zeros(len(frame)))
+        live_groups = live.groupby(by, dropna=False, sort=True) if by else live.groupby(np.zeros(len(live)))
+
+        summary = pd.DataFrame({
+            "calls": groups.size(),
+            "latency_p50": live_groups["latency"].quantile(0.50),
+            "latency_p95": live_groups["latency"].quantile(0.95),
+            "latency_p99": live_groups["latency"].quantile(0.99),
+            "latency_mean": live_groups["latency"].mean(),
+            "tokens_in": groups["tokens_in"].sum(),
+            "tokens_out": groups["tokens_out"].sum(),
+            "cost": groups["cost"].sum(),
+            "cache_hits": groups["cache_hit"].sum(),
+            "retries": groups["retries"].sum(),
+            "defaults": groups["default"].sum(),
+        })
+        summary.insert(summary.columns.get_loc("retries"), "cache_hit_rate", summary["cache_hits"] / summary["calls"])
+        return summary.reset_index(drop=not by)
+
+    def report(self, path=None, by=("agent", "model", "provider")):
+        """
+        Builds a run report, and writes it when a path is given (.csv writes the summary table, anything else JSON).
+        Args:
+            path (str): Output file
+            by (tuple): Tags to group by (see summary)
+        Returns:
+            dict: {"totals": overall summary row, "groups": one summary row per group}
+        """
+        overall = self.summary(by=())
+        groups = self.summary(by=by)
+        report = {
+            "totals": json.loads(overall.to_json(orient="records"))[0] if len(overall) else {"calls": 0},
+            "groups": json.loads(groups.to_json(orient="records")),
+        }
+        if path:
+            if path.endswith(".csv"):
+                groups.to_csv(path, index=False)
+            else:
+                with open(path, "w") as f:
+                    json.dump(report, f, indent=2)
+        return report
+
+    def prometheus(self):
+        """
+        Renders the running totals in the Prometheus text exposition format.
+        Returns:
+            str: llm_calls_total, llm_tokens_total, llm_cost_usd_total, llm_retries_total and the
+                 llm_call_latency_seconds histogram, labelled by agent, model, provider (and outcome)
+        """
+        with self.lock:
+            totals = {key: {**value, "buckets": list(value["buckets"])} for key, value in self.totals.items()}
+
+        lines = [
+            "# HELP llm_calls_total LLM calls by outcome (ok, cache_hit, default).",
+            "# TYPE llm_calls_total counter",
+        ]
+        for (agent, model, provider, outcome), value in sorted(totals.items()):
+            lines.append(f"llm_calls_total{_labels(agent=agent, model=model, provider=provider, outcome=outcome)} "
+                         f"{value['calls']}")
+
+        merged = {}
+        for (agent, model, provider, _), value in totals.items():
+            target = merged.setdefault((agent, model, provider), {"tokens_in": 0, "tokens_out": 0, "cost": 0.0,
+                                                                  "retries": 0, "latency_sum": 0.0, "calls": 0,
+                                                                  "buckets": [0] * len(LATENCY_BUCKETS)})
+            for name in ("tokens_in", "tokens_out", "cost", "retries", "latency_sum", "calls"):
+                target[name] += value[name]
+            target["buckets"] = [a + b for a, b in zip(target["buckets"], value["buckets"])]
+
+        lines += ["# HELP llm_tokens_total Tokens sent to and received from LLM providers.",
+                  "# TYPE llm_tokens_total counter"]
+        for (agent, model, provider), value in sorted(merged.items()):
+            for direction in ("in", "out"):
+                labels = _labels(agent=agent, model=model, provider=provider, direction=direction)
+                lines.append(f"llm_tokens_total{labels} {value['tokens_' + direction]}")
+
+        for name, field, help_text in (
+                ("llm_cost_usd_total", "cost", "Estimated LLM spend in USD."),
+                ("llm_retries_total", "retries", "LLM call attempts beyond the first.")):
+            lines += [f"# HELP {name} {help_text}", f"# TYPE {name} counter"]
+            for (agent, model, provider), value in sorted(merged.items()):
+                lines.append(f"{name}{_labels(agent=agent, model=model, provider=provider)} {value[field]}")
+
+        lines += ["# HELP llm_call_latency_seconds Wall time of LLM calls, retries included.",
+                  "# TYPE llm_call_latency_seconds histogram"]
+        for (agent, model, provider), value in sorted(merged.items()):
+            tags = {"agent": agent, "model": model, "provider": provider}
+            for bound, count in zip(LATENCY_BUCKETS, value["buckets"]):
+                lines.append(f"llm_call_latency_seconds_bucket{_labels(**tags, le=bound)} {count}")
+            lines.append(f"llm_call_latency_seconds_bucket{_labels(**tags, le='+Inf')} {value['calls']}")
+            lines.append(f"llm_call_latency_seconds_sum{_labels(**tags)} {value['latency_sum']}")
+            lines.append(f"llm_call_latency_seconds_count{_labels(**tags)} {value['calls']}")
+        return "\n".join(lines) + "\n"
+
+    def serve(self, port=9108, host="0.0.0.0"):
+        """
+        Serves prometheus() at /metrics from a daemon thread, for scraping when running as a service.
+        Args:
+            port (int): Port to listen on (default: 9108)
+            host (str): Interface to bind (default: all)
+        Returns:
+            ThreadingHTTPServer: The running server (call shutdown() to stop it)
+        """
+        metrics = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split("?")[0] != "/metrics":
+                    self.send_error(404)
+                    return
+                body = metrics.prometheus().encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        server = ThreadingHTTPServer((host, port), Handler)
+        threading.Thread(target=server.serve_forever, name="llm-metrics", daemon=True).start()
+        return server
+
+
+# Create a global instance
+llm_metrics = LLMMetrics()
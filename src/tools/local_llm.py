@@ -0,0 +1,429 @@
+import asyncio
+import hashlib
+import json
+import os
+import random
+import re
+import threading
+import time
+from types import SimpleNamespace
+
+from langchain_core.messages import AIMessage, AIMessageChunk
+
+from tools.llm_metrics import estimate_tokens
+from tools.prompts import plain_text
+
+LOCAL_MODES = ("synthetic", "replay")
+
+# HTTP statuses raised by error injection; all are retried by call_llm like real provider errors
+DEFAULT_ERROR_STATUSES = (429, 500, 503)
+
+# Characters per streamed token (matches estimate_tokens)
+STREAM_TOKEN_CHARS = 4
+
+# Commentary appended after the answer when trailing_tokens is set, like verbose or reasoning models do
+TRAILING_TEXT = "\n\nFurther considerations: market conditions can change quickly and this view should be revisited. "
+
+# Relative distance between the latest close and its 50-day SMA beyond which the synthetic signal trades
+SYNTHETIC_TREND_BAND = 0.02
+
+_NUMBER = r"(-?\d+(?:\.\d+)?(?:[eE][-+]?\d+)?)"
+_FIELDS = {
+    "close": re.compile(r"Latest Close:\s*" + _NUMBER),
+    "sma": re.compile(r"50-day SMA:\s*" + _NUMBER),
+    "volatility": re.compile(r"Volatility:\s*" + _NUMBER),
+}
+
+
+class LocalProviderError(Exception):
+    """Error raised by the local provider, carrying an HTTP status like the SDK errors of real providers."""
+
+    def __init__(self, message, status_code):
+        super().__init__(message)
+        self.status_code = status_code
+        self.response = SimpleNamespace(status_code=status_code, headers={})
+
+
+def fixture_key(prompt):
+    """
+    Fixture address of a prompt: SHA-256 of its text, independent of the model that answered it and of any
+    prompt-caching markup added for the provider.
+    Args:
+        prompt: String or list of LangChain messages
+    Returns:
+        str: Hex digest
+    """
+    return hashlib.sha256(plain_text(prompt).encode("utf-8")).hexdigest()
+
+
+class FixtureStore:
+    """
+    Recorded LLM responses, stored as JSON lines ({"key", "content"}) and keyed by prompt hash.
+    Appends are flushed line by line, so concurrent recorders never lose what they already wrote.
+    """
+
+    def __init__(self, path):
+        """
+        Loads the fixtures of a file (a missing file is an empty store).
+        Args:
+            path (str): JSON lines file
+        """
+        self.path = path
+        self.responses = {}
+        self._lock = threading.Lock()
+        if os.path.exists(path):
+            with open(path, "r") as f:
+                for line in f:
+                    if line.strip():
+                        record = json.loads(line)
+                        self.responses[record["key"]] = record["content"]
+
+    def __len__(self):
+        return len(self.responses)
+
+    def get(self, prompt):
+        """Returns the recorded content for a prompt, or None."""
+        return self.responses.get(fixture_key(prompt))
+
+    def record(self, prompt, content):
+        """
+        Records the response to a prompt, replacing any earlier one.
+        Args:
+            prompt: The prompt sent to the model
+            content (str): Raw text, or the JSON of a structured response
+        """
+        key = fixture_key(prompt)
+        with self._lock:
+            self.responses[key] = content
+            if os.path.dirname(self.path):
+                os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            with open(self.path, "a") as f:
+                f.write(json.dumps({"key": key, "content": content}) + "\n")
+
+
+def _response_text(response):
+    if isinstance(response, dict):
+        # Structured output made with include_raw: keep the parsed object, or the raw text if parsing failed
+        parsed = response.get("parsed")
+        response = parsed if parsed is not None else response.get("raw")
+    if hasattr(response, "model_dump_json"):
+        return response.model_dump_json()
+    return getattr(response, "content", str(response))
+
+
+class RecordingModel:
+    """Wraps a chat model client and records every response it returns into a FixtureStore."""
+
+    def __init__(self, llm, store):
+        self.llm = llm
+        self.store = store
+
+    def invoke(self, prompt, *args, **kwargs):
+        response = self.llm.invoke(prompt, *args, **kwargs)
+        self.store.record(prompt, _response_text(response))
+        return response
+
+    async def ainvoke(self, prompt, *args, **kwargs):
+        response = await self.llm.ainvoke(prompt, *args, **kwargs)
+        self.store.record(prompt, _response_text(response))
+        return response
+
+    def stream(self, prompt, *args, **kwargs):
+        text = ""
+        for chunk in self.llm.stream(prompt, *args, **kwargs):
+            text += _response_text(chunk)
+            yield chunk
+        # Only complete completions are recorded; a stream closed early never reaches this line
+        self.store.record(prompt, text)
+
+    async def astream(self, prompt, *args, **kwargs):
+        text = ""
+        async for chunk in self.llm.astream(prompt, *args, **kwargs):
+            text += _response_text(chunk)
+            yield chunk
+        self.store.record(prompt, text)
+
+    def with_structured_output(self, schema, **kwargs):
+        return RecordingModel(self.llm.with_structured_output(schema, **kwargs), self.store)
+
+
+def _seeded(text):
+    """Deterministic float in [0, 1) derived from a text."""
+    return int(hashlib.sha256(text.encode("utf-8")).hexdigest()[:8], 16) / 0x100000000
+
+
+def synthetic_signal(text, asset=None):
+    """
+    Rule-based signal for a market data summary: buy above the 50-day SMA, sell below it, hold inside the band.
+    Summaries without an SMA (e.g., the risk manager's) fall back to volatility, then to a hash of the text,
+    so the same prompt always gets the same answer.
+    Args:
+        text (str): Prompt or single-asset summary
+        asset (str): Ticker, added to the signal when given
+    Returns:
+        dict: action, confidence and reasoning (and ticker)
+    """
+    values = {}
+    for name, pattern in _FIELDS.items():
+        match = pattern.search(text)
+        if match:
+            try:
+                values[name] = float(match.group(1))
+            except ValueError:
+                pass
+
+    close, sma = values.get("close"), values.get("sma")
+    if close is not None and sma is not None and sma == sma and sma != 0:
+        distance = close / sma - 1
+        action = "buy" if distance > SYNTHETIC_TREND_BAND else "sell" if distance < -SYNTHETIC_TREND_BAND else "hold"
+        confidence = min(0.95, 0.5 + abs(distance) * 5)
+        reasoning = f"Close is {distance:+.1%} from the 50-day SMA."
+    elif "volatility" in values:
+        volatility = values["volatility"]
+        action = "sell" if volatility > 50 else "hold"
+        confidence = min(0.95, 0.5 + volatility / 200)
+        reasoning = f"30-day volatility is {volatility:.2f}%."
+    else:
+        draw = _seeded(text)
+        action = ("buy", "sell", "hold")[int(draw * 3)]
+        confidence = round(0.4 + (draw * 3 % 1) * 0.5, 3)
+        reasoning = "No market data found; synthetic signal drawn from the prompt hash."
+
+    signal = {"action": action, "confidence": round(confidence, 3), "reasoning": reasoning}
+    if asset is not None:
+        signal["ticker"] = asset
+    return signal
+
+
+def synthetic_response(prompt, schema=None):
+    """
+    Builds a synthetic answer to a prompt.
+    Args:
+        prompt: The prompt sent to the model
+        schema: Pydantic model class of the expected output (default: a single trading signal)
+    Returns:
+        dict: Response matching the schema; batch schemas (a "signals" field) get one entry per "Asset:" block.
+              Without a schema, prompts asking for a "signals" list are answered like batch schemas.
+    """
+    text = plain_text(prompt)
+    fields = schema.model_fields if schema is not None else {}
+    if "signals" in fields or (schema is None and '"signals"' in text):
+        blocks = re.split(r"(?=^Asset:)", text, flags=re.MULTILINE)
+        signals = []
+        for block in blocks:
+            match = re.match(r"Asset:\s*(\S+)", block)
+            if match:
+                signals.append(synthetic_signal(block, match.group(1)))
+        return {"signals": signals}
+    if not fields or {"action", "confidence", "reasoning"} <= set(fields):
+        return synthetic_signal(text)
+
+    from tools.llm_interface import create_default_response
+    return create_default_response(schema).model_dump()
+
+
+class LocalChatModel:
+    """
+    Offline chat model for benchmarks and load tests, used like any other client by get_model and call_llm.
+
+    In synthetic mode every prompt gets a rule-based trading signal; in replay mode responses recorded in a
+    FixtureStore are served by prompt hash (misses fall back to synthetic answers, or fail with a 404).
+    Latency, jitter and an error rate can be injected; injected errors carry HTTP statuses, so retries,
+    rate-limit cooldowns and the circuit breaker behave as they would against a real provider.
+    stream and astream send the raw answer token by token, optionally followed by trailing commentary (like
+    verbose or reasoning models); invoke waits for, and bills, the whole generation.
+    """
+
+    def __init__(self, mode="synthetic", fixtures=None, latency=0.0, jitter=0.0, error_rate=0.0,
+                 error_statuses=DEFAULT_ERROR_STATUSES, replay_fallback="synthetic", seed=None, schema=None,
+                 include_raw=False, token_latency=0.0, trailing_tokens=0):
+        """
+        Initializes the model.
+        Args:
+            mode (str): "synthetic" or "replay"
+            fixtures (str | FixtureStore): Fixture file or store used in replay mode
+            latency (float): Mean seconds per call (default: 0)
+            jitter (float): Calls take latency ± a uniform draw of up to jitter seconds (default: 0)
+            error_rate (float): Probability that a call fails (default: 0)
+            error_statuses (tuple): HTTP statuses drawn for injected errors (default: 429, 500, 503)
+            replay_fallback (str): On a replay miss, "synthetic" answers anyway, "error" raises a 404
+            seed (int): Seed of the latency and error draws, for reproducible runs
+            schema: Pydantic model class returned by invoke (set by with_structured_output)
+            include_raw (bool): Return {"raw", "parsed", "parsing_error"} like LangChain's structured output
+            token_latency (float): Seconds between streamed tokens, after latency to the first one (default: 0)
+            trailing_tokens (int): Tokens of commentary streamed after the answer (default: 0)
+        """
+        if mode not in LOCAL_MODES:
+            raise ValueError(f"Unknown local model mode: {mode}")
+        if mode == "replay" and fixtures is None:
+            raise ValueError("Replay mode needs a fixture file")
+        self.mode = mode
+        self.fixtures = FixtureStore(fixtures) if isinstance(fixtures, str) else fixtures
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.error_statuses = tuple(error_statuses)
+        self.replay_fallback = replay_fallback
+        self.schema = schema
+        self.include_raw = include_raw
+        self.token_latency = token_latency
+        self.trailing_tokens = trailing_tokens
+        self.rng = random.Random(seed)
+        self.lock = threading.Lock()
+        self.stats = {"calls": 0, "replay_hits": 0, "replay_misses": 0, "injected_errors": 0}
+
+    def with_structured_output(self, schema, include_raw=False, **kwargs):
+        """Returns a view of this model that answers with instances of schema (state and stats are shared)."""
+        structured = object.__new__(LocalChatModel)
+        structured.__dict__.update(self.__dict__)
+        structured.schema = schema
+        structured.include_raw = include_raw
+        return structured
+
+    def _draw(self):
+        """Returns (delay, injected error or None) for one call."""
+        with self.lock:
+            self.stats["calls"] += 1
+            delay = max(0.0, self.latency + self.rng.uniform(-self.jitter, self.jitter)) if self.jitter else self.latency
+            if self.error_rate and self.rng.random() < self.error_rate:
+                self.stats["injected_errors"] += 1
+                status = self.rng.choice(self.error_statuses)
+                return delay, LocalProviderError(f"Injected error (HTTP {status})", status)
+        return delay, None
+
+    def _respond(self, prompt):
+        """Returns (response, seconds spent generating it token by token, trailing commentary included)."""
+        response = self._answer(prompt)
+        text = response.content if isinstance(response, AIMessage) else response.model_dump_json()
+        generation = self.token_latency * max(estimate_tokens(text) + self.trailing_tokens - 1, 0)
+        if isinstance(response, AIMessage):
+            # Trailing commentary is generated and billed, even though only the answer is returned
+            return self._message(prompt, text, self.trailing_tokens), generation
+        if not self.include_raw:
+            return response, generation
+        raw = self._message(prompt, text, self.trailing_tokens)
+        return {"raw": raw, "parsed": response, "parsing_error": None}, generation
+
+    @staticmethod
+    def _message(prompt, content, extra_tokens=0):
+        # Token usage is estimated like the real providers report it, so instrumentation sees realistic counts
+        tokens_in, tokens_out = estimate_tokens(plain_text(prompt)), estimate_tokens(content) + extra_tokens
+        return AIMessage(content=content, usage_metadata={"input_tokens": tokens_in, "output_tokens": tokens_out,
+                                                          "total_tokens": tokens_in + tokens_out})
+
+    def _answer(self, prompt):
+        content = None
+        if self.mode == "replay":
+            content = self.fixtures.get(prompt)
+            with self.lock:
+                self.stats["replay_hits" if content is not None else "replay_misses"] += 1
+            if content is None and self.replay_fallback != "synthetic":
+                raise LocalProviderError("No recorded response for this prompt", 404)
+
+        if self.schema is None:
+            if content is None:
+                content = json.dumps(synthetic_response(prompt))
+            return self._message(prompt, content)
+        if content is None:
+            return self.schema.model_validate(synthetic_response(prompt, self.schema))
+        try:
+            return self.schema.model_validate_json(content)
+        except ValueError:
+            # Raw text recorded from a model without JSON mode (fenced JSON or **Signal:** lines)
+            from tools.llm_interface import parse_gemini_response
+            parsed = parse_gemini_response(content)
+            if parsed is None:
+                raise LocalProviderError("Recorded response does not match the output schema", 422)
+            return self.schema.model_validate(parsed)
+
+    def _tokens(self, prompt):
+        """Pieces of a streamed answer: the raw content, then trailing_tokens of commentary."""
+        content = self._answer(prompt)
+        text = content.content if isinstance(content, AIMessage) else content.model_dump_json()
+        if text.lstrip().startswith("{"):
+            # Streamed JSON is fenced, the way models without JSON mode write it
+            text = f"```json\n{text}\n```"
+        if self.trailing_tokens:
+            filler = TRAILING_TEXT * (self.trailing_tokens * STREAM_TOKEN_CHARS // len(TRAILING_TEXT) + 1)
+            text += filler[:self.trailing_tokens * STREAM_TOKEN_CHARS]
+        return [text[i:i + STREAM_TOKEN_CHARS] for i in range(0, len(text), STREAM_TOKEN_CHARS)]
+
+    @staticmethod
+    def _chunk(piece, tokens_in=0):
+        # Usage is reported per chunk, so a stream closed early only counts the tokens actually sent
+        return AIMessageChunk(content=piece, usage_metadata={"input_tokens": tokens_in, "output_tokens": 1,
+                                                             "total_tokens": tokens_in + 1})
+
+    def stream(self, prompt, *args, **kwargs):
+        delay, error = self._draw()
+        if delay:
+            time.sleep(delay)
+        if error is not None:
+            raise error
+        tokens_in = estimate_tokens(plain_text(prompt))
+        for i, piece in enumerate(self._tokens(prompt)):
+            if i and self.token_latency:
+                time.sleep(self.token_latency)
+            yield self._chunk(piece, tokens_in if i == 0 else 0)
+
+    async def astream(self, prompt, *args, **kwargs):
+        delay, error = self._draw()
+        if delay:
+            await asyncio.sleep(delay)
+        if error is not None:
+            raise error
+        tokens_in = estimate_tokens(plain_text(prompt))
+        for i, piece in enumerate(self._tokens(prompt)):
+            if i and self.token_latency:
+                await asyncio.sleep(self.token_latency)
+            yield self._chunk(piece, tokens_in if i == 0 else 0)
+
+    def invoke(self, prompt, *args, **kwargs):
+        delay, error = self._draw()
+        if delay:
+            time.sleep(delay)
+        if error is not None:
+            raise error
+        response, generation = self._respond(prompt)
+        if generation:
+            time.sleep(generation)
+        return response
+
+    async def ainvoke(self, prompt, *args, **kwargs):
+        delay, error = self._draw()
+        if delay:
+            await asyncio.sleep(delay)
+        if error is not None:
+            raise error
+        response, generation = self._respond(prompt)
+        if generation:
+            await asyncio.sleep(generation)
+        return response
+
+
+def local_model_settings(model_name, settings):
+    """
+    Resolves LocalChatModel arguments for a model name, filling unset ones from the environment
+    (LOCAL_LLM_FIXTURES, LOCAL_LLM_LATENCY, LOCAL_LLM_JITTER, LOCAL_LLM_ERROR_RATE, LOCAL_LLM_SEED,
+    LOCAL_LLM_TOKEN_LATENCY, LOCAL_LLM_TRAILING_TOKENS).
+    Args:
+        model_name (str): "local-synthetic" or "local-replay"
+        settings (dict): Arguments passed to get_model
+    Returns:
+        dict: Keyword arguments for LocalChatModel
+    """
+    resolved = {"mode": "replay" if model_name.endswith("replay") else "synthetic"}
+    env = {
+        "fixtures": ("LOCAL_LLM_FIXTURES", str),
+        "latency": ("LOCAL_LLM_LATENCY", float),
+        "jitter": ("LOCAL_LLM_JITTER", float),
+        "error_rate": ("LOCAL_LLM_ERROR_RATE", float),
+        "seed": ("LOCAL_LLM_SEED", int),
+        "token_latency": ("LOCAL_LLM_TOKEN_LATENCY", float),
+        "trailing_tokens": ("LOCAL_LLM_TRAILING_TOKENS", int),
+    }
+    for name, (env_var, cast) in env.items():
+        if os.getenv(env_var):
+            resolved[name] = cast(os.getenv(env_var))
+    resolved.update(settings)
+    return resolved
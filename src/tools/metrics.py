@@ -0,0 +1,180 @@
+import math
+
+import ccxt
+import numpy as np
+
+# Crypto trades around the clock, every day of the year
+SECONDS_PER_YEAR = 365 * 24 * 3600
+
+
+def periods_per_year(bar_interval):
+    """
+    Number of bars in a year for a bar interval.
+    Args:
+        bar_interval: ccxt timeframe string (e.g., "1h", "1d"), pd.Timedelta, or seconds
+    Returns:
+        float: Bars per 365-day year
+    """
+    if isinstance(bar_interval, str):
+        seconds = ccxt.Exchange.parse_timeframe(bar_interval)
+    elif hasattr(bar_interval, "total_seconds"):
+        seconds = bar_interval.total_seconds()
+    else:
+        seconds = float(bar_interval)
+    if seconds <= 0:
+        raise ValueError("Bar interval must be positive")
+    return SECONDS_PER_YEAR / seconds
+
+
+def infer_periods_per_year(timestamps, default=365.0):
+    """
+    Derives bars per year from the median spacing of a timestamp series.
+    Args:
+        timestamps: Sorted datetime-like array or Series
+        default (float): Value returned when there are fewer than two timestamps (default: 365, daily bars)
+    Returns:
+        float: Bars per 365-day year
+    """
+    values = np.asarray(timestamps, dtype="datetime64[ns]").view(np.int64)
+    if len(values) < 2:
+        return default
+    spacing = np.median(np.diff(values))
+    return periods_per_year(spacing / 1e9) if spacing > 0 else default
+
+
+class StreamingMetrics:
+    """
+    Online performance metrics updated in O(1) per bar, without keeping the equity curve.
+
+    Returns are accumulated with Welford's algorithm (and Chan's merge for batches), so Sharpe, Sortino,
+    drawdown, Calmar, turnover, hit rate and exposure can be read at any point of a long or live run.
+    """
+
+    def __init__(self, initial_value, periods_per_year=365.0):
+        """
+        Initializes the accumulator.
+        Args:
+            initial_value (float): Portfolio value before the first bar
+            periods_per_year (float): Bars per year used to annualize (default: 365, daily bars)
+        """
+        self.initial_value = float(initial_value)
+        self.periods_per_year = float(periods_per_year)
+        self.last_value = self.initial_value
+        self.count = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+        self.downside_sq = 0.0
+        self.up_bars = 0
+        self.moving_bars = 0
+        self.peak = self.initial_value
+        self.max_drawdown = 0.0
+        self.value_sum = 0.0
+        self.exposure_sum = 0.0
+        self.traded_notional = 0.0
+
+    def update(self, value, holdings_value=0.0, traded_notional=0.0):
+        """
+        Adds one bar.
+        Args:
+            value (float): Portfolio value at the end of the bar
+            holdings_value (float): Value of open positions at the end of the bar
+            traded_notional (float): Notional traded during the bar
+        """
+        ret = value / self.last_value - 1 if self.last_value else 0.0
+        self.last_value = value
+
+        self.count += 1
+        delta = ret - self.mean
+        self.mean += delta / self.count
+        self.m2 += delta * (ret - self.mean)
+        if ret < 0:
+            self.downside_sq += ret * ret
+        if ret != 0:
+            self.moving_bars += 1
+            if ret > 0:
+                self.up_bars += 1
+
+        if value > self.peak:
+            self.peak = value
+        elif self.peak:
+            self.max_drawdown = min(self.max_drawdown, (value - self.peak) / self.peak)
+
+        self.value_sum += value
+        if value:
+            self.exposure_sum += abs(holdings_value) / value
+        self.traded_notional += traded_notional
+
+    def update_batch(self, values, holdings_values=None, traded_notional=0.0):
+        """
+        Adds a chunk of bars with vectorized operations; equivalent to calling update for each bar.
+        Args:
+            values (np.ndarray): Portfolio values at the end of each bar
+            holdings_values (np.ndarray): Value of open positions at the end of each bar (default: zeros)
+            traded_notional (float): Total notional traded during the chunk
+        """
+        values = np.asarray(values, dtype=np.float64)
+        n = len(values)
+        if n == 0:
+            return
+        previous = np.concatenate([[self.last_value], values[:-1]])
+        with np.errstate(divide="ignore", invalid="ignore"):
+            returns = np.where(previous != 0, values / previous - 1, 0.0)
+
+        # Chan et al. parallel merge of (count, mean, M2)
+        batch_mean = returns.mean()
+        batch_m2 = ((returns - batch_mean) ** 2).sum()
+        total = self.count + n
+        delta = batch_mean - self.mean
+        self.m2 += batch_m2 + delta * delta * self.count * n / total
+        self.mean += delta * n / total
+        self.count = total
+
+        negative = returns[returns < 0]
+        self.downside_sq += float((negative * negative).sum())
+        self.moving_bars += int((returns != 0).sum())
+        self.up_bars += int((returns > 0).sum())
+
+        peaks = np.maximum.accumulate(np.concatenate([[self.peak], values]))[1:]
+        with np.errstate(divide="ignore", invalid="ignore"):
+            drawdowns = np.where(peaks != 0, (values - peaks) / peaks, 0.0)
+        self.max_drawdown = min(self.max_drawdown, float(drawdowns.min()))
+        self.peak = float(peaks[-1])
+        self.last_value = float(values[-1])
+
+        self.value_sum += float(values.sum())
+        if holdings_values is not None:
+            holdings_values = np.asarray(holdings_values, dtype=np.float64)
+            with np.errstate(divide="ignore", invalid="ignore"):
+                self.exposure_sum += float(np.where(values != 0, np.abs(holdings_values) / values, 0.0).sum())
+        self.traded_notional += traded_notional
+
+    def snapshot(self):
+        """
+        Returns the metrics accumulated so far.
+        Returns:
+            dict: total_return, annualized_return, sharpe_ratio, max_drawdown (all as in
+                  Backtester.calculate_metrics) plus sortino_ratio, calmar_ratio, volatility,
+                  turnover, hit_rate and exposure
+        """
+        n = self.count
+        total_return = (self.last_value / self.initial_value - 1) * 100 if self.initial_value else 0.0
+        growth = 1 + total_return / 100
+        annualized_return = (growth ** (self.periods_per_year / n) - 1) * 100 if n and growth > 0 else 0.0
+
+        std = math.sqrt(self.m2 / (n - 1)) if n > 1 else 0.0
+        downside = math.sqrt(self.downside_sq / n) if n else 0.0
+        annualizer = math.sqrt(self.periods_per_year)
+        max_drawdown = self.max_drawdown * 100
+
+        return {
+            "total_return": total_return,
+            "annualized_return": annualized_return,
+            "sharpe_ratio": self.mean / std * annualizer if std != 0 else 0,
+            "max_drawdown": max_drawdown,
+            "sortino_ratio": self.mean / downside * annualizer if downside != 0 else 0,
+            "calmar_ratio": annualized_return / abs(max_drawdown) if max_drawdown != 0 else 0,
+            "volatility": std * annualizer * 100,
+            "turnover": self.traded_notional / (self.value_sum / n) if n and self.value_sum else 0.0,
+            "hit_rate": self.up_bars / self.moving_bars * 100 if self.moving_bars else 0.0,
+            "exposure": self.exposure_sum / n * 100 if n else 0.0,
+        }
@@ -1,4 +1,9 @@
+import asyncio
+import atexit
+import json
 import os
+import threading
+import time
 from langchain_anthropic import ChatAnthropic
 from langchain_deepseek import ChatDeepSeek
 from langchain_google_genai import ChatGoogleGenerativeAI
@@ -8,6 +13,8 @@ from enum import Enum
 from pydantic import BaseModel
 from typing import Tuple
 
+from tools.local_llm import FixtureStore, LocalChatModel, RecordingModel, local_model_settings
+
 
 class ModelProvider(str, Enum):
     """Enum for supported LLM providers"""
@@ -16,6 +23,7 @@ class ModelProvider(str, Enum):
     GEMINI = "Gemini"
     GROQ = "Groq"
     OPENAI = "OpenAI"
+    LOCAL = "Local"
 
 
 class LLMModel(BaseModel):
@@ -88,6 +96,16 @@ AVAILABLE_MODELS = [
         model_name="gpt-4o",
         provider=ModelProvider.OPENAI
     ),
+    LLMModel(
+        display_name="[local] synthetic (offline)",
+        model_name="local-synthetic",
+        provider=ModelProvider.LOCAL
+    ),
+    LLMModel(
+        display_name="[local] replay (offline)",
+        model_name="local-replay",
+        provider=ModelProvider.LOCAL
+    ),
 ]
 
 # Create LLM_ORDER in the format expected by the UI
@@ -99,38 +117,139 @@ def get_model_info(model_name: str) -> LLMModel | None:
     return next((model for model in AVAILABLE_MODELS if model.model_name == model_name), None)
 
 
-def get_model(model_name: str, model_provider: ModelProvider) -> ChatOpenAI | ChatGroq | None:
+# Environment variable and display name of each provider's API key
+PROVIDER_API_KEYS = {
+    ModelProvider.GROQ: ("GROQ_API_KEY", "Groq"),
+    ModelProvider.OPENAI: ("OPENAI_API_KEY", "OpenAI"),
+    ModelProvider.ANTHROPIC: ("ANTHROPIC_API_KEY", "Anthropic"),
+    ModelProvider.DEEPSEEK: ("DEEPSEEK_API_KEY", "DeepSeek"),
+    ModelProvider.GEMINI: ("GOOGLE_API_KEY", "Google"),
+}
+
+# Setting LLM_RECORD_FIXTURES to a file records every live response there, for replay with local-replay
+RECORD_FIXTURES_ENV = "LLM_RECORD_FIXTURES"
+_recorders = {}
+
+# Long-lived clients keyed by (provider, model, API key, settings); each keeps its HTTP connection pool alive.
+# Their async SDK clients are only used from the background event loop of tools.llm_interface, which acall_llm
+# always runs on, so the async connection pools are never shared between loops
+_clients = {}
+_clients_lock = threading.Lock()
+_pool_stats = {"created": 0, "reused": 0, "creation_seconds": 0.0}
+
+
+def _create_model(model_name, model_provider, api_key, settings):
     if model_provider == ModelProvider.GROQ:
-        api_key = os.getenv("GROQ_API_KEY")
-        if not api_key:
-            # Print error to console
-            print(f"API Key Error: Please make sure GROQ_API_KEY is set in your .env file.")
-            raise ValueError("Groq API key not found.  Please make sure GROQ_API_KEY is set in your .env file.")
-        return ChatGroq(model=model_name, api_key=api_key)
+        return ChatGroq(model=model_name, api_key=api_key, **settings)
     elif model_provider == ModelProvider.OPENAI:
-        # Get and validate API key
-        api_key = os.getenv("OPENAI_API_KEY")
-        if not api_key:
-            # Print error to console
-            print(f"API Key Error: Please make sure OPENAI_API_KEY is set in your .env file.")
-            raise ValueError("OpenAI API key not found.  Please make sure OPENAI_API_KEY is set in your .env file.")
-        return ChatOpenAI(model=model_name, api_key=api_key)
+        return ChatOpenAI(model=model_name, api_key=api_key, **settings)
     elif model_provider == ModelProvider.ANTHROPIC:
-        api_key = os.getenv("ANTHROPIC_API_KEY")
-        if not api_key:
-            print(f"API Key Error: Please make sure ANTHROPIC_API_KEY is set in your .env file.")
-            raise ValueError(
-                "Anthropic API key not found.  Please make sure ANTHROPIC_API_KEY is set in your .env file.")
-        return ChatAnthropic(model=model_name, api_key=api_key)
+        return ChatAnthropic(model=model_name, api_key=api_key, **settings)
     elif model_provider == ModelProvider.DEEPSEEK:
-        api_key = os.getenv("DEEPSEEK_API_KEY")
-        if not api_key:
-            print(f"API Key Error: Please make sure DEEPSEEK_API_KEY is set in your .env file.")
-            raise ValueError("DeepSeek API key not found.  Please make sure DEEPSEEK_API_KEY is set in your .env file.")
-        return ChatDeepSeek(model=model_name, api_key=api_key)
+        return ChatDeepSeek(model=model_name, api_key=api_key, **settings)
     elif model_provider == ModelProvider.GEMINI:
-        api_key = os.getenv("GOOGLE_API_KEY")
+        return ChatGoogleGenerativeAI(model=model_name, api_key=api_key, **settings)
+    elif model_provider == ModelProvider.LOCAL:
+        return LocalChatModel(**local_model_settings(model_name, settings))
+    return None
+
+
+def _settings_key(settings):
+    # Canonical text of the settings, so nested dicts and lists (e.g., model_kwargs) can key the pool
+    return json.dumps(settings, sort_keys=True, default=repr)
+
+
+def get_model(model_name: str, model_provider: ModelProvider, **settings) -> ChatOpenAI | ChatGroq | None:
+    """
+    Returns a pooled chat model client, creating it on first use.
+    Clients are shared between calls and threads, so connections and TLS sessions are reused.
+    Args:
+        model_name: Name of the model
+        model_provider: Provider of the model (Local needs no API key; see tools.local_llm)
+        **settings: Extra client settings (e.g., temperature, timeout, model_kwargs; latency, error_rate for
+                    Local models); each combination gets its own client
+    Returns:
+        The chat model client, or None for an unknown provider
+    """
+    try:
+        provider = ModelProvider(model_provider)
+    except ValueError:
+        return None
+    api_key = None
+    if provider in PROVIDER_API_KEYS:
+        env_var, label = PROVIDER_API_KEYS[provider]
+        api_key = os.getenv(env_var)
         if not api_key:
-            print(f"API Key Error: Please make sure GOOGLE_API_KEY is set in your .env file.")
-            raise ValueError("Google API key not found.  Please make sure GOOGLE_API_KEY is set in your .env file.")
-        return ChatGoogleGenerativeAI(model=model_name, api_key=api_key)
\ No newline at end of file
+            # Print error to console
+            print(f"API Key Error: Please make sure {env_var} is set in your .env file.")
+            raise ValueError(f"{label} API key not found.  Please make sure {env_var} is set in your .env file.")
+
+    key = (provider.value, model_name, api_key, _settings_key(settings))
+    with _clients_lock:
+        client = _clients.get(key)
+        if client is not None:
+            _pool_stats["reused"] += 1
+            return client
+        started = time.perf_counter()
+        client = _create_model(model_name, provider, api_key, settings)
+        _pool_stats["creation_seconds"] += time.perf_counter() - started
+        _pool_stats["created"] += 1
+        record_path = os.getenv(RECORD_FIXTURES_ENV)
+        if record_path and provider != ModelProvider.LOCAL:
+            if record_path not in _recorders:
+                _recorders[record_path] = FixtureStore(record_path)
+            client = RecordingModel(client, _recorders[record_path])
+        _clients[key] = client
+        return client
+
+
+def pool_stats() -> dict:
+    """
+    Returns client pool counters.
+    Returns:
+        dict: clients (currently pooled), created, reused, creation_seconds (total time spent building clients)
+    """
+    with _clients_lock:
+        return {"clients": len(_clients), **_pool_stats}
+
+
+def _close_client(client):
+    # SDK clients sit under different attribute names depending on the provider; only those already built
+    # are looked up, so closing never instantiates a client
+    client = getattr(client, "llm", client)  # RecordingModel wrapper
+    for attr in ("root_client", "client", "_client", "root_async_client", "async_client", "_async_client"):
+        close = getattr(vars(client).get(attr), "close", None)
+        if callable(close):
+            try:
+                closing = close()
+                if asyncio.iscoroutine(closing):
+                    _close_async(closing)
+            except Exception:
+                pass
+
+
+def _close_async(closing):
+    # Async clients are bound to the background loop acall_llm runs on, so they are closed there
+    from tools import llm_interface
+
+    loop = llm_interface._loop
+    if loop is None or not loop.is_running():
+        # No loop ever ran a request, so the client holds no connection
+        closing.close()
+        return
+    if asyncio._get_running_loop() is loop:
+        loop.create_task(closing)
+    else:
+        asyncio.run_coroutine_threadsafe(closing, loop).result(timeout=5)
+
+
+def shutdown_models():
+    """Closes every pooled client and empties the pool."""
+    with _clients_lock:
+        clients = list(_clients.values())
+        _clients.clear()
+    for client in clients:
+        _close_client(client)
+
+
+atexit.register(shutdown_models)
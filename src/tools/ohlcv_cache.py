@@ -0,0 +1,209 @@
+import json
+import os
+import tempfile
+import threading
+import time
+
+import ccxt
+import numpy as np
+import pandas as pd
+
+DEFAULT_CACHE_DIR = "data/ohlcv_cache"
+
+CACHE_COLUMNS = ["timestamp", "open", "high", "low", "close", "volume"]
+
+
+def sort_unique_bars(values):
+    """
+    Sorts raw OHLCV rows by timestamp and keeps the first row of each duplicated timestamp.
+    Args:
+        values (np.ndarray): (N, 6) float64 array of [timestamp_ms, open, high, low, close, volume]
+    Returns:
+        np.ndarray: Sorted, de-duplicated array (the input itself if already strictly increasing)
+    """
+    if len(values) > 1 and not (np.diff(values[:, 0]) > 0).all():
+        _, first = np.unique(values[:, 0], return_index=True)
+        values = values[first]
+    return values
+
+
+def _atomic_write(path, write):
+    """Writes a file through a temporary sibling and renames it into place."""
+    directory = os.path.dirname(path)
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+    os.close(fd)
+    try:
+        write(tmp_path)
+        os.replace(tmp_path, path)
+    except Exception:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+class OHLCVCache:
+    """
+    On-disk Parquet cache of OHLCV bars partitioned as <root>/<exchange>/<symbol>/<timeframe>/<YYYY-MM>.parquet.
+    Each series keeps a coverage.json listing the [start, end] ranges (ms, inclusive) already fetched, each
+    ending at the last bar received, so ranges before a series' first bar are not requested again.
+    """
+
+    def __init__(self, root=DEFAULT_CACHE_DIR, exchange_id="binance"):
+        """
+        Initializes the cache.
+        Args:
+            root (str): Cache root directory (default: data/ohlcv_cache)
+            exchange_id (str): Exchange partition name (default: binance)
+        """
+        self.root = root
+        self.exchange_id = exchange_id
+        self.lock = threading.Lock()
+
+    def _series_dir(self, symbol, timeframe):
+        return os.path.join(self.root, self.exchange_id, symbol.replace("/", "-"), timeframe)
+
+    def _partition_path(self, symbol, timeframe, month):
+        return os.path.join(self._series_dir(symbol, timeframe), f"{month}.parquet")
+
+    def _coverage_path(self, symbol, timeframe):
+        return os.path.join(self._series_dir(symbol, timeframe), "coverage.json")
+
+    def covered_ranges(self, symbol, timeframe):
+        """
+        Returns the ranges already fetched for a series.
+        Returns:
+            list: Sorted, merged [start_ms, end_ms] pairs
+        """
+        path = self._coverage_path(symbol, timeframe)
+        if not os.path.exists(path):
+            return []
+        with open(path, "r") as f:
+            return json.load(f)
+
+    def missing_ranges(self, symbol, timeframe, since, until):
+        """
+        Works out which parts of [since, until] are not covered by the cache.
+        Args:
+            symbol (str): Exchange symbol (e.g., "BTC/USDT")
+            timeframe (str): Data timeframe (e.g., "1d", "1m")
+            since (int): Start timestamp in milliseconds (inclusive)
+            until (int): End timestamp in milliseconds (inclusive)
+        Returns:
+            list: (start_ms, end_ms) tuples to fetch, inclusive
+        """
+        timeframe_ms = ccxt.Exchange.parse_timeframe(timeframe) * 1000
+        gaps = []
+        cursor = since
+        for start, end in self.covered_ranges(symbol, timeframe):
+            if end < cursor:
+                continue
+            if start > until:
+                break
+            if start > cursor:
+                gaps.append((cursor, start - timeframe_ms))
+            cursor = max(cursor, end + timeframe_ms)
+            if cursor > until:
+                break
+        if cursor <= until:
+            gaps.append((cursor, until))
+        return gaps
+
+    def write(self, symbol, timeframe, values, since, until):
+        """
+        Merges fetched bars into their month partitions and marks [since, until] as covered.
+        Args:
+            symbol (str): Exchange symbol (e.g., "BTC/USDT")
+            timeframe (str): Data timeframe (e.g., "1d", "1m")
+            values (np.ndarray): (N, 6) float64 array of [timestamp_ms, open, high, low, close, volume]
+            since (int): Start of the fetched range in milliseconds (inclusive)
+            until (int): End of the fetched range in milliseconds (inclusive)
+        """
+        timeframe_ms = ccxt.Exchange.parse_timeframe(timeframe) * 1000
+        values = sort_unique_bars(values)
+
+        with self.lock:
+            if len(values):
+                months = values[:, 0].astype("int64").astype("datetime64[ms]").astype("datetime64[M]")
+                boundaries = np.flatnonzero(months[1:] != months[:-1]) + 1
+                for chunk in np.split(values, boundaries):
+                    month = str(chunk[0, 0].astype("int64").astype("datetime64[ms]").astype("datetime64[M]"))
+                    path = self._partition_path(symbol, timeframe, month)
+                    existing = self._read_partition(path)
+                    if len(existing):
+                        # New bars win over previously cached ones at the same timestamp
+                        chunk = sort_unique_bars(np.concatenate([chunk, existing]))
+                    frame = pd.DataFrame(chunk, columns=CACHE_COLUMNS)
+                    frame["timestamp"] = frame["timestamp"].astype("int64")
+                    _atomic_write(path, lambda tmp: frame.to_parquet(tmp, index=False))
+
+            # Record coverage last so a crash never marks unwritten bars as cached
+            ranges = self.covered_ranges(symbol, timeframe) + [[int(since), int(until)]]
+            ranges.sort()
+            merged = [ranges[0]]
+            for start, end in ranges[1:]:
+                if start <= merged[-1][1] + timeframe_ms:
+                    merged[-1][1] = max(merged[-1][1], end)
+                else:
+                    merged.append([start, end])
+
+            def dump(tmp):
+                with open(tmp, "w") as f:
+                    json.dump(merged, f)
+
+            _atomic_write(self._coverage_path(symbol, timeframe), dump)
+
+    def _read_partition(self, path):
+        if not os.path.exists(path):
+            return np.empty((0, 6), dtype=np.float64)
+        frame = pd.read_parquet(path, columns=CACHE_COLUMNS)
+        return frame.to_numpy(dtype=np.float64)
+
+    def read(self, symbol, timeframe, since, until):
+        """
+        Reads cached bars in [since, until].
+        Returns:
+            np.ndarray: (N, 6) float64 array of [timestamp_ms, open, high, low, close, volume], sorted
+        """
+        first = np.datetime64(int(since), "ms").astype("datetime64[M]")
+        last = np.datetime64(int(until), "ms").astype("datetime64[M]")
+        blocks = [self._read_partition(self._partition_path(symbol, timeframe, str(month)))
+                  for month in np.arange(first, last + 1)]
+        values = np.concatenate(blocks) if blocks else np.empty((0, 6), dtype=np.float64)
+        mask = (values[:, 0] >= since) & (values[:, 0] <= until)
+        return values[mask]
+
+    def load(self, symbol, timeframe, since, until, fetch_range=None):
+        """
+        Returns bars in [since, until], fetching and caching only the ranges missing on disk.
+        Bars that have not closed yet are returned but never cached.
+        Args:
+            symbol (str): Exchange symbol (e.g., "BTC/USDT")
+            timeframe (str): Data timeframe (e.g., "1d", "1m")
+            since (int): Start timestamp in milliseconds (inclusive)
+            until (int): End timestamp in milliseconds (inclusive)
+            fetch_range (callable): fetch_range(start_ms, end_ms) -> (N, 6) array; None for offline mode
+        Returns:
+            np.ndarray: (N, 6) float64 array of [timestamp_ms, open, high, low, close, volume], sorted
+        """
+        timeframe_ms = ccxt.Exchange.parse_timeframe(timeframe) * 1000
+        closed_until = min(until, int(time.time() * 1000) - timeframe_ms)
+
+        live = []
+        if fetch_range is not None:
+            for gap_start, gap_end in self.missing_ranges(symbol, timeframe, since, until):
+                values = fetch_range(gap_start, gap_end)
+                if gap_start <= closed_until:
+                    closed = values[:, 0] <= closed_until
+                    if closed.any():
+                        # A fetch may stop early (e.g., on an empty page): coverage ends at the last bar received,
+                        # so the rest of the gap is requested again next time
+                        covered_until = min(gap_end, closed_until, int(values[closed, 0].max()))
+                        self.write(symbol, timeframe, values[closed], gap_start, covered_until)
+                    values = values[~closed]
+                live.append(values)
+
+        cached = self.read(symbol, timeframe, since, until)
+        if not live:
+            return cached
+        return sort_unique_bars(np.concatenate([cached] + live))
@@ -0,0 +1,155 @@
+import json
+import os
+
+import numpy as np
+import pandas as pd
+
+PRICE_COLUMNS = ["open", "high", "low", "close", "volume"]
+
+INDEX_FILE = "index.json"
+
+
+class PriceStore:
+    """
+    Memory-mapped, fixed-width columnar OHLCV store.
+
+    Layout on disk:
+        index.json       {"dtype": ..., "rows": N, "tickers": {ticker: [offset, length]}}
+        timestamp.bin    int64 nanoseconds since epoch, N rows
+        <column>.bin     open/high/low/close/volume in the store dtype, N rows
+
+    Tickers are stored back to back, so each one is a contiguous slice of every column. Files are
+    opened read-only through numpy.memmap, which lets several processes share the same OS pages.
+    """
+
+    def __init__(self, path):
+        """
+        Opens an existing store.
+        Args:
+            path (str): Store directory written by PriceStore.write
+        """
+        self.path = path
+        with open(os.path.join(path, INDEX_FILE), "r") as f:
+            index = json.load(f)
+        self.dtype = np.dtype(index["dtype"])
+        self.rows = index["rows"]
+        self.index = {ticker: tuple(span) for ticker, span in index["tickers"].items()}
+        self.columns = {"timestamp": self._map("timestamp", np.int64)}
+        for col in PRICE_COLUMNS:
+            self.columns[col] = self._map(col, self.dtype)
+
+    def _map(self, column, dtype):
+        if self.rows == 0:
+            return np.empty(0, dtype=dtype)
+        return np.memmap(os.path.join(self.path, f"{column}.bin"), dtype=dtype, mode="r", shape=(self.rows,))
+
+    @staticmethod
+    def write(path, price_data, dtype="float64"):
+        """
+        Writes normalized OHLCV DataFrames into a new store.
+        Args:
+            path (str): Target directory
+            price_data (dict): Dictionary of DataFrames with timestamp, open, high, low, close, volume columns
+            dtype (str): Price/volume dtype, "float64" or "float32" (default: float64)
+        Returns:
+            PriceStore: The opened store
+        """
+        dtype = np.dtype(dtype)
+        os.makedirs(path, exist_ok=True)
+
+        tickers = {}
+        offset = 0
+        for ticker, df in price_data.items():
+            tickers[ticker] = [offset, len(df)]
+            offset += len(df)
+
+        if offset:
+            timestamps = np.memmap(os.path.join(path, "timestamp.bin"), dtype=np.int64, mode="w+", shape=(offset,))
+            for ticker, df in price_data.items():
+                start, length = tickers[ticker]
+                timestamps[start:start + length] = pd.to_datetime(df["timestamp"]).to_numpy("datetime64[ns]").view(np.int64)
+            timestamps.flush()
+            del timestamps
+
+            for col in PRICE_COLUMNS:
+                column = np.memmap(os.path.join(path, f"{col}.bin"), dtype=dtype, mode="w+", shape=(offset,))
+                for ticker, df in price_data.items():
+                    start, length = tickers[ticker]
+                    column[start:start + length] = df[col].to_numpy(dtype=dtype)
+                column.flush()
+                del column
+
+        # Write the header last so a partially written store cannot be opened
+        with open(os.path.join(path, INDEX_FILE), "w") as f:
+            json.dump({"dtype": dtype.name, "rows": offset, "tickers": tickers}, f)
+
+        return PriceStore(path)
+
+    def tickers(self):
+        """Returns the tickers held in the store."""
+        return list(self.index.keys())
+
+    def arrays(self, ticker, start=None, end=None):
+        """
+        Returns read-only views of a ticker's columns.
+        Args:
+            ticker (str): Crypto ticker (e.g., "BTC")
+            start: First timestamp to include (default: first bar)
+            end: Timestamp to stop before (default: past the last bar)
+        Returns:
+            dict: Column name to numpy array view (timestamp as datetime64[ns])
+        """
+        start_row, length = self.index[ticker]
+        stop_row = start_row + length
+        if start is not None or end is not None:
+            # Binary search on the mapped timestamps only touches a few pages
+            timestamps = self.columns["timestamp"][start_row:stop_row]
+            lo = np.searchsorted(timestamps, np.datetime64(start, "ns").astype(np.int64)) if start is not None else 0
+            hi = np.searchsorted(timestamps, np.datetime64(end, "ns").astype(np.int64)) if end is not None else length
+            start_row, stop_row = start_row + lo, start_row + max(hi, lo)
+        views = {"timestamp": np.asarray(self.columns["timestamp"][start_row:stop_row]).view("datetime64[ns]")}
+        for col in PRICE_COLUMNS:
+            views[col] = np.asarray(self.columns[col][start_row:stop_row])
+        return views
+
+    def time_range(self, tickers=None):
+        """
+        Returns the first and last timestamps held for a set of tickers.
+        Args:
+            tickers (list): Tickers to consider (default: all tickers in the store)
+        Returns:
+            tuple: (first, last) as datetime64[ns], or (None, None) if the tickers have no bars
+        """
+        ends = [(self.columns["timestamp"][start], self.columns["timestamp"][start + length - 1])
+                for start, length in (self.index[t] for t in (tickers or self.tickers()) if t in self.index)
+                if length]
+        if not ends:
+            return None, None
+        return (np.datetime64(int(min(first for first, _ in ends)), "ns"),
+                np.datetime64(int(max(last for _, last in ends)), "ns"))
+
+    def frame(self, ticker, start=None, end=None):
+        """
+        Returns a DataFrame whose columns are views into the mapped files (no copy is made).
+        Args:
+            ticker (str): Crypto ticker (e.g., "BTC")
+            start: First timestamp to include (default: first bar)
+            end: Timestamp to stop before (default: past the last bar)
+        Returns:
+            pd.DataFrame: DataFrame with columns timestamp, open, high, low, close, volume
+        """
+        return pd.DataFrame(self.arrays(ticker, start, end), copy=False)
+
+    def frames(self, tickers=None, start=None, end=None):
+        """
+        Returns zero-copy DataFrames usable anywhere price_data is expected.
+        Args:
+            tickers (list): Tickers to open (default: all tickers in the store)
+            start: First timestamp to include (default: first bar)
+            end: Timestamp to stop before (default: past the last bar)
+        Returns:
+            dict: Dictionary mapping tickers to DataFrames
+        """
+        if tickers is None:
+            tickers = self.tickers()
+        return {ticker: self.frame(ticker, start, end) for ticker in tickers if ticker in self.index}
@@ -0,0 +1,155 @@
+import argparse
+import functools
+import json
+import re
+
+from langchain_core.messages import HumanMessage, SystemMessage
+
+from tools.llm_metrics import estimate_tokens
+
+DEFAULT_PROMPT_FILE = "config/prompts.json"
+DEFAULT_COMPACT_PROMPT_FILE = "config/prompts.compact.json"
+
+# Providers whose API takes explicit cache breakpoints. OpenAI and DeepSeek cache repeated prefixes
+# automatically, so for them keeping the persona first and identical across calls is all that is needed.
+# Providers only cache prefixes above a minimum length (e.g., 1024 tokens for Claude Sonnet, 2048 for Haiku);
+# shorter prefixes are simply sent uncached.
+EXPLICIT_CACHE_PROVIDERS = ("Anthropic",)
+
+# Offline persona compaction: (pattern, replacement) applied in order
+COMPACTION_RULES = [
+    # Few-shot voice examples are the longest part of each persona
+    (re.compile(r"^For example, if (?:bullish|bearish):.*$", re.MULTILINE), ""),
+    # Parenthetical examples inside rules
+    (re.compile(r"\s*\(e\.g\.,[^)]*\)"), ""),
+    (re.compile(r", making investment decisions for cryptocurrencies using your principles:"), ", trading crypto. Principles:"),
+    (re.compile(r", making investment decisions for cryptocurrencies using technical analysis principles:"),
+     ", trading crypto with technical analysis. Principles:"),
+    (re.compile(r"When providing your reasoning, be thorough and specific by:"), "Reasoning must cover:"),
+    (re.compile(r"Analyze the provided market data for the specified ticker and decide whether to buy, hold, or sell\. "
+                r"Return your decision as a JSON object with 'action' \(buy/sell/hold\), 'confidence' \(0-1\), and "
+                r"'reasoning' \(detailed text\)\."),
+     "Return JSON: action (buy/sell/hold), confidence (0-1), reasoning."),
+    (re.compile(r"[ \t]+$", re.MULTILINE), ""),
+    (re.compile(r"\n{3,}"), "\n\n"),
+]
+
+
+def build_messages(system, user):
+    """
+    Splits a prompt into a stable system prefix and a variable user suffix.
+    Args:
+        system (str): Text identical across calls (persona and answer format)
+        user (str): Text specific to the call (market data)
+    Returns:
+        list: [SystemMessage, HumanMessage]
+    """
+    return [SystemMessage(content=system), HumanMessage(content=user)]
+
+
+def plain_text(prompt):
+    """Text of a prompt as the model reads it: message contents joined by blank lines."""
+    if isinstance(prompt, (list, tuple)):
+        parts = []
+        for message in prompt:
+            content = getattr(message, "content", message)
+            if isinstance(content, list):
+                content = "".join(block.get("text", "") if isinstance(block, dict) else str(block) for block in content)
+            parts.append(str(content))
+        return "\n\n".join(parts)
+    return str(prompt)
+
+
+def cacheable_prompt(prompt, model_provider):
+    """
+    Marks the system prefix of a prompt as cacheable for providers that take explicit breakpoints.
+    Args:
+        prompt: String or list of messages (see build_messages)
+        model_provider (str): Provider the prompt is sent to
+    Returns:
+        The prompt to send; unchanged for other providers and for plain string prompts
+    """
+    provider = getattr(model_provider, "value", model_provider)
+    if provider not in EXPLICIT_CACHE_PROVIDERS or not isinstance(prompt, (list, tuple)) or not prompt:
+        return prompt
+    first = prompt[0]
+    if not isinstance(first, SystemMessage) or not isinstance(first.content, str):
+        return prompt
+    block = {"type": "text", "text": first.content, "cache_control": {"type": "ephemeral"}}
+    return [SystemMessage(content=[block]), *prompt[1:]]
+
+
+@functools.lru_cache(maxsize=None)
+def _encoding(name):
+    try:
+        import tiktoken
+
+        return tiktoken.get_encoding(name)
+    except Exception:
+        # tiktoken missing, or its encoding file cannot be downloaded (offline)
+        return None
+
+
+def count_tokens(text, encoding="cl100k_base"):
+    """
+    Counts the tokens of a text with tiktoken when it is available, else estimates them.
+    Args:
+        text (str): Text to measure
+        encoding (str): tiktoken encoding (default: cl100k_base)
+    Returns:
+        int: Token count
+    """
+    tokenizer = _encoding(encoding)
+    if tokenizer is None:
+        return estimate_tokens(text)
+    return len(tokenizer.encode(text))
+
+
+def compact_persona(text):
+    """
+    Produces a token-minimal variant of a persona: drops the voice examples and parenthetical examples,
+    shortens the boilerplate and the answer format, and normalizes whitespace.
+    Args:
+        text (str): Persona from config/prompts.json
+    Returns:
+        str: Compacted persona
+    """
+    for pattern, replacement in COMPACTION_RULES:
+        text = pattern.sub(replacement, text)
+    return text.strip()
+
+
+def compact_prompts(source=DEFAULT_PROMPT_FILE, destination=DEFAULT_COMPACT_PROMPT_FILE):
+    """
+    Writes the compacted variant of every persona of a prompt file.
+    Args:
+        source (str): Prompt file to compact (default: config/prompts.json)
+        destination (str): File written, in the same layout (default: config/prompts.compact.json)
+    Returns:
+        dict: {agent: {"tokens": original count, "compact_tokens": compacted count}}
+    """
+    with open(source, "r") as f:
+        prompts = json.load(f)
+    compacted = {name: compact_persona(text) for name, text in prompts.items()}
+    with open(destination, "w") as f:
+        json.dump(compacted, f, indent=2, ensure_ascii=False)
+        f.write("\n")
+    return {name: {"tokens": count_tokens(prompts[name]), "compact_tokens": count_tokens(compacted[name])}
+            for name in prompts}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compact agent personas into a token-minimal prompt file")
+    parser.add_argument("--source", type=str, default=DEFAULT_PROMPT_FILE, help="Defaults to config/prompts.json")
+    parser.add_argument("--output", type=str, default=DEFAULT_COMPACT_PROMPT_FILE,
+                        help="Defaults to config/prompts.compact.json")
+    args = parser.parse_args()
+
+    counts = compact_prompts(args.source, args.output)
+    total, compact = 0, 0
+    for name, count in counts.items():
+        total += count["tokens"]
+        compact += count["compact_tokens"]
+        print(f"{name:<20} {count['tokens']:6d} -> {count['compact_tokens']:6d} tokens")
+    print(f"{'total':<20} {total:6d} -> {compact:6d} tokens ({1 - compact / total:.0%} fewer)")
+    print(f"Set PROMPTS_FILE={args.output} to use the compacted personas")
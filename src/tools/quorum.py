@@ -0,0 +1,144 @@
+import threading
+
+from agents.portfolio_manager import settled_action
+from tools.utils import calculate_volatility
+
+RISK_MANAGER = "Risk Manager"
+
+# RiskManagerAgent scales analyst confidences by this factor when 30-day volatility exceeds the threshold
+HIGH_VOLATILITY = 50
+HIGH_VOLATILITY_SCALE = 0.8
+
+
+class QuorumTracker:
+    """
+    Running per-ticker tallies of the signals of one graph run, shared by every agent (and parallel branch).
+
+    Once the signals received for a ticker settle the portfolio decision whatever the missing ones say
+    (see settled_action), the ticker is decided: agents stop sending LLM calls for it and calls already in
+    flight are cancelled. Every call avoided this way is recorded as skipped.
+    """
+
+    def __init__(self, tickers, n_analysts, confidence_scales=None, buy_threshold=0.6, sell_threshold=0.6):
+        """
+        Initializes empty tallies.
+        Args:
+            tickers (list): Tickers of the run
+            n_analysts (int): Analysts expected to signal each ticker (the Risk Manager comes on top)
+            confidence_scales (dict): Factor the Risk Manager will apply to analyst confidences, by ticker
+                                      (default: 1.0)
+            buy_threshold (float): Average buy confidence needed to buy (default: 0.6)
+            sell_threshold (float): Average sell confidence needed to sell (default: 0.6)
+        """
+        self.n_analysts = n_analysts
+        self.confidence_scales = confidence_scales or {}
+        self.buy_threshold = buy_threshold
+        self.sell_threshold = sell_threshold
+        self.signals = {ticker: {} for ticker in tickers}
+        self.decided = {}
+        self.pending = {}
+        self.skipped = []
+        self.lock = threading.Lock()
+
+    @classmethod
+    def for_run(cls, price_data, tickers, n_analysts, **kwargs):
+        """
+        Creates a tracker whose confidence scales match what RiskManagerAgent will apply.
+        Args:
+            price_data (dict): OHLCV DataFrames by ticker
+            tickers (list): Tickers of the run
+            n_analysts (int): Analysts selected for the run
+            **kwargs: Forwarded to QuorumTracker (buy_threshold, sell_threshold)
+        Returns:
+            QuorumTracker: The tracker
+        """
+        scales = {}
+        for ticker in tickers:
+            df = price_data.get(ticker)
+            volatility = calculate_volatility(df).iloc[-1] if df is not None and not df.empty else 0
+            scales[ticker] = HIGH_VOLATILITY_SCALE if volatility > HIGH_VOLATILITY else 1.0
+        return cls(tickers, n_analysts, scales, **kwargs)
+
+    def is_decided(self, ticker):
+        with self.lock:
+            return ticker in self.decided
+
+    def open_tickers(self, agent, tickers):
+        """
+        Filters out decided tickers before an agent sends its calls, recording each one as skipped.
+        Args:
+            agent (str): Agent about to call the LLM
+            tickers (list): Tickers the agent would analyse
+        Returns:
+            list: Tickers still undecided
+        """
+        open_ = []
+        with self.lock:
+            for ticker in tickers:
+                if ticker in self.decided:
+                    self.skipped.append({"agent": agent, "ticker": ticker, "reason": "not sent"})
+                else:
+                    open_.append(ticker)
+        return open_
+
+    def register(self, agent, ticker, future):
+        """
+        Tracks an in-flight call so it can be cancelled when its ticker is decided.
+        Args:
+            agent (str): Agent that sent the call
+            ticker (str): Ticker of the call
+            future (concurrent.futures.Future): Future of the call (see submit_llm)
+        """
+        with self.lock:
+            if ticker not in self.decided:
+                self.pending.setdefault(ticker, {})[agent] = future
+                return
+            # Decided between open_tickers and the submission
+            if future.cancel():
+                self.skipped.append({"agent": agent, "ticker": ticker, "reason": "cancelled"})
+
+    def record(self, agent, ticker, signal):
+        """
+        Adds a signal to the tallies; if it decides the ticker, the other calls in flight for it are cancelled.
+        Args:
+            agent (str): Agent that produced the signal
+            ticker (str): Ticker of the signal
+            signal (dict): Signal with action and confidence
+        Returns:
+            str: The decided action ("buy" or "sell") if the ticker is decided, otherwise None
+        """
+        with self.lock:
+            self.pending.get(ticker, {}).pop(agent, None)
+            received = self.signals.setdefault(ticker, {})
+            received[agent] = signal
+            if ticker in self.decided:
+                return self.decided[ticker]
+
+            if RISK_MANAGER in received:
+                # The Risk Manager signals last: every call for the ticker is already done
+                return None
+            action = settled_action(
+                list(received.values()),
+                remaining_analysts=max(self.n_analysts - len(received), 0),
+                remaining_other=1,
+                confidence_scale=self.confidence_scales.get(ticker, 1.0),
+                buy_threshold=self.buy_threshold,
+                sell_threshold=self.sell_threshold,
+            )
+            if action is None:
+                return None
+
+            self.decided[ticker] = action
+            for other, future in self.pending.pop(ticker, {}).items():
+                if future.cancel():
+                    self.skipped.append({"agent": other, "ticker": ticker, "reason": "cancelled"})
+            return action
+
+    def report(self):
+        """
+        Summarizes the calls avoided.
+        Returns:
+            dict: decided (action by ticker), skipped_calls (count) and skipped (agent, ticker, reason entries)
+        """
+        with self.lock:
+            return {"decided": dict(self.decided), "skipped_calls": len(self.skipped), "skipped": list(self.skipped)}
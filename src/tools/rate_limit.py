@@ -0,0 +1,48 @@
+import threading
+import time
+
+
+class TokenBucket:
+    """Thread-safe token bucket used to keep request weight under an exchange or provider budget."""
+
+    def __init__(self, rate, capacity=None):
+        """
+        Initializes the bucket.
+        Args:
+            rate (float): Tokens refilled per second
+            capacity (float): Maximum burst size (default: one second worth of tokens)
+        """
+        if rate <= 0:
+            raise ValueError("Token bucket rate must be positive")
+        self.rate = float(rate)
+        self.capacity = float(capacity if capacity is not None else rate)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def try_acquire(self, weight=1.0):
+        """
+        Takes `weight` tokens if they are available right now.
+        Returns:
+            float: 0.0 on success, otherwise the number of seconds to wait before retrying
+        """
+        weight = min(float(weight), self.capacity)
+        with self.lock:
+            self._refill()
+            if self.tokens >= weight:
+                self.tokens -= weight
+                return 0.0
+            return (weight - self.tokens) / self.rate
+
+    def acquire(self, weight=1.0):
+        """Blocks until `weight` tokens are available, then takes them."""
+        while True:
+            wait = self.try_acquire(weight)
+            if wait == 0.0:
+                return
+            time.sleep(wait)
@@ -0,0 +1,107 @@
+import threading
+
+import ccxt
+import numpy as np
+import pandas as pd
+
+from tools.data_fetcher import fetch_crypto_data
+
+DAY_MS = 86_400_000
+
+
+def timeframe_to_ms(timeframe):
+    """Converts a ccxt timeframe string (e.g., "15m") to milliseconds."""
+    return ccxt.Exchange.parse_timeframe(timeframe) * 1000
+
+
+def resample_ohlcv(df, timeframe):
+    """
+    Aggregates OHLCV bars into coarser, UTC-aligned buckets.
+    Buckets are found from timestamp boundaries and reduced with ufunc.reduceat, so the cost is a
+    handful of vectorized passes regardless of the number of buckets.
+    Args:
+        df (pd.DataFrame): Sorted OHLCV DataFrame with timestamp, open, high, low, close, volume columns
+        timeframe (str): Target timeframe dividing a day evenly (e.g., "5m", "1h", "4h", "1d")
+    Returns:
+        pd.DataFrame: Resampled DataFrame with the same columns; trailing partial buckets are kept
+    """
+    bucket_ms = timeframe_to_ms(timeframe)
+    if DAY_MS % bucket_ms != 0:
+        raise ValueError(f"Cannot resample to {timeframe}: timeframe must divide one day evenly")
+
+    if df.empty:
+        return df.iloc[0:0]
+
+    ts_ns = df["timestamp"].to_numpy(dtype="datetime64[ns]").view(np.int64)
+    bucket_ns = bucket_ms * 1_000_000
+    buckets = ts_ns - ts_ns % bucket_ns
+
+    starts = np.flatnonzero(np.r_[True, buckets[1:] != buckets[:-1]])
+    ends = np.r_[starts[1:], len(buckets)] - 1
+
+    return pd.DataFrame({
+        "timestamp": buckets[starts].view("datetime64[ns]"),
+        "open": df["open"].to_numpy()[starts],
+        "high": np.maximum.reduceat(df["high"].to_numpy(), starts),
+        "low": np.minimum.reduceat(df["low"].to_numpy(), starts),
+        "close": df["close"].to_numpy()[ends],
+        "volume": np.add.reduceat(df["volume"].to_numpy(), starts),
+    })
+
+
+class MultiTimeframeLoader:
+    """
+    Fetches the finest timeframe once per (ticker, range) and derives coarser timeframes locally.
+    Every derived series is memoized by (ticker, timeframe, start_date, end_date).
+    """
+
+    def __init__(self, base_timeframe="1m", **fetch_kwargs):
+        """
+        Initializes the loader.
+        Args:
+            base_timeframe (str): Timeframe actually downloaded (default: 1m)
+            **fetch_kwargs: Extra arguments for fetch_crypto_data (e.g., cache, offline, max_workers)
+        """
+        self.base_timeframe = base_timeframe
+        self.base_ms = timeframe_to_ms(base_timeframe)
+        self.fetch_kwargs = fetch_kwargs
+        self.memo = {}
+        self.lock = threading.Lock()
+
+    def get(self, tickers, start_date, end_date, timeframe):
+        """
+        Returns OHLCV data at the requested timeframe, fetching only base bars not seen before.
+        Args:
+            tickers (list): List of crypto tickers (e.g., ["BTC", "ETH", "ADA"])
+            start_date (str): Start date in YYYY-MM-DD format
+            end_date (str): End date in YYYY-MM-DD format
+            timeframe (str): Data timeframe, a multiple of the base timeframe
+        Returns:
+            dict: Dictionary mapping tickers to pandas DataFrames with OHLCV data
+        """
+        if timeframe_to_ms(timeframe) % self.base_ms != 0:
+            raise ValueError(f"Cannot derive {timeframe} from {self.base_timeframe} bars")
+
+        with self.lock:
+            missing = [t for t in tickers if (t, self.base_timeframe, start_date, end_date) not in self.memo]
+            if missing:
+                fetched = fetch_crypto_data(missing, start_date, end_date, timeframe=self.base_timeframe,
+                                            **self.fetch_kwargs)
+                for ticker, df in fetched.items():
+                    self.memo[(ticker, self.base_timeframe, start_date, end_date)] = df
+
+            result = {}
+            for ticker in tickers:
+                base = self.memo.get((ticker, self.base_timeframe, start_date, end_date))
+                if base is None:
+                    continue
+                key = (ticker, timeframe, start_date, end_date)
+                if key not in self.memo:
+                    self.memo[key] = resample_ohlcv(base, timeframe)
+                result[ticker] = self.memo[key]
+            return result
+
+    def clear(self):
+        """Drops every memoized series."""
+        with self.lock:
+            self.memo.clear()
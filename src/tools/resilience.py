@@ -0,0 +1,310 @@
+import asyncio
+import email.utils
+import random
+import threading
+import time
+
+from tools.rate_limit import TokenBucket
+
+# Requests per second allowed per provider (None: no client-side limit); see set_provider_rate_limit
+PROVIDER_RATE_LIMITS = {}
+
+# HTTP statuses worth retrying: timeouts, conflicts, rate limits and server errors
+RETRYABLE_STATUSES = {408, 409, 429}
+
+# Transport failures raised without an HTTP status, matched by class name (across the MRO) so no SDK has to be
+# imported: timeouts and connection errors of httpx, requests, openai, anthropic and google-api-core
+TRANSIENT_ERROR_NAMES = {
+    "TimeoutException", "ConnectError", "NetworkError", "RemoteProtocolError", "APIConnectionError",
+    "APITimeoutError", "Timeout", "ConnectionError", "ServiceUnavailable", "DeadlineExceeded",
+}
+
+# Upper bound on a provider-requested Retry-After, in seconds
+MAX_RETRY_AFTER = 120.0
+
+
+class CircuitOpenError(Exception):
+    """Raised when a provider's circuit breaker is open and calls fail fast."""
+
+
+def status_code(error):
+    """Returns the HTTP status carried by an SDK exception, or None."""
+    for candidate in (getattr(error, "status_code", None), getattr(error, "code", None),
+                      getattr(getattr(error, "response", None), "status_code", None)):
+        if isinstance(candidate, int):
+            return candidate
+    return None
+
+
+def retry_after(error):
+    """
+    Reads the delay a provider asked for in a Retry-After (or retry-after-ms) header.
+    Returns:
+        float: Seconds to wait, or None if the error carries no such header
+    """
+    headers = getattr(getattr(error, "response", None), "headers", None)
+    if headers is None:
+        return None
+    try:
+        if headers.get("retry-after-ms") is not None:
+            return float(headers["retry-after-ms"]) / 1000
+        value = headers.get("retry-after")
+        if value is None:
+            return None
+        try:
+            return float(value)
+        except ValueError:
+            # HTTP-date form
+            return max(0.0, email.utils.parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+def is_transient(error):
+    """Returns True for timeouts and connection failures that carry no HTTP status."""
+    if isinstance(error, (TimeoutError, ConnectionError, asyncio.TimeoutError)):
+        return True
+    return any(cls.__name__ in TRANSIENT_ERROR_NAMES for cls in type(error).__mro__)
+
+
+def is_parse_error(error):
+    """
+    Returns True when the provider answered but the answer could not be used (invalid JSON, schema validation).
+    JSONDecodeError, pydantic's ValidationError and LangChain's OutputParserException are all ValueErrors.
+    """
+    return isinstance(error, ValueError) and status_code(error) is None
+
+
+def is_retryable(error):
+    """
+    Rate limits, timeouts, server errors and connection failures are retried; client errors and local errors
+    (a bug in the calling code, a parse error) are not.
+    """
+    if isinstance(error, CircuitOpenError):
+        return False
+    status = status_code(error)
+    if status is None:
+        return is_transient(error)
+    return status in RETRYABLE_STATUSES or status >= 500
+
+
+class RetryPolicy:
+    """Exponential backoff with full jitter, deferring to Retry-After when the provider sends one."""
+
+    def __init__(self, base_delay=1.0, max_delay=30.0, multiplier=2.0):
+        """
+        Initializes the policy.
+        Args:
+            base_delay (float): Delay ceiling of the first retry, in seconds (default: 1)
+            max_delay (float): Largest backoff ceiling, in seconds (default: 30)
+            multiplier (float): Growth of the ceiling per attempt (default: 2)
+        """
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.multiplier = multiplier
+
+    def delay(self, attempt, error=None):
+        """
+        Seconds to wait before retrying after a failed attempt.
+        Args:
+            attempt (int): Zero-based index of the attempt that failed
+            error (Exception): The failure, checked for a Retry-After header
+        Returns:
+            float: Delay in seconds
+        """
+        requested = retry_after(error) if error is not None else None
+        if requested is not None:
+            return min(requested, MAX_RETRY_AFTER)
+        return random.uniform(0, min(self.max_delay, self.base_delay * self.multiplier ** attempt))
+
+
+class CircuitBreaker:
+    """
+    Closed / open / half-open breaker. After `failure_threshold` consecutive retryable failures the
+    circuit opens and calls fail fast; after `reset_timeout` seconds a single probe call is let through,
+    and its outcome closes or reopens the circuit.
+    """
+
+    def __init__(self, failure_threshold=5, reset_timeout=30.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at = None
+        self.probing = False
+        self.lock = threading.Lock()
+
+    @property
+    def state(self):
+        if self.opened_at is None:
+            return "closed"
+        return "half-open" if time.monotonic() - self.opened_at >= self.reset_timeout else "open"
+
+    def allow(self):
+        """Returns True if a call may go out now (taking the probe slot when half-open)."""
+        with self.lock:
+            state = self.state
+            if state == "closed":
+                return True
+            if state == "half-open" and not self.probing:
+                self.probing = True
+                return True
+            return False
+
+    def record_success(self):
+        with self.lock:
+            self.failures = 0
+            self.opened_at = None
+            self.probing = False
+
+    def record_failure(self):
+        with self.lock:
+            self.failures += 1
+            if self.probing or self.failures >= self.failure_threshold:
+                self.opened_at = time.monotonic()
+            self.probing = False
+
+    def release(self):
+        """Frees the probe slot without a verdict, for calls that failed before reaching the provider."""
+        with self.lock:
+            self.probing = False
+
+
+class ProviderGuard:
+    """
+    Per-provider admission control shared by every thread and task: an optional token bucket,
+    a cooldown set when the provider answers 429, a circuit breaker, and counters.
+    """
+
+    def __init__(self, provider, rate=None, burst=None):
+        """
+        Initializes the guard.
+        Args:
+            provider (str): Provider name
+            rate (float): Requests per second allowed (default: no client-side limit)
+            burst (float): Requests allowed in a burst (default: one second worth)
+        """
+        self.provider = provider
+        self.bucket = TokenBucket(rate, burst) if rate else None
+        self.breaker = CircuitBreaker()
+        self.cooldown_until = 0.0
+        self.lock = threading.Lock()
+        self.stats = {"calls": 0, "failures": 0, "retries": 0, "rate_limited": 0, "circuit_rejections": 0,
+                      "defaults": 0}
+
+    def count(self, name, n=1):
+        with self.lock:
+            self.stats[name] += n
+
+    def try_acquire(self):
+        """
+        Admits one call if possible.
+        Returns:
+            float: 0.0 if the call may go out now, otherwise seconds to wait before asking again
+        Raises:
+            CircuitOpenError: If the circuit is open
+        """
+        wait = self.cooldown_until - time.monotonic()
+        if wait > 0:
+            return wait
+        # The breaker is asked first so a rejected call never spends a rate-limit token
+        probe = self.breaker.state != "closed"
+        if not self.breaker.allow():
+            self.count("circuit_rejections")
+            raise CircuitOpenError(f"{self.provider} circuit is open; failing fast")
+        if self.bucket is not None:
+            wait = self.bucket.try_acquire()
+            if wait > 0:
+                if probe:
+                    # Hand the probe slot back while waiting for a token
+                    self.breaker.release()
+                return wait
+        self.count("calls")
+        return 0.0
+
+    def acquire(self):
+        """Blocks until a call is admitted."""
+        while True:
+            wait = self.try_acquire()
+            if wait == 0.0:
+                return
+            time.sleep(wait)
+
+    async def acquire_async(self):
+        """Waits, without blocking the event loop, until a call is admitted."""
+        while True:
+            wait = self.try_acquire()
+            if wait == 0.0:
+                return
+            await asyncio.sleep(wait)
+
+    def record_success(self):
+        self.breaker.record_success()
+
+    def record_failure(self, error):
+        """
+        Records a failed call; 429s pause the whole provider for the requested time.
+        A 429 is throttling, not an outage, so it only sets the cooldown and never counts toward the circuit.
+        Returns:
+            bool: True if the call should be retried
+        """
+        if isinstance(error, CircuitOpenError):
+            return False
+        self.count("failures")
+        retryable = is_retryable(error)
+        if status_code(error) == 429:
+            self.count("rate_limited")
+            requested = retry_after(error)
+            if requested:
+                with self.lock:
+                    self.cooldown_until = max(self.cooldown_until, time.monotonic() + min(requested, MAX_RETRY_AFTER))
+            self.breaker.release()
+        elif retryable:
+            self.breaker.record_failure()
+        elif status_code(error) is not None:
+            # A client error (bad request, auth) means the provider answered: it is not an outage
+            self.breaker.record_success()
+        else:
+            # A local error (e.g., TypeError) says nothing about the provider
+            self.breaker.release()
+        return retryable
+
+
+_guards = {}
+_guards_lock = threading.Lock()
+
+
+def provider_guard(model_provider):
+    """Returns the shared guard of a provider, creating it on first use."""
+    provider = getattr(model_provider, "value", model_provider)
+    with _guards_lock:
+        if provider not in _guards:
+            rate, burst = PROVIDER_RATE_LIMITS.get(provider, (None, None))
+            _guards[provider] = ProviderGuard(provider, rate, burst)
+        return _guards[provider]
+
+
+def set_provider_rate_limit(model_provider, requests_per_second, burst=None):
+    """
+    Sets a client-side request rate for a provider, shared across threads and tasks.
+    Args:
+        model_provider (str): Provider name
+        requests_per_second (float): Sustained request rate; None removes the limit
+        burst (float): Requests allowed in a burst (default: one second worth)
+    """
+    provider = getattr(model_provider, "value", model_provider)
+    PROVIDER_RATE_LIMITS[provider] = (requests_per_second, burst)
+    with _guards_lock:
+        guard = _guards.get(provider)
+        if guard is not None:
+            guard.bucket = TokenBucket(requests_per_second, burst) if requests_per_second else None
+
+
+def resilience_stats():
+    """
+    Returns per-provider counters.
+    Returns:
+        dict: {provider: {calls, failures, retries, rate_limited, circuit_rejections, defaults, circuit}}
+    """
+    with _guards_lock:
+        guards = list(_guards.values())
+    return {guard.provider: {**guard.stats, "circuit": guard.breaker.state} for guard in guards}
@@ -0,0 +1,156 @@
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from tools.metrics import infer_periods_per_year
+
+# Paths resampled per chunk; bounds memory at a few chunk x n_returns arrays
+DEFAULT_CHUNK_SIZE = 2000
+
+
+def block_bootstrap_indices(n_returns, n_paths, block_size, rng):
+    """
+    Draws circular moving-block bootstrap indices.
+    Args:
+        n_returns (int): Length of the original return series
+        n_paths (int): Number of resampled paths
+        block_size (int): Length of every block
+        rng (np.random.Generator): Random generator
+    Returns:
+        np.ndarray: (n_paths, n_returns) int64 indices into the original series
+    """
+    n_blocks = -(-n_returns // block_size)
+    starts = rng.integers(0, n_returns, size=(n_paths, n_blocks, 1))
+    indices = (starts + np.arange(block_size)).reshape(n_paths, -1)[:, :n_returns]
+    return indices % n_returns
+
+
+def stationary_bootstrap_indices(n_returns, n_paths, mean_block_size, rng):
+    """
+    Draws Politis-Romano stationary bootstrap indices (geometric block lengths, circular wrap).
+    Args:
+        n_returns (int): Length of the original return series
+        n_paths (int): Number of resampled paths
+        mean_block_size (float): Expected block length
+        rng (np.random.Generator): Random generator
+    Returns:
+        np.ndarray: (n_paths, n_returns) int64 indices into the original series
+    """
+    new_block = rng.random((n_paths, n_returns), dtype=np.float32) < 1.0 / mean_block_size
+    new_block[:, 0] = True
+
+    # Each block jumps to a random origin: store (origin - step) at block starts as differences
+    # between consecutive jumps, so a row-wise cumsum forward-fills every block's offset
+    _, steps = np.nonzero(new_block)
+    jumps = rng.integers(0, n_returns, size=len(steps)) - steps
+    deltas = np.diff(jumps, prepend=0)
+    row_starts = steps == 0
+    deltas[row_starts] = jumps[row_starts]
+
+    indices = np.zeros((n_paths, n_returns), dtype=np.int64)
+    indices[new_block] = deltas
+    np.cumsum(indices, axis=1, out=indices)
+    indices += np.arange(n_returns)
+    indices %= n_returns
+    return indices
+
+
+def _path_metrics(returns, log_growth, indices, periods_per_year):
+    """Computes final return, max drawdown and Sharpe ratio (calculate_metrics units) for each path."""
+    paths = returns[indices]
+    log_equity = np.cumsum(log_growth[indices], axis=1)
+
+    # Drawdowns in log space avoid dividing the whole equity matrix by its running peak
+    peak = np.maximum.accumulate(np.maximum(log_equity, 0.0), axis=1)
+    max_drawdown = np.expm1((log_equity - peak).min(axis=1))
+
+    n = paths.shape[1]
+    mean = paths.sum(axis=1) / n
+    variance = np.maximum(np.einsum("ij,ij->i", paths, paths) - n * mean * mean, 0.0) / (n - 1)
+    std = np.sqrt(variance)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        sharpe = np.where(std != 0, mean / std * np.sqrt(periods_per_year), 0.0)
+
+    return np.column_stack([np.expm1(log_equity[:, -1]) * 100, max_drawdown * 100, sharpe])
+
+
+def _run_chunk(returns, n_paths, method, block_size, periods_per_year, seed):
+    rng = np.random.default_rng(seed)
+    log_growth = np.log1p(returns)
+    if method == "block":
+        indices = block_bootstrap_indices(len(returns), n_paths, block_size, rng)
+    else:
+        indices = stationary_bootstrap_indices(len(returns), n_paths, block_size, rng)
+    return _path_metrics(returns, log_growth, indices, periods_per_year)
+
+
+def bootstrap_paths(returns, n_paths=10000, method="stationary", block_size=24, periods_per_year=365.0,
+                    chunk_size=DEFAULT_CHUNK_SIZE, max_workers=1, seed=None):
+    """
+    Resamples a strategy's returns into many synthetic paths and measures each one.
+    Paths are generated as 2D arrays, one chunk at a time, optionally across processes.
+    Args:
+        returns: Per-bar returns (e.g., Backtester results['returns'])
+        n_paths (int): Number of bootstrap paths (default: 10000)
+        method (str): "stationary" (geometric block lengths) or "block" (fixed-length blocks)
+        block_size (int): Block length, or mean block length for the stationary bootstrap (default: 24)
+        periods_per_year (float): Bars per year used to annualize Sharpe (default: 365, daily bars)
+        chunk_size (int): Paths resampled per chunk (default: 2000)
+        max_workers (int): Worker processes; 1 runs in-process (default: 1)
+        seed (int): Seed for reproducible draws
+    Returns:
+        pd.DataFrame: One row per path with final_return (%), max_drawdown (%) and sharpe_ratio
+    """
+    if method not in ("stationary", "block"):
+        raise ValueError(f"Unknown bootstrap method: {method}")
+    returns = np.asarray(returns, dtype=np.float64)
+    if len(returns) < 2:
+        raise ValueError("At least two returns are needed to bootstrap")
+
+    sizes = [min(chunk_size, n_paths - start) for start in range(0, n_paths, chunk_size)]
+    seeds = np.random.SeedSequence(seed).spawn(len(sizes))
+    args = [(returns, size, method, block_size, periods_per_year, child) for size, child in zip(sizes, seeds)]
+
+    if max_workers > 1:
+        with ProcessPoolExecutor(max_workers=max_workers) as executor:
+            chunks = list(executor.map(_run_chunk, *zip(*args)))
+    else:
+        chunks = [_run_chunk(*a) for a in args]
+
+    return pd.DataFrame(np.concatenate(chunks), columns=["final_return", "max_drawdown", "sharpe_ratio"])
+
+
+def summarize_paths(paths, percentiles=(5, 25, 50, 75, 95)):
+    """
+    Summarizes bootstrap distributions.
+    Args:
+        paths (pd.DataFrame): Output of bootstrap_paths
+        percentiles (tuple): Percentiles to report (default: 5, 25, 50, 75, 95)
+    Returns:
+        pd.DataFrame: Mean and percentiles per metric, plus the probability of a loss
+    """
+    summary = paths.quantile([p / 100 for p in percentiles]).T
+    summary.columns = [f"p{p}" for p in percentiles]
+    summary.insert(0, "mean", paths.mean())
+    summary["prob_loss"] = np.nan
+    summary.loc["final_return", "prob_loss"] = (paths["final_return"] < 0).mean()
+    return summary
+
+
+def bootstrap_backtest(results, n_paths=10000, periods_per_year=None, **kwargs):
+    """
+    Bootstraps the returns of a Backtester run.
+    Args:
+        results (pd.DataFrame): Output of Backtester.run, run_vectorized or run_matrix
+        n_paths (int): Number of bootstrap paths (default: 10000)
+        periods_per_year (float): Bars per year (default: inferred from the timestamp spacing)
+        **kwargs: Forwarded to bootstrap_paths (method, block_size, chunk_size, max_workers, seed)
+    Returns:
+        pd.DataFrame: One row per path, as returned by bootstrap_paths
+    """
+    if periods_per_year is None:
+        periods_per_year = infer_periods_per_year(results['timestamp'])
+    # The first bar has no previous value; its return is a filled zero
+    returns = results['returns'].to_numpy(dtype=np.float64)[1:]
+    return bootstrap_paths(returns, n_paths, periods_per_year=periods_per_year, **kwargs)
@@ -0,0 +1,144 @@
+import itertools
+import os
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+
+import numpy as np
+import pandas as pd
+
+from agents.portfolio_manager import decide_trade
+from tools.backtester import Backtester, align_price_matrix
+
+# Parameters a sweep can vary, with the values hard-coded in portfolio_management_agent and Backtester
+DEFAULT_PARAMS = {
+    "transaction_cost": 0.001,
+    "buy_threshold": 0.6,
+    "sell_threshold": 0.6,
+    "position_size": 0.2,
+}
+
+
+def expand_grid(grid):
+    """
+    Expands a parameter grid into a list of parameter dicts.
+    Args:
+        grid (dict): Parameter name to list of values (e.g., {"buy_threshold": [0.5, 0.6]})
+    Returns:
+        list: One dict per combination, with unspecified parameters set to DEFAULT_PARAMS
+    """
+    unknown = set(grid) - set(DEFAULT_PARAMS)
+    if unknown:
+        raise ValueError(f"Unknown sweep parameters: {', '.join(sorted(unknown))}")
+    names = list(grid.keys())
+    return [{**DEFAULT_PARAMS, **dict(zip(names, values))} for values in itertools.product(*grid.values())]
+
+
+def history_to_signals(signal_history, buy_threshold=0.6, sell_threshold=0.6, position_size=0.2):
+    """
+    Replays the portfolio manager's decision rule over recorded analyst signals.
+    Args:
+        signal_history (list): Dicts with 'timestamp' and 'analyst_signals' ({analyst: {ticker: signal}})
+        buy_threshold (float): Average buy confidence needed to buy
+        sell_threshold (float): Average sell confidence needed to sell
+        position_size (float): Fraction of the portfolio traded
+    Returns:
+        list: Backtester signal dicts with 'timestamp', 'asset', 'action', 'size', 'confidence'
+    """
+    signals = []
+    for entry in signal_history:
+        by_ticker = {}
+        for analyst_signals in entry["analyst_signals"].values():
+            for ticker, signal in analyst_signals.items():
+                by_ticker.setdefault(ticker, []).append(signal)
+        for ticker, ticker_signals in by_ticker.items():
+            decision = decide_trade(ticker_signals, buy_threshold, sell_threshold, position_size)
+            signals.append({"timestamp": entry["timestamp"], "asset": ticker, **decision})
+    return signals
+
+
+class SharedPriceMatrix:
+    """Aligned timestamp x ticker close matrix placed once in shared memory for worker processes."""
+
+    def __init__(self, price_data):
+        """
+        Copies the aligned close prices into a new shared memory segment.
+        Args:
+            price_data (dict): Dictionary of DataFrames with OHLCV data for each ticker
+        """
+        timestamps, self.tickers, prices = align_price_matrix(price_data)
+        self.shape = prices.shape
+        self.shm = shared_memory.SharedMemory(create=True, size=max(timestamps.nbytes + prices.nbytes, 1))
+        self.timestamps, self.prices = self.views(self.shm, self.shape)
+        self.timestamps[:] = timestamps
+        self.prices[:] = prices
+
+    @staticmethod
+    def views(shm, shape):
+        """Returns (timestamps, prices) arrays laid over a shared memory buffer."""
+        n_rows, n_tickers = shape
+        timestamps = np.ndarray((n_rows,), dtype="datetime64[ns]", buffer=shm.buf)
+        prices = np.ndarray(shape, dtype=np.float64, buffer=shm.buf, offset=n_rows * 8)
+        return timestamps, prices
+
+    @property
+    def spec(self):
+        """Picklable description workers use to attach to the segment."""
+        return {"name": self.shm.name, "shape": self.shape, "tickers": self.tickers}
+
+    def close(self):
+        """Releases and removes the segment."""
+        self.timestamps = self.prices = None
+        self.shm.close()
+        self.shm.unlink()
+
+
+# Per-process state set by _init_worker, so each task only ships its parameter dict
+_worker = {}
+
+
+def _init_worker(spec, signal_history, initial_cash):
+    shm = shared_memory.SharedMemory(name=spec["name"])
+    timestamps, prices = SharedPriceMatrix.views(shm, spec["shape"])
+    timestamps.flags.writeable = False
+    prices.flags.writeable = False
+    _worker.update(shm=shm, timestamps=timestamps, prices=prices, tickers=spec["tickers"],
+                   signal_history=signal_history, initial_cash=initial_cash)
+
+
+def _run_point(params):
+    signals = history_to_signals(_worker["signal_history"], params["buy_threshold"],
+                                 params["sell_threshold"], params["position_size"])
+    backtester = Backtester(initial_cash=_worker["initial_cash"], transaction_cost=params["transaction_cost"])
+    results = backtester.run_matrix(signals, _worker["timestamps"], _worker["tickers"], _worker["prices"])
+    return {**params, **backtester.calculate_metrics(results), "trades": len(backtester.trades)}
+
+
+def run_sweep(signal_history, price_data, grid, initial_cash=100000, max_workers=None, chunksize=None):
+    """
+    Backtests every point of a parameter grid across a process pool.
+    The aligned price matrix is written once to shared memory and every worker attaches to it,
+    so price data is never pickled per run.
+    Args:
+        signal_history (list): Dicts with 'timestamp' and 'analyst_signals' ({analyst: {ticker: signal}})
+        price_data (dict): Dictionary of DataFrames with OHLCV data for each ticker
+        grid (dict): Parameter name to list of values; see DEFAULT_PARAMS for the names
+        initial_cash (float): Initial cash of every run (default: $100,000)
+        max_workers (int): Number of worker processes (default: CPU count)
+        chunksize (int): Grid points sent to a worker at once (default: about 4 chunks per worker)
+    Returns:
+        pd.DataFrame: One row per grid point with its parameters, calculate_metrics output and trade count
+    """
+    points = expand_grid(grid)
+    max_workers = max_workers or os.cpu_count() or 1
+    if chunksize is None:
+        chunksize = max(1, len(points) // (max_workers * 4))
+
+    matrix = SharedPriceMatrix(price_data)
+    try:
+        with ProcessPoolExecutor(max_workers=max_workers, initializer=_init_worker,
+                                 initargs=(matrix.spec, signal_history, initial_cash)) as executor:
+            rows = list(executor.map(_run_point, points, chunksize=chunksize))
+    finally:
+        matrix.close()
+
+    return pd.DataFrame(rows)
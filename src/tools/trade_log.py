@@ -0,0 +1,203 @@
+import numpy as np
+import pandas as pd
+
+# Side codes stored in the side column
+SIDES = ("buy", "sell", "short", "cover")
+SIDE_CODES = {side: code for code, side in enumerate(SIDES)}
+
+TRADE_COLUMNS = {
+    "timestamp": np.int64,  # nanoseconds since epoch
+    "asset_id": np.int32,
+    "side": np.int8,
+    "quantity": np.float64,
+    "price": np.float64,
+    "notional": np.float64,  # quantity * price, before fees
+    "fee": np.float64,
+}
+
+TRADE_FORMATS = ("parquet", "arrow")
+
+
+class TradeLog:
+    """
+    Columnar trade log held in preallocated, growable typed buffers.
+
+    Each column is a NumPy array that doubles in capacity when full, so appending a trade writes seven
+    scalars instead of allocating a dict. Assets are interned as integer ids. With a spill path, every
+    `spill_rows` trades are streamed to a Parquet or Arrow IPC file and the buffers are reused, so memory
+    stays flat however many trades a run produces.
+    """
+
+    def __init__(self, capacity=1024, spill_path=None, spill_rows=1_000_000, format="parquet"):
+        """
+        Initializes an empty log.
+        Args:
+            capacity (int): Initial number of rows allocated per column (default: 1024)
+            spill_path (str): File the log is streamed to once it holds spill_rows trades (default: keep in memory)
+            spill_rows (int): Trades buffered before each write to spill_path (default: 1,000,000)
+            format (str): Spill file format, "parquet" or "arrow" (Arrow IPC file)
+        """
+        if format not in TRADE_FORMATS:
+            raise ValueError(f"Unknown trade log format: {format}")
+        self.columns = {name: np.empty(max(capacity, 1), dtype=dtype) for name, dtype in TRADE_COLUMNS.items()}
+        self._views = self._memoryviews()
+        self.size = 0
+        self.assets = []
+        self.asset_ids = {}
+        self.spill_path = spill_path
+        self.spill_rows = spill_rows
+        self.format = format
+        self.spilled = 0
+        self.spilled_cash_flow = 0.0
+        self._writer = None
+
+    def __len__(self):
+        """Number of trades logged, including those already spilled."""
+        return self.spilled + self.size
+
+    def asset_id(self, asset):
+        """Returns the id of an asset, interning it on first use."""
+        k = self.asset_ids.get(asset)
+        if k is None:
+            k = self.asset_ids[asset] = len(self.assets)
+            self.assets.append(asset)
+        return k
+
+    def _memoryviews(self):
+        # Item assignment through a memoryview skips NumPy's scalar conversion, the bulk of a per-row append
+        return tuple(memoryview(self.columns[name]) for name in TRADE_COLUMNS)
+
+    def _grow(self):
+        capacity = len(self.columns["timestamp"]) * 2
+        for name, column in self.columns.items():
+            grown = np.empty(capacity, dtype=column.dtype)
+            grown[:self.size] = column[:self.size]
+            self.columns[name] = grown
+        self._views = self._memoryviews()
+
+    def append(self, timestamp, side, asset, quantity, price, fee=0.0):
+        """
+        Logs one fill.
+        Args:
+            timestamp (int): Fill time in nanoseconds since epoch
+            side (str): buy, sell, short or cover
+            asset (str): Ticker traded
+            quantity (float): Units traded
+            price (float): Fill price
+            fee (float): Transaction fee paid
+        """
+        i = self.size
+        if i == len(self.columns["timestamp"]):
+            self._grow()
+        ts_col, asset_col, side_col, qty_col, price_col, notional_col, fee_col = self._views
+        ts_col[i] = timestamp
+        asset_col[i] = self.asset_id(asset)
+        side_col[i] = SIDE_CODES[side]
+        qty_col[i] = quantity
+        price_col[i] = price
+        notional_col[i] = quantity * price
+        fee_col[i] = fee
+        self.size = i + 1
+        if self.spill_path and self.size >= self.spill_rows:
+            self.flush()
+
+    def arrays(self):
+        """Returns {column: array} views of the buffered trades, without copying."""
+        return {name: column[:self.size] for name, column in self.columns.items()}
+
+    def to_frame(self):
+        """
+        Returns the buffered trades as a DataFrame backed by the log's buffers.
+        Columns: timestamp, asset, side (categoricals over the interned codes), quantity, price, notional, fee.
+        The frame shares memory with the log, so it is only valid until the next append or flush.
+        """
+        columns = self.arrays()
+        frame = {
+            "timestamp": columns["timestamp"].view("datetime64[ns]"),
+            "asset": pd.Categorical.from_codes(columns["asset_id"], categories=pd.Index(self.assets, dtype=object)),
+            "side": pd.Categorical.from_codes(columns["side"], categories=list(SIDES)),
+        }
+        for name in ("quantity", "price", "notional", "fee"):
+            frame[name] = columns[name]
+        return pd.DataFrame(frame, copy=False)
+
+    def to_records(self):
+        """Returns the buffered trades as a NumPy record array (asset and side stay integer codes)."""
+        columns = self.arrays()
+        return np.rec.fromarrays(list(columns.values()), names=list(columns.keys()))
+
+    def cash_flows(self):
+        """Cash moved by each buffered trade: notional plus fee for buys and covers, minus fee otherwise."""
+        columns = self.arrays()
+        paying = (columns["side"] == SIDE_CODES["buy"]) | (columns["side"] == SIDE_CODES["cover"])
+        return columns["notional"] + np.where(paying, columns["fee"], -columns["fee"])
+
+    def total_cash_flow(self):
+        """Total cash moved by every trade logged, including those already spilled."""
+        return self.spilled_cash_flow + float(self.cash_flows().sum())
+
+    def _record_batch(self, start, stop):
+        import pyarrow as pa
+
+        columns = {name: column[start:stop] for name, column in self.columns.items()}
+        assets = pa.array(self.assets, type=pa.string())
+        return pa.record_batch({
+            "timestamp": pa.array(columns["timestamp"].view("datetime64[ns]")),
+            "asset": pa.DictionaryArray.from_arrays(columns["asset_id"], assets).dictionary_decode(),
+            "side": pa.DictionaryArray.from_arrays(columns["side"], pa.array(SIDES)).dictionary_decode(),
+            "quantity": columns["quantity"],
+            "price": columns["price"],
+            "notional": columns["notional"],
+            "fee": columns["fee"],
+        })
+
+    @staticmethod
+    def _open_writer(path, schema, format):
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        if format == "parquet":
+            return pq.ParquetWriter(path, schema)
+        return pa.ipc.new_file(path, schema)
+
+    def write(self, path, format="parquet", chunk_rows=1_000_000):
+        """
+        Writes the buffered trades to a file, one record batch of chunk_rows trades at a time.
+        Args:
+            path (str): Output file
+            format (str): "parquet" or "arrow" (Arrow IPC file)
+            chunk_rows (int): Trades converted per batch, which bounds the extra memory used (default: 1,000,000)
+        """
+        if format not in TRADE_FORMATS:
+            raise ValueError(f"Unknown trade log format: {format}")
+        writer = None
+        try:
+            # An empty log still writes a file with the schema
+            for start in range(0, max(self.size, 1), chunk_rows):
+                batch = self._record_batch(start, min(start + chunk_rows, self.size))
+                if writer is None:
+                    writer = self._open_writer(path, batch.schema, format)
+                if batch.num_rows:
+                    writer.write_batch(batch)
+        finally:
+            if writer is not None:
+                writer.close()
+
+    def flush(self):
+        """Streams the buffered trades to spill_path and empties the buffers."""
+        if not self.spill_path or self.size == 0:
+            return
+        batch = self._record_batch(0, self.size)
+        if self._writer is None:
+            self._writer = self._open_writer(self.spill_path, batch.schema, self.format)
+        self._writer.write_batch(batch)
+        self.spilled_cash_flow += float(self.cash_flows().sum())
+        self.spilled += self.size
+        self.size = 0
+
+    def close(self):
+        """Flushes any remaining trades and closes the spill file."""
+        self.flush()
+        if self._writer is not None:
+            self._writer.close()
+            self._writer = None
@@ -7,14 +7,66 @@ logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(
 logger = logging.getLogger(__name__)
 
 
-def normalize_ohlcv_data(df):
+OHLCV_COLUMNS = ['timestamp', 'open', 'high', 'low', 'close', 'volume']
+
+# Price/volume dtype used by the compact profile; timestamps stay datetime64[ns] (int64 epoch nanoseconds)
+COMPACT_PRICE_DTYPE = 'float32'
+
+
+def is_normalized_ohlcv(df):
+    """
+    Checks whether a DataFrame already has the canonical OHLCV layout produced by normalize_ohlcv_data.
+    Args:
+        df (pd.DataFrame): DataFrame to inspect
+    Returns:
+        bool: True if columns, dtypes, ordering and missing values already match the normalized form
+    """
+    # Cheap schema checks first, O(n) scans last
+    if list(df.columns) != OHLCV_COLUMNS:
+        return False
+    if not pd.api.types.is_datetime64_any_dtype(df['timestamp']):
+        return False
+    for col in OHLCV_COLUMNS[1:]:
+        if not pd.api.types.is_numeric_dtype(df[col]):
+            return False
+    if not isinstance(df.index, pd.RangeIndex) or df.index.start != 0 or df.index.step != 1:
+        return False
+    return df['timestamp'].is_monotonic_increasing and not (df['timestamp'].hasnans or df['close'].hasnans)
+
+
+def compact_ohlcv_dtypes(df, copy=True):
+    """
+    Casts price and volume columns to float32, roughly halving resident memory of a normalized frame.
+    Args:
+        df (pd.DataFrame): Normalized OHLCV DataFrame
+        copy (bool): Return a new DataFrame instead of modifying `df` (default: True)
+    Returns:
+        pd.DataFrame: DataFrame with float32 open, high, low, close, volume columns
+    """
+    if copy:
+        df = df.copy()
+    for col in OHLCV_COLUMNS[1:]:
+        if df[col].dtype != COMPACT_PRICE_DTYPE:
+            df[col] = df[col].astype(COMPACT_PRICE_DTYPE)
+    return df
+
+
+def normalize_ohlcv_data(df, copy=True, compact=False):
     """
     Normalizes OHLCV data into a standard format.
+    Frames that are already normalized (see is_normalized_ohlcv) skip renaming, coercion, dropna and sorting.
     Args:
         df (pd.DataFrame): DataFrame with potential variations in column names
+        copy (bool): If False, reuse and modify `df` where possible instead of copying it (default: True)
+        compact (bool): Store prices and volume as float32 (default: False)
     Returns:
         pd.DataFrame: Normalized DataFrame with columns: timestamp, open, high, low, close, volume
     """
+    if is_normalized_ohlcv(df):
+        if compact:
+            return compact_ohlcv_dtypes(df, copy=copy)
+        return df.copy() if copy else df
+
     # Standardize column names
     column_mapping = {
         'Date': 'timestamp',
@@ -32,10 +84,13 @@ def normalize_ohlcv_data(df):
         'volume': 'volume'
     }
 
-    df = df.rename(columns=column_mapping)
+    if copy:
+        df = df.rename(columns=column_mapping)
+    else:
+        df.rename(columns=column_mapping, inplace=True)
 
     # Ensure required columns are present
-    required_columns = ['timestamp', 'open', 'high', 'low', 'close', 'volume']
+    required_columns = OHLCV_COLUMNS
     for col in required_columns:
         if col not in df.columns:
             logger.warning(f"Missing column {col}, filling with NaN")
@@ -52,15 +107,24 @@ def normalize_ohlcv_data(df):
     # Convert numeric columns to float
     numeric_cols = ['open', 'high', 'low', 'close', 'volume']
     for col in numeric_cols:
-        df[col] = pd.to_numeric(df[col], errors='coerce')
+        if not pd.api.types.is_numeric_dtype(df[col]):
+            df[col] = pd.to_numeric(df[col], errors='coerce')
 
     # Drop rows with missing critical data
-    df = df.dropna(subset=['timestamp', 'close'])
+    if df['timestamp'].hasnans or df['close'].hasnans:
+        df = df.dropna(subset=['timestamp', 'close'])
 
     # Sort by timestamp
-    df = df.sort_values('timestamp').reset_index(drop=True)
-
-    return df[required_columns]
+    if not df['timestamp'].is_monotonic_increasing:
+        df = df.sort_values('timestamp')
+    if not isinstance(df.index, pd.RangeIndex) or df.index.start != 0 or df.index.step != 1:
+        df = df.reset_index(drop=True)
+
+    if list(df.columns) != required_columns:
+        df = df[required_columns]
+    if compact:
+        df = compact_ohlcv_dtypes(df, copy=False)
+    return df
 
 
 def date_to_timestamp(date_str, format="%Y-%m-%d"):
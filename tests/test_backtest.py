@@ -0,0 +1,57 @@
+import sqlite3
+
+import pytest
+
+from backtest import SignalStore, bar_timeframe, signal_context
+
+
+@pytest.mark.parametrize("frequency, timeframe", [
+    ("1D", "1d"), ("7D", "1d"), ("MS", "1d"), ("4h", "4h"), ("3h", "1h"), ("90min", "30m"),
+])
+def test_bar_timeframe_lines_up_with_frequency(frequency, timeframe):
+    assert bar_timeframe(frequency) == timeframe
+
+
+def test_bar_timeframe_rejects_sub_minute_frequency():
+    with pytest.raises(ValueError):
+        bar_timeframe("90s")
+
+
+def test_signal_context_tracks_lookback_timeframe_and_personas(tmp_path):
+    prompts = tmp_path / "prompts.json"
+    prompts.write_text('{"Technical Analyst": "You are a chartist."}')
+    context = signal_context(90, "1d", prompt_file=str(prompts))
+
+    assert signal_context(90, "1d", prompt_file=str(prompts)) == context
+    assert signal_context(30, "1d", prompt_file=str(prompts)) != context
+    assert signal_context(90, "4h", prompt_file=str(prompts)) != context
+    assert signal_context(90, "1d", batch_signals=True, prompt_file=str(prompts)) != context
+    prompts.write_text('{"Technical Analyst": "You are a contrarian."}')
+    assert signal_context(90, "1d", prompt_file=str(prompts)) != context
+
+
+def test_signal_store_only_loads_matching_context(tmp_path):
+    store = SignalStore(str(tmp_path / "signals.sqlite"))
+    date = "2024-01-02T00:00:00"
+    store.save(date, "gpt-4o", {"Technical Analyst": {"BTC": {"signal": "buy"}}}, context="a")
+    store.save(date, "gpt-4o", {"Technical Analyst": {"BTC": {"signal": "sell"}}}, context="b")
+
+    assert store.load("gpt-4o", date, date, context="a") == {date: {"Technical Analyst": {"BTC": {"signal": "buy"}}}}
+    assert store.load("gpt-4o", date, date, context="b") == {date: {"Technical Analyst": {"BTC": {"signal": "sell"}}}}
+    assert store.load("gpt-4o", date, date, context="c") == {}
+    store.close()
+
+
+def test_signal_store_sets_aside_signals_without_context(tmp_path):
+    path = str(tmp_path / "signals.sqlite")
+    conn = sqlite3.connect(path)
+    conn.execute("CREATE TABLE signals (date TEXT, ticker TEXT, agent TEXT, model TEXT, signal TEXT, "
+                 "PRIMARY KEY (date, ticker, agent, model))")
+    conn.execute("INSERT INTO signals VALUES ('2024-01-02T00:00:00', 'BTC', 'Technical Analyst', 'gpt-4o', '{}')")
+    conn.commit()
+    conn.close()
+
+    store = SignalStore(path)
+    assert store.load("gpt-4o", "2024-01-01", "2024-12-31") == {}
+    assert store.conn.execute("SELECT COUNT(*) FROM signals_legacy").fetchone() == (1,)
+    store.close()
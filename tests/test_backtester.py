@@ -0,0 +1,63 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from tools.backtester import Backtester
+
+
+def make_price_data(seed=0, bars=60):
+    rng = np.random.default_rng(seed)
+    timestamps = pd.date_range("2024-01-01", periods=bars, freq="D")
+    price_data = {}
+    for i, ticker in enumerate(["BTC", "ETH", "SOL"]):
+        df = pd.DataFrame({
+            "timestamp": timestamps,
+            "open": 1.0, "high": 1.0, "low": 1.0,
+            "close": 100 * (i + 1) * np.exp(rng.normal(0, 0.03, bars).cumsum()),
+            "volume": 1.0,
+        })
+        if ticker == "SOL":
+            # A ticker with holes in its bars
+            df = df.drop(index=[5, 6, 30]).reset_index(drop=True)
+        price_data[ticker] = df
+    return price_data
+
+
+def make_signals(price_data, seed=0, n=150):
+    rng = np.random.default_rng(seed)
+    timestamps = price_data["BTC"]["timestamp"]
+    actions = ["buy", "sell", "short", "cover", "hold"]
+    signals = [{"timestamp": timestamps.iloc[rng.integers(len(timestamps))],
+                "asset": rng.choice(["BTC", "ETH", "SOL"]),
+                "action": rng.choice(actions),
+                "size": float(rng.uniform(0.05, 0.5)),
+                "confidence": float(rng.uniform())} for _ in range(n)]
+    # Signals that must be ignored: unknown asset, and a timestamp where SOL has no bar
+    signals.append({"timestamp": timestamps.iloc[3], "asset": "DOGE", "action": "buy", "size": 0.2, "confidence": 1})
+    signals.append({"timestamp": timestamps.iloc[5], "asset": "SOL", "action": "buy", "size": 0.2, "confidence": 1})
+    return signals
+
+
+@pytest.mark.parametrize("seed", [0, 1, 2])
+@pytest.mark.parametrize("margin_requirement", [0.0, 0.5])
+def test_run_vectorized_matches_run(seed, margin_requirement):
+    price_data = make_price_data(seed)
+    signals = make_signals(price_data, seed)
+
+    loop = Backtester(initial_cash=100000, transaction_cost=0.001, margin_requirement=margin_requirement)
+    vectorized = Backtester(initial_cash=100000, transaction_cost=0.001, margin_requirement=margin_requirement)
+    expected = loop.run(signals, price_data)
+    result = vectorized.run_vectorized(signals, price_data)
+
+    pd.testing.assert_frame_equal(result, expected)
+    assert vectorized.cash == pytest.approx(loop.cash)
+    assert vectorized.holdings == pytest.approx(loop.holdings)
+
+    trades = vectorized.trades.to_frame()
+    expected_trades = loop.trades.to_frame()
+    assert len(trades) == len(expected_trades) > 0
+    for name in ("timestamp", "quantity", "price", "fee"):
+        np.testing.assert_allclose(trades[name].astype("int64" if name == "timestamp" else float),
+                                   expected_trades[name].astype("int64" if name == "timestamp" else float))
+    assert list(trades["asset"].astype(str)) == list(expected_trades["asset"].astype(str))
+    assert list(trades["side"].astype(str)) == list(expected_trades["side"].astype(str))
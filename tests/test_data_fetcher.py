@@ -0,0 +1,64 @@
+import threading
+from datetime import datetime
+
+import pandas as pd
+
+from tools.data_fetcher import fetch_crypto_data, iter_ohlcv_pages
+
+DAY_MS = 86_400_000
+# Same conversion as fetch_crypto_data
+START = int(datetime.strptime("2024-01-01", "%Y-%m-%d").timestamp() * 1000)
+
+
+class FakeExchange:
+    """Stand-in for a ccxt exchange serving daily bars from START, with optional empty pages."""
+
+    def __init__(self, n_bars=25, empty_at=()):
+        self.bars = [[START + i * DAY_MS, 1.0 + i, 2.0 + i, 0.5 + i, 1.5 + i, 10.0 * i] for i in range(n_bars)]
+        self.empty_at = set(empty_at)
+        self.calls = []
+        self.markets_loaded = 0
+        self.lock = threading.Lock()
+
+    def load_markets(self):
+        with self.lock:
+            self.markets_loaded += 1
+
+    def fetch_ohlcv(self, symbol, timeframe, since=None, limit=None):
+        with self.lock:
+            self.calls.append((symbol, since, limit))
+        if since in self.empty_at:
+            return []
+        page = [bar for bar in self.bars if bar[0] >= since]
+        return page[:limit]
+
+
+def test_pages_until_end_respecting_limit():
+    exchange = FakeExchange(n_bars=25)
+    pages = list(iter_ohlcv_pages(exchange, "BTC/USDT", "1d", START, START + 19 * DAY_MS, limit=7))
+    assert [len(page) for page in pages] == [7, 7, 6]
+    assert all(limit == 7 for _, _, limit in exchange.calls)
+    # Each page starts one bar after the previous one
+    assert [since for _, since, _ in exchange.calls] == [START, START + 7 * DAY_MS, START + 14 * DAY_MS]
+    assert pages[-1][-1][0] == START + 19 * DAY_MS
+
+
+def test_empty_page_stops_paging():
+    exchange = FakeExchange(n_bars=25, empty_at={START + 5 * DAY_MS})
+    pages = list(iter_ohlcv_pages(exchange, "BTC/USDT", "1d", START, START + 19 * DAY_MS, limit=5))
+    assert [len(page) for page in pages] == [5]
+    assert len(exchange.calls) == 2
+
+
+def test_fetch_crypto_data_over_several_pages():
+    exchange = FakeExchange(n_bars=40)
+    data = fetch_crypto_data(["BTC", "ETH"], "2024-01-01", "2024-01-31", page_limit=10, exchange=exchange,
+                             max_workers=2)
+    assert exchange.markets_loaded == 1
+    assert list(data) == ["BTC", "ETH"]
+    df = data["BTC"]
+    assert len(df) == 31
+    assert df["timestamp"].is_monotonic_increasing
+    assert df["timestamp"].iloc[-1] == pd.to_datetime(START + 30 * DAY_MS, unit="ms")
+    # 31 bars at 10 per page: 4 requests per ticker
+    assert len(exchange.calls) == 8
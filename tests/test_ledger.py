@@ -0,0 +1,97 @@
+import numpy as np
+import pytest
+
+from tools.ledger import PositionLedger
+
+
+def test_buy_averages_cost_basis_with_fees():
+    ledger = PositionLedger(["BTC"], cash=10000, transaction_cost=0.01)
+    k = ledger.ticker_id("BTC")
+
+    assert ledger.buy(k, 10, 100) == pytest.approx(1010)
+    assert ledger.buy(k, 10, 200) == pytest.approx(2020)
+    assert ledger.long[k] == 20
+    assert ledger.long_cost_basis[k] == pytest.approx(3030 / 20)
+    assert ledger.cash == pytest.approx(10000 - 3030)
+
+
+def test_buy_rejected_without_cash():
+    ledger = PositionLedger(["BTC"], cash=100)
+    assert ledger.buy(0, 2, 100) == 0.0
+    assert ledger.long[0] == 0
+    assert ledger.cash == 100
+
+
+def test_sell_realizes_gains_and_caps_quantity():
+    ledger = PositionLedger(["BTC"], cash=10000, transaction_cost=0.01)
+    ledger.buy(0, 10, 100)
+
+    assert ledger.sell(0, 4, 150) == pytest.approx(4 * 150 * 0.99)
+    assert ledger.realized_long[0] == pytest.approx(4 * 150 * 0.99 - 4 * 101)
+    assert ledger.long[0] == 6
+    assert ledger.long_cost_basis[0] == pytest.approx(101)
+
+    # Selling more than held only closes the position
+    assert ledger.sell(0, 100, 50) == pytest.approx(6 * 50 * 0.99)
+    assert ledger.long[0] == 0
+    assert ledger.long_cost_basis[0] == 0
+    assert ledger.sell(0, 1, 50) == 0.0
+    assert ledger.cash == pytest.approx(10000 - 1010 + 4 * 150 * 0.99 + 6 * 50 * 0.99)
+
+
+def test_short_sell_locks_margin():
+    ledger = PositionLedger(["ETH"], cash=1000, margin_requirement=0.5, transaction_cost=0.01)
+
+    assert ledger.short_sell(0, 10, 100) == pytest.approx(990)
+    assert ledger.short[0] == 10
+    assert ledger.short_cost_basis[0] == pytest.approx(99)
+    assert ledger.short_margin[0] == pytest.approx(500)
+    assert ledger.margin_used == pytest.approx(500)
+    assert ledger.cash == pytest.approx(1000 + 990 - 500)
+
+    # Margin for 40 more units (2000) exceeds the cash left
+    assert ledger.short_sell(0, 40, 100) == 0.0
+    assert ledger.short[0] == 10
+
+
+def test_cover_releases_margin_pro_rata_and_realizes_gains():
+    ledger = PositionLedger(["ETH"], cash=1000, margin_requirement=0.5, transaction_cost=0.01)
+    ledger.short_sell(0, 10, 100)
+    cash = ledger.cash
+
+    assert ledger.cover(0, 4, 80) == pytest.approx(4 * 80 * 1.01)
+    assert ledger.realized_short[0] == pytest.approx(4 * 99 - 4 * 80 * 1.01)
+    assert ledger.short[0] == 6
+    assert ledger.short_margin[0] == pytest.approx(300)
+    assert ledger.margin_used == pytest.approx(300)
+    assert ledger.cash == pytest.approx(cash + 200 - 4 * 80 * 1.01)
+
+
+def test_full_cover_releases_all_margin():
+    ledger = PositionLedger(["ETH"], cash=1000, margin_requirement=0.3)
+    ledger.short_sell(0, 3, 70)
+    ledger.cover(0, 1, 90)
+
+    # Covering more than held closes the short and frees exactly the margin left
+    assert ledger.cover(0, 10, 50) == pytest.approx(100)
+    assert ledger.short[0] == 0
+    assert ledger.short_cost_basis[0] == 0
+    assert ledger.short_margin[0] == 0
+    assert ledger.margin_used == 0
+    assert ledger.realized_short[0] == pytest.approx((70 - 90) + 2 * (70 - 50))
+    assert ledger.cash == pytest.approx(1000 + ledger.realized_short[0])
+    assert ledger.cover(0, 1, 50) == 0.0
+
+
+def test_equity_and_portfolio_round_trip():
+    ledger = PositionLedger(["BTC", "ETH"], cash=10000, margin_requirement=0.5)
+    ledger.buy(0, 2, 1000)
+    ledger.short_sell(1, 5, 200)
+    prices = np.array([1100.0, 180.0])
+
+    np.testing.assert_allclose(ledger.unrealized_pnl(prices), [200, 100])
+    assert ledger.equity(prices) == pytest.approx(10000 + 300)
+    assert ledger.equity([1100.0, np.nan]) == pytest.approx(10000 - 2000 + 1000 - 500 + 2200 + 500)
+
+    restored = PositionLedger.from_portfolio(ledger.to_portfolio())
+    assert restored.to_portfolio() == ledger.to_portfolio()
@@ -0,0 +1,39 @@
+from pydantic import BaseModel
+
+from tools.llm_cache import LLMCache
+
+
+class Signal(BaseModel):
+    action: str
+    confidence: float
+
+
+def test_put_evicts_least_recently_used_beyond_max_entries(tmp_path):
+    cache = LLMCache(str(tmp_path / "cache.sqlite"), max_entries=3)
+    for i in range(3):
+        cache.put(f"k{i}", "m", Signal(action="buy", confidence=i))
+    assert cache.get("k0", Signal) is not None  # k1 becomes the least recently used
+
+    cache.put("k3", "m", Signal(action="sell", confidence=0.5))
+    assert cache.entries == 3
+    assert cache.evictions == 1
+    assert cache.get("k1", Signal) is None
+    assert cache.get("k0", Signal) is not None
+    assert cache.stats()["entries"] == 3
+
+
+def test_entry_count_tracks_replacements_expiry_and_reopen(tmp_path):
+    path = str(tmp_path / "cache.sqlite")
+    cache = LLMCache(path, ttl=None)
+    cache.put("a", "m", Signal(action="buy", confidence=0.1))
+    cache.put("a", "m", Signal(action="sell", confidence=0.9))
+    cache.put("b", "m", Signal(action="hold", confidence=0.5))
+    assert cache.entries == 2
+    assert cache.get("a", Signal) == Signal(action="sell", confidence=0.9)
+
+    cache.ttl = -1  # every entry is now expired
+    assert cache.get("a", Signal) is None
+    assert cache.entries == 1
+    cache.close()
+
+    assert LLMCache(path).entries == 1
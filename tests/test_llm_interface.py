@@ -0,0 +1,144 @@
+import asyncio
+import time
+
+import pytest
+from langchain_core.messages import AIMessage, AIMessageChunk
+
+from agents.base_agent import TradingSignal, TradingSignalBatch
+from tools import llm_interface
+from tools.llm_interface import (IncrementalResponseParser, _parse_result, call_llm, parse_gemini_response,
+                                 submit_llm)
+from tools.prompts import build_messages, plain_text
+from tools.models import get_model_info
+from tools.resilience import provider_guard
+
+
+def stream(text, step=3, required_fields=("action", "confidence", "reasoning")):
+    """Feeds text to a parser in small pieces; returns (result, characters read when it completed or None)."""
+    parser = IncrementalResponseParser(required_fields)
+    for i in range(0, len(text), step):
+        if parser.feed(text[i:i + step]) is not None:
+            return parser.result, i + step
+    return parser.finish(), None
+
+
+def test_fenced_answer_wins_over_earlier_draft():
+    text = ('Draft: {"action": "sell", "confidence": 0.9, "reasoning": "draft"}\n'
+            'Final answer:\n```json\n{"action": "buy", "confidence": 0.7, "reasoning": "final"}\n```\n'
+            'Some closing commentary.')
+    result, read = stream(text)
+    assert result == parse_gemini_response(text)
+    assert result["action"] == "buy"
+    # The stream is cut at the closing brace of the fenced object
+    assert read is not None and read < len(text)
+
+
+def test_bare_object_used_at_end_of_stream():
+    result, read = stream('{"action": "hold", "confidence": 0.5, "reasoning": "flat"}')
+    assert result == {"action": "hold", "confidence": 0.5, "reasoning": "flat"}
+    assert read is None
+
+
+def test_bare_batch_object():
+    text = '{"signals": [{"ticker": "BTC", "action": "buy", "confidence": 0.8, "reasoning": "up {trend}"}]}'
+    result, _ = stream(text, required_fields=("signals",))
+    assert result["signals"][0]["reasoning"] == "up {trend}"
+
+
+def test_signal_lines_complete_at_confidence():
+    text = "**Signal:** BUY\n**Reasoning:** Strong trend.\n**Confidence:** 0.7\nMore text that is never read"
+    result, read = stream(text)
+    assert result == {"action": "buy", "confidence": 0.7, "reasoning": "Strong trend."}
+    assert read < len(text)
+
+
+@pytest.mark.parametrize("confidence_first", [True, False])
+def test_bold_subheadings_stay_in_reasoning(confidence_first):
+    reasoning = "**Reasoning:**\n\n**1. Trend:** rising\n\n**2. Volume:** high\n"
+    if confidence_first:
+        text = "**Signal:** buy\n**Confidence:** 0.8\n" + reasoning
+    else:
+        text = "**Signal:** buy\n" + reasoning + "**Confidence:** 0.8\n"
+    result, _ = stream(text)
+    assert result["action"] == "buy" and result["confidence"] == 0.8
+    assert "rising" in result["reasoning"] and "high" in result["reasoning"]
+
+
+def test_bare_batch_answer_parsed_for_models_without_json_mode():
+    content = 'Here you go:\n{"signals": [{"ticker": "BTC", "action": "buy", "confidence": 0.8, "reasoning": "up"}]}'
+    for model_name in ("gemini-2.0-flash", "deepseek-reasoner"):
+        result = _parse_result(AIMessage(content=content), get_model_info(model_name), TradingSignalBatch)
+        assert result.signals == [{"ticker": "BTC", "action": "buy", "confidence": 0.8, "reasoning": "up"}]
+
+
+def test_cancelled_request_releases_probe_slot(monkeypatch):
+    class SlowModel:
+        async def ainvoke(self, request):
+            await asyncio.sleep(10)
+
+    monkeypatch.setattr(llm_interface, "_lookup", lambda *args: (None, None, None))
+    monkeypatch.setattr(llm_interface, "_model_for", lambda *args: (False, None, SlowModel()))
+    guard = provider_guard("CancelTest")
+    guard.breaker.opened_at = time.monotonic() - guard.breaker.reset_timeout  # half-open
+
+    future = submit_llm("prompt", "slow-model", "CancelTest", TradingSignal)
+    deadline = time.monotonic() + 5
+    while not guard.breaker.probing and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert guard.breaker.probing
+    future.cancel()
+    while guard.breaker.probing and time.monotonic() < deadline:
+        time.sleep(0.01)
+
+    assert not guard.breaker.probing
+    assert guard.breaker.allow()
+
+
+class StreamingModel:
+    """Streams a fixed completion in small chunks and keeps the requests it received."""
+
+    def __init__(self, text, step=4):
+        self.text = text
+        self.step = step
+        self.requests = []
+        self.chunks_sent = 0
+
+    def stream(self, request):
+        self.requests.append(request)
+        for i in range(0, len(self.text), self.step):
+            self.chunks_sent += 1
+            yield AIMessageChunk(content=self.text[i:i + self.step])
+
+
+def test_streamed_prompt_asks_for_fenced_json_after_user_message():
+    prompt = build_messages("You are a chartist.", "Asset: BTC")
+    request = llm_interface._request(prompt, "OpenAI", True, TradingSignal)
+
+    assert request[0] == prompt[0]
+    assert request[1].content.startswith("Asset: BTC\n\n")
+    assert "```json" in request[1].content and "action, confidence, reasoning" in request[1].content
+    assert llm_interface._request(prompt, "OpenAI", False, TradingSignal) == prompt
+
+
+def test_unfenced_streamed_answer_is_parsed(monkeypatch):
+    llm = StreamingModel('{"action": "sell", "confidence": 0.6, "reasoning": "breakdown below support"}')
+    monkeypatch.setattr(llm_interface, "_lookup", lambda *args: (None, None, None))
+    monkeypatch.setattr(llm_interface, "_model_for", lambda *args: (True, None, llm))
+
+    result = call_llm(build_messages("You are a chartist.", "Asset: BTC"), "stream-model", "StreamTest",
+                      TradingSignal, max_retries=1)
+
+    assert result == TradingSignal(action="sell", confidence=0.6, reasoning="breakdown below support")
+    assert "```json" in plain_text(llm.requests[0])
+
+
+def test_fenced_streamed_answer_stops_stream_at_closing_brace(monkeypatch):
+    answer = '```json\n{"action": "buy", "confidence": 0.8, "reasoning": "trend"}\n```'
+    llm = StreamingModel(answer + "\nSome commentary the model keeps writing." * 20)
+    monkeypatch.setattr(llm_interface, "_lookup", lambda *args: (None, None, None))
+    monkeypatch.setattr(llm_interface, "_model_for", lambda *args: (True, None, llm))
+
+    result = call_llm("Asset: BTC", "stream-model", "StreamTest", TradingSignal, max_retries=1)
+
+    assert result == TradingSignal(action="buy", confidence=0.8, reasoning="trend")
+    assert llm.chunks_sent * llm.step < len(answer) + llm.step
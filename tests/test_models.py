@@ -0,0 +1,56 @@
+import asyncio
+import threading
+
+from tools import llm_interface
+from tools.models import _close_client, get_model, pool_stats
+
+
+def test_get_model_pools_clients_with_unhashable_settings(monkeypatch):
+    monkeypatch.setenv("OPENAI_API_KEY", "sk-test")
+    client = get_model("gpt-4o", "OpenAI", default_headers={"X-Desk": "crypto"}, temperature=0)
+    reused = pool_stats()["reused"]
+
+    assert get_model("gpt-4o", "OpenAI", temperature=0, default_headers={"X-Desk": "crypto"}) is client
+    assert pool_stats()["reused"] == reused + 1
+    assert get_model("gpt-4o", "OpenAI", default_headers={"X-Desk": "macro"}, temperature=0) is not client
+
+
+class SyncSDK:
+    closed = False
+
+    def close(self):
+        self.closed = True
+
+
+class AsyncSDK:
+    closed_on = None
+
+    async def close(self):
+        self.closed_on = threading.current_thread().name
+
+
+class Client:
+    def __init__(self):
+        self.root_client = SyncSDK()
+        self.root_async_client = AsyncSDK()
+
+
+def test_close_client_closes_async_client_on_background_loop():
+    client = Client()
+    llm_interface._background_loop()
+
+    _close_client(client)
+
+    assert client.root_client.closed
+    assert client.root_async_client.closed_on == "llm-event-loop"
+
+
+def test_acall_llm_runs_on_background_loop_from_any_loop(monkeypatch):
+    loops = []
+    monkeypatch.setattr(llm_interface, "_lookup", lambda *args: (None, None, "cached"))
+    monkeypatch.setattr(llm_interface, "_record_call", lambda *args, **kwargs: loops.append(asyncio.get_running_loop()))
+
+    result = asyncio.run(llm_interface.acall_llm("prompt", "local-synthetic", "Local", object))
+
+    assert result == "cached"
+    assert loops == [llm_interface._background_loop()]
@@ -0,0 +1,42 @@
+import numpy as np
+
+from tools.ohlcv_cache import OHLCVCache
+
+DAY_MS = 86_400_000
+START = 1_704_067_200_000  # 2024-01-01 UTC
+
+
+def bars(first, last):
+    ts = np.arange(first, last + 1) * DAY_MS + START
+    return np.column_stack([ts, np.ones((len(ts), 5))]).astype(np.float64)
+
+
+def test_early_stop_only_covers_bars_received(tmp_path):
+    cache = OHLCVCache(root=str(tmp_path))
+    requests = []
+
+    def stops_after_day_9(since, until):
+        requests.append((since, until))
+        return bars((since - START) // DAY_MS, min(9, (until - START) // DAY_MS))
+
+    values = cache.load("BTC/USDT", "1d", START, START + 19 * DAY_MS, fetch_range=stops_after_day_9)
+    assert len(values) == 10
+    assert cache.covered_ranges("BTC/USDT", "1d") == [[START, START + 9 * DAY_MS]]
+
+    def complete(since, until):
+        requests.append((since, until))
+        return bars((since - START) // DAY_MS, (until - START) // DAY_MS)
+
+    values = cache.load("BTC/USDT", "1d", START, START + 19 * DAY_MS, fetch_range=complete)
+    assert len(values) == 20
+    # The second load only asked for the bars missing after the early stop
+    assert requests[-1] == (START + 10 * DAY_MS, START + 19 * DAY_MS)
+    assert cache.covered_ranges("BTC/USDT", "1d") == [[START, START + 19 * DAY_MS]]
+
+
+def test_empty_fetch_records_no_coverage(tmp_path):
+    cache = OHLCVCache(root=str(tmp_path))
+    values = cache.load("BTC/USDT", "1d", START, START + 5 * DAY_MS,
+                        fetch_range=lambda since, until: np.empty((0, 6)))
+    assert len(values) == 0
+    assert cache.covered_ranges("BTC/USDT", "1d") == []
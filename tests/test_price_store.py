@@ -0,0 +1,19 @@
+import numpy as np
+import pandas as pd
+
+from tools.price_store import PriceStore
+
+
+def test_frames_are_cut_to_the_requested_range(tmp_path):
+    timestamps = pd.date_range("2024-01-01", periods=10, freq="D")
+    df = pd.DataFrame({"timestamp": timestamps, "open": 1.0, "high": 2.0, "low": 0.5,
+                       "close": np.arange(10.0), "volume": 1.0})
+    store = PriceStore.write(str(tmp_path), {"BTC": df, "ETH": df})
+
+    # end is exclusive: passing the first bar of Jan 6 plus 1 ns keeps it, like fetch_crypto_data's end_date
+    frames = store.frames(["BTC"], np.datetime64("2024-01-03", "ns"),
+                          np.datetime64("2024-01-06", "ns") + np.timedelta64(1, "ns"))
+    assert list(frames) == ["BTC"]
+    assert frames["BTC"]["close"].tolist() == [2.0, 3.0, 4.0, 5.0]
+    assert frames["BTC"]["timestamp"].iloc[-1] == pd.Timestamp("2024-01-06")
+    assert len(store.frames()["ETH"]) == 10
@@ -0,0 +1,67 @@
+import time
+
+import pytest
+
+from tools.resilience import CircuitOpenError, ProviderGuard
+
+
+class Response:
+    def __init__(self, headers=None):
+        self.headers = headers or {}
+
+
+class APIError(Exception):
+    def __init__(self, status_code, headers=None):
+        super().__init__(f"HTTP {status_code}")
+        self.status_code = status_code
+        self.response = Response(headers)
+
+
+def test_rate_limits_set_cooldown_without_opening_circuit():
+    guard = ProviderGuard("Test")
+    for _ in range(guard.breaker.failure_threshold * 2):
+        assert guard.record_failure(APIError(429, {"retry-after": "2"}))
+
+    assert guard.breaker.state == "closed"
+    assert guard.stats["rate_limited"] == guard.breaker.failure_threshold * 2
+    assert 0 < guard.try_acquire() <= 2
+
+
+def test_server_errors_open_circuit():
+    guard = ProviderGuard("Test")
+    for _ in range(guard.breaker.failure_threshold):
+        assert guard.record_failure(APIError(503))
+
+    assert guard.breaker.state == "open"
+    with pytest.raises(CircuitOpenError):
+        guard.try_acquire()
+
+
+def test_open_circuit_rejects_before_spending_rate_limit_token():
+    guard = ProviderGuard("Test", rate=1, burst=1)
+    guard.breaker.opened_at = time.monotonic()
+
+    with pytest.raises(CircuitOpenError):
+        guard.try_acquire()
+    guard.breaker.opened_at = None
+    assert guard.try_acquire() == 0.0  # the token is still in the bucket
+
+
+def test_probe_slot_is_released_while_waiting_for_token():
+    guard = ProviderGuard("Test", rate=1, burst=1)
+    assert guard.try_acquire() == 0.0
+    guard.breaker.opened_at = time.monotonic() - guard.breaker.reset_timeout  # half-open
+
+    assert guard.try_acquire() > 0
+    assert not guard.breaker.probing
+    assert guard.breaker.allow()  # the next caller can still take the probe
+
+
+def test_rate_limited_probe_keeps_circuit_half_open():
+    guard = ProviderGuard("Test")
+    guard.breaker.opened_at = time.monotonic() - guard.breaker.reset_timeout
+    assert guard.try_acquire() == 0.0
+
+    guard.record_failure(APIError(429))
+    assert guard.breaker.state == "half-open"
+    assert not guard.breaker.probing